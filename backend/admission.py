@@ -0,0 +1,199 @@
+"""
+Контроль нагрузки на /api/: частота запросов на клиента и число запросов в обработке.
+
+Запросы делятся на чтение (GET, HEAD) и запись (остальные методы), у каждого класса
+свой бюджет. Частоту ограничивает token bucket на клиента: RATE_LIMIT_READS и
+RATE_LIMIT_WRITES — запросов в секунду (0 — без ограничения), RATE_LIMIT_READ_BURST и
+RATE_LIMIT_WRITE_BURST — запас на всплеск (по умолчанию вдвое больше частоты).
+Сверх частоты клиент сразу получает 429 с Retry-After до появления следующего токена.
+
+Число одновременных запросов к БД ограничивают ADMISSION_MAX_READS и
+ADMISSION_MAX_WRITES (0 — без ограничения). Запрос сверх предела не ждёт в очереди
+исполнителя, а сразу получает 503 с Retry-After: при перегрузке быстрый отказ дешевле
+для всех, чем растущая очередь и таймауты блокировки SQLite у каждого второго запроса.
+Поток изменений (/changes) держит соединение открытым без запросов к БД, поэтому
+в число запросов в обработке не входит.
+
+Клиент — адрес соединения; за прокси ADMISSION_CLIENT_HEADER задаёт заголовок
+с адресом клиента (например, X-Forwarded-For, берётся первый адрес).
+Ограничения действуют в пределах одного процесса-воркера.
+"""
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+from backend.metrics import ADMISSION_REJECTED
+
+DEFAULT_MAX_READS = 256
+DEFAULT_MAX_WRITES = 64
+DEFAULT_MAX_CLIENTS = 10_000
+
+READ = "read"
+WRITE = "write"
+
+_READ_METHODS = frozenset(("GET", "HEAD"))
+
+
+class RateLimiter:
+    """
+    Token bucket на клиента: rate токенов в секунду, не больше burst в запасе.
+
+    Корзины хранятся для max_clients последних клиентов; вытесненная корзина
+    простаивала дольше всех и успела бы наполниться, так что её потеря клиенту
+    ничего не даёт. Вызывается только из event loop, поэтому без замка.
+    """
+
+    def __init__(
+            self,
+            rate: float,
+            burst: Optional[float] = None,
+            max_clients: int = DEFAULT_MAX_CLIENTS,
+            clock: Callable[[], float] = time.monotonic
+            ):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(burst if burst is not None else 2 * rate, 1.0)
+        self.max_clients = max_clients
+        self._clock = clock
+        # Клиент -> (токенов в запасе, время подсчёта)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def acquire(self, client: str) -> float:
+        """Взять токен; 0 — запрос разрешён, иначе через сколько секунд появится токен"""
+        now = self._clock()
+        tokens, updated = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[client] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def clients(self) -> int:
+        return len(self._buckets)
+
+
+class ConcurrencyLimit:
+    """Счётчик запросов в обработке с пределом limit"""
+
+    def __init__(self, limit: int):
+        if limit < 1:
+            raise ValueError("limit must be positive")
+        self.limit = limit
+        self.in_flight = 0
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= self.limit:
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+
+class AdmissionController:
+    """Бюджеты классов read и write: ограничитель частоты и предел одновременных запросов (None — нет)"""
+
+    def __init__(
+            self,
+            rate_limits: Optional[Dict[str, RateLimiter]] = None,
+            concurrency: Optional[Dict[str, ConcurrencyLimit]] = None,
+            client_header: Optional[str] = None
+            ):
+        self.rate_limits = rate_limits or {}
+        self.concurrency = concurrency or {}
+        self.client_header = client_header.lower().encode("latin-1") if client_header else None
+
+    def client(self, scope) -> str:
+        """Адрес клиента: из заголовка client_header, если он задан и есть в запросе, иначе соединения"""
+        if self.client_header is not None:
+            for name, value in scope["headers"]:
+                if name == self.client_header:
+                    return value.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Для метрик: запросов в обработке, предел (0 — нет) и клиентов с корзинами по классам"""
+        stats = {}
+        for traffic in (READ, WRITE):
+            limit = self.concurrency.get(traffic)
+            limiter = self.rate_limits.get(traffic)
+            stats[traffic] = {
+                "in_flight": limit.in_flight if limit else 0,
+                "limit": limit.limit if limit else 0,
+                "clients": limiter.clients() if limiter else 0,
+            }
+        return stats
+
+
+def _rejection(status_code: int, detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        {"detail": detail},
+        status_code=status_code,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+class AdmissionMiddleware:
+    """
+    ASGI-middleware: пропускает запрос к /api/ только в пределах бюджета его класса,
+    иначе отвечает 429 (частота клиента) или 503 (перегрузка) без вызова приложения.
+    """
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/") or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        traffic = READ if scope["method"] in _READ_METHODS else WRITE
+        limiter = self.controller.rate_limits.get(traffic)
+        if limiter is not None:
+            wait = limiter.acquire(self.controller.client(scope))
+            if wait > 0:
+                ADMISSION_REJECTED.inc(labels=(traffic, "rate_limited"))
+                await _rejection(429, "Too many requests", wait)(scope, receive, send)
+                return
+
+        limit = self.controller.concurrency.get(traffic)
+        if limit is None or scope["path"].endswith("/changes"):
+            await self.app(scope, receive, send)
+            return
+        if not limit.try_acquire():
+            ADMISSION_REJECTED.inc(labels=(traffic, "overloaded"))
+            await _rejection(503, "Server is overloaded, retry later", 1)(scope, receive, send)
+            return
+        try:
+            # Слот занят до конца ответа: выгрузка читает БД, пока отдаёт тело
+            await self.app(scope, receive, send)
+        finally:
+            limit.release()
+
+
+def admission_from_env() -> AdmissionController:
+    """Бюджеты по настройкам окружения (см. описание модуля)"""
+    rate_limits = {}
+    concurrency = {}
+    for traffic, prefix, max_default in ((READ, "READ", DEFAULT_MAX_READS), (WRITE, "WRITE", DEFAULT_MAX_WRITES)):
+        rate = float(os.getenv(f"RATE_LIMIT_{prefix}S", "0"))
+        if rate > 0:
+            burst = os.getenv(f"RATE_LIMIT_{prefix}_BURST")
+            rate_limits[traffic] = RateLimiter(rate, float(burst) if burst else None)
+        max_in_flight = int(os.getenv(f"ADMISSION_MAX_{prefix}S", max_default))
+        if max_in_flight > 0:
+            concurrency[traffic] = ConcurrencyLimit(max_in_flight)
+    return AdmissionController(rate_limits, concurrency, os.getenv("ADMISSION_CLIENT_HEADER") or None)
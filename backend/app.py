@@ -1,20 +1,193 @@
-from fastapi import APIRouter, FastAPI, HTTPException
-from typing import List
-from backend.task import task_service  
-from backend.model import TaskModel, TaskResponse
+import asyncio
+import logging
+import os
+import secrets
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, Body, Depends, FastAPI, Header, HTTPException, Query, Request, Response
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from backend.admission import AdmissionController, AdmissionMiddleware, admission_from_env
+from backend.cache_control import NO_STORE, REVALIDATE, CacheControlMiddleware, revalidate_after
+from backend.changes import DEFAULT_RETENTION, ChangeFeed
+from backend.etag import etag_matches, if_match_versions, list_etag, task_etag
+from backend.compression import CompressionMiddleware, compression_from_env
+from backend.executor import db_executor
+from backend.idempotency import (
+    MAX_KEY_LENGTH, IdempotencyKeyInProgressError, IdempotencyKeyReusedError, StoredResponse,
+    idempotency_from_env, request_fingerprint
+)
+from backend.metrics import CONTENT_TYPE, REGISTRY, MetricsMiddleware
+from backend.profiling import ProfilingMiddleware, profiler_from_env
+from backend.task import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, TaskService, VersionConflictError, task_service
+from backend.model import (
+    BulkModeModel, BulkResponse, ExportFormatModel, PriorityModel, ProfilingModel, QuerySortModel, SearchSortModel, TaskModel,
+    TaskResponse, TaskSortModel, TaskStatsResponse
+)
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic_core import to_json
+
+logger = logging.getLogger(__name__)
+
+# Доверенное чтение: ответы TaskService уже провалидированы, поэтому на чтении
+# они сразу сериализуются в JSON без повторной проверки через response_model
+TRUSTED_READS = os.getenv("TRUSTED_READS", "1").lower() not in ("0", "false", "no", "off")
+
+# Поток изменений задач для GET /api/v1/tasks/changes (см. backend/changes.py)
+change_feed = ChangeFeed(task_service)
+
+# Idempotency-Key для создания и обновления задач (см. backend/idempotency.py)
+idempotency = idempotency_from_env(task_service)
+
+# Контроль нагрузки на /api/ (см. backend/admission.py)
+admission = admission_from_env()
+
+# Выборочное профилирование запросов (см. backend/profiling.py)
+profiler = profiler_from_env()
+
+# Чтения с ETag: CACHE_CONTROL_MAX_AGE секунд клиент не перезапрашивает ответ (0 — сверяет каждый раз)
+_etag_reads = revalidate_after(int(os.getenv("CACHE_CONTROL_MAX_AGE", "0")))
+
+# Cache-Control для GET по шаблону маршрута; запись всегда no-store (см. backend/cache_control.py)
+CACHE_CONTROL = {
+    "/api/v1/tasks": _etag_reads,
+    "/api/v1/tasks/search": _etag_reads,
+    "/api/v1/tasks/stats": _etag_reads,
+    "/api/v1/tasks/{task_id}": _etag_reads,
+    # Снимок всей таблицы: хранить его копии в кэшах дороже, чем выгрузить заново
+    "/api/v1/tasks/export": NO_STORE,
+    "/api/v1/tasks/changes": REVALIDATE,
+    "/metrics": NO_STORE,
+    "/admin/queries": NO_STORE,
+    "/admin/profiling": NO_STORE,
+}
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Жизненный цикл воркера: открыть хранилище (пул соединений, миграции под файловой
+    блокировкой), подключить его метрики и поток изменений; при остановке —
+    очистку журнала изменений и ключей идемпотентности, исполнитель и пул
+    """
+    await db_executor.run(task_service.open)
+    register_service_metrics(task_service)
+    task_service.add_change_listener(change_feed.notify)
+    logger.info("Storage settings: %s", await db_executor.run(task_service.db.storage_settings))
+    retention = int(os.getenv("CHANGES_RETENTION", DEFAULT_RETENTION))
+    pruning = asyncio.create_task(change_feed.prune_periodically(retention)) if retention > 0 else None
+    idempotency_pruning = asyncio.create_task(idempotency.prune_periodically())
+    yield
+    if pruning is not None:
+        pruning.cancel()
+    idempotency_pruning.cancel()
+    db_executor.shutdown()
+    task_service.close()
 
-app = FastAPI()
 
+app = FastAPI(lifespan=lifespan)
+
+# Внутри CORS и метрик: отказы 429/503 получают CORS-заголовки и попадают в длительность запросов
+app.add_middleware(AdmissionMiddleware, controller=admission)
+app.add_middleware(CacheControlMiddleware, policies=CACHE_CONTROL)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Link", "ETag", "Retry-After", "Idempotent-Replayed"],
 )
+# Сжатие внутри метрик: его время входит в длительность запроса
+app.add_middleware(CompressionMiddleware, **compression_from_env())
+app.add_middleware(MetricsMiddleware)
+# Снаружи всего остального: в профиль попадают все middleware внутри и сам обработчик.
+# admin_token_valid объявлена ниже, рядом с разделом /admin
+app.add_middleware(ProfilingMiddleware, profiler=profiler, authorize=lambda token: admin_token_valid(token))
+
+
+def register_admission_metrics(controller: AdmissionController) -> None:
+    """Состояние контроля нагрузки: читается из controller.stats() при запросе /metrics"""
+    stats = controller.stats
+    REGISTRY.function(
+        "admission_in_flight", "Запросы к API в обработке по классу",
+        lambda: {(traffic,): item["in_flight"] for traffic, item in stats().items()}, ("traffic",)
+    )
+    REGISTRY.function(
+        "admission_in_flight_limit", "Предел одновременных запросов к API по классу (0 — без предела)",
+        lambda: {(traffic,): item["limit"] for traffic, item in stats().items()}, ("traffic",)
+    )
+    REGISTRY.function(
+        "rate_limit_clients", "Клиентов с корзиной ограничителя частоты по классу",
+        lambda: {(traffic,): item["clients"] for traffic, item in stats().items()}, ("traffic",)
+    )
+
+
+register_admission_metrics(admission)
+
+
+def register_service_metrics(service: TaskService) -> None:
+    """Метрики пула, кэша и group commit сервиса: читаются из их stats() при запросе /metrics"""
+    pools = service.db.pool_stats
+    REGISTRY.function(
+        "db_pool_connections", "Соединения пулов читателей и писателя по состоянию",
+        lambda: {
+            (name, state): stats[state]
+            for name, stats in pools().items() for state in ("idle", "in_use")
+        },
+        ("pool", "state")
+    )
+    REGISTRY.function(
+        "db_pool_max_size", "Максимальный размер пула соединений",
+        lambda: {(name,): stats["max_size"] for name, stats in pools().items()}, ("pool",)
+    )
+    if service.cache is not None:
+        cache = service.cache.stats
+        REGISTRY.function(
+            "task_cache_requests_total", "Обращения к кэшу задач по результату",
+            lambda: {("hit",): cache()["hits"], ("miss",): cache()["misses"]}, ("result",), "counter"
+        )
+        REGISTRY.function("task_cache_hit_ratio", "Доля попаданий в кэш задач", lambda: cache()["hit_ratio"])
+        REGISTRY.function("task_cache_entries", "Записей в кэше задач", lambda: cache()["size"])
+        REGISTRY.function(
+            "task_cache_evictions_total", "Вытеснения из кэша задач", lambda: cache()["evictions"], (), "counter"
+        )
+    if service.batcher is not None:
+        batcher = service.batcher.stats
+        REGISTRY.function(
+            "group_commit_batches_total", "Транзакций group commit", lambda: batcher()["batches"], (), "counter"
+        )
+        REGISTRY.function(
+            "group_commit_statements_total", "Операторов, записанных через group commit",
+            lambda: batcher()["statements"], (), "counter"
+        )
+        REGISTRY.function("group_commit_queued", "Операторов в очереди group commit", lambda: batcher()["queued"])
+
+
+# ========== GET /metrics ==========
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Метрики процесса в текстовом формате Prometheus"""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+def _read_response(content: Any, response: Response):
+    """Ответ на чтение: в режиме доверенного чтения — сразу JSON-байты с заголовками из response"""
+    if not TRUSTED_READS:
+        return content
+    return Response(
+        content=to_json(content),
+        media_type="application/json",
+        headers=dict(response.headers)
+    )
+
+def _set_etag(response: Response, etag: str) -> None:
+    """ETag для сверки через If-None-Match; Cache-Control ставит CacheControlMiddleware по маршруту"""
+    response.headers["ETag"] = etag
+
+def _not_modified(etag: str) -> Response:
+    """Ответ 304 без тела"""
+    response = Response(status_code=304)
+    _set_etag(response, etag)
+    return response
 
 tasks_router = APIRouter(
     prefix="/api/v1/tasks",  
@@ -23,58 +196,296 @@ tasks_router = APIRouter(
 
 # ========== GET /api/v1/tasks ==========
 @tasks_router.get('', response_model=List[TaskResponse])
-def get_tasks():
-    """Получить все задачи"""
-    return task_service.get_all()
+async def get_tasks(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    after_id: Optional[int] = Query(None, ge=0),
+    priority: Optional[PriorityModel] = None,
+    sort: TaskSortModel = TaskSortModel.ID,
+    if_none_match: Optional[str] = Header(None),
+):
+    """Получить страницу задач; курсор следующей страницы — в заголовке X-Next-Cursor"""
+    # Версия читается до страницы: если между ними была запись, ETag окажется
+    # старше данных и следующий запрос просто получит их заново
+    etag = list_etag(await db_executor.run(task_service.list_version))
+    if etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    try:
+        tasks, next_cursor = await db_executor.run(
+            task_service.get_page,
+            limit=limit,
+            cursor=cursor,
+            after_id=after_id,
+            priority=priority,
+            sort=sort
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if next_cursor:
+        next_url = request.url.remove_query_params("after_id").include_query_params(cursor=next_cursor)
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    _set_etag(response, etag)
+    return _read_response(tasks, response)
+
+# ========== GET /api/v1/tasks/search ==========
+@tasks_router.get('/search', response_model=List[TaskResponse])
+async def search_tasks(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: SearchSortModel = SearchSortModel.RELEVANCE,
+    if_none_match: Optional[str] = Header(None),
+):
+    """Полнотекстовый поиск задач; курсор следующей страницы — в заголовке X-Next-Cursor"""
+    etag = list_etag(await db_executor.run(task_service.list_version))
+    if etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    try:
+        tasks, next_cursor = await db_executor.run(
+            task_service.search,
+            q,
+            limit=limit,
+            cursor=cursor,
+            sort=sort
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if next_cursor:
+        next_url = request.url.include_query_params(cursor=next_cursor)
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    _set_etag(response, etag)
+    return _read_response(tasks, response)
+
+async def _idempotent(
+    request: Request,
+    response: Response,
+    key: Optional[str],
+    payload: TaskModel,
+    handle: Callable[[], Awaitable[Tuple[TaskResponse, Dict[str, str]]]],
+):
+    """
+    Выполнить запись handle() один раз на Idempotency-Key: повтор с тем же ключом получает
+    сохранённый ответ, не вызывая handle(); без ключа — обычный ответ с заголовками handle()
+    """
+    if key is None:
+        result, headers = await handle()
+        response.headers.update(headers)
+        return result
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1..{MAX_KEY_LENGTH} characters")
+
+    fingerprint = request_fingerprint(request.method, request.url.path, payload)
+    try:
+        stored = await db_executor.run(idempotency.begin, key, fingerprint)
+    except IdempotencyKeyInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Retry-After": "1"})
+    except IdempotencyKeyReusedError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if stored is None:
+        try:
+            result, headers = await handle()
+        except Exception:
+            # Запись не состоялась: повтор должен выполниться заново. При отмене корутины
+            # (BaseException) ключ не освобождается — запись в потоке могла и пройти
+            await db_executor.run(idempotency.abort, key)
+            raise
+        stored = StoredResponse(200, to_json(result), headers)
+        try:
+            await db_executor.run(idempotency.complete, key, fingerprint, stored)
+        except Exception:
+            # Задача уже записана, ответ отдаём; ключ освободится через IDEMPOTENCY_PENDING_TTL
+            logger.exception("Failed to store response for Idempotency-Key %r", key)
+        return Response(stored.body, status_code=stored.status, headers=stored.headers, media_type="application/json")
+    return Response(
+        stored.body,
+        status_code=stored.status,
+        headers={**stored.headers, "Idempotent-Replayed": "true"},
+        media_type="application/json"
+    )
 
 # ========== POST /api/v1/tasks ==========
 @tasks_router.post("", response_model=TaskResponse)
-def create_task(task: TaskModel):
-    """Создать новую задачу"""
+async def create_task(
+    task: TaskModel,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+):
+    """Создать новую задачу; повтор с тем же Idempotency-Key возвращает сохранённый ответ"""
+    async def create():
+        try:
+            created = await db_executor.run(
+                task_service.create,
+                title=task.title,
+                description=task.description,
+                priority=task.priority
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return created, {}
+
+    return await _idempotent(request, response, idempotency_key, task, create)
+
+def _bulk_result(result: BulkResponse):
+    """Пачка, не применённая в режиме atomic, отдаётся с кодом 409 и отчётом по элементам"""
+    if not result.applied:
+        return JSONResponse(status_code=409, content=result.model_dump(mode="json"))
+    return result
+
+# ========== POST /api/v1/tasks/bulk ==========
+@tasks_router.post("/bulk", response_model=BulkResponse)
+async def create_tasks_bulk(
+    items: List[Dict[str, Any]] = Body(...),
+    mode: BulkModeModel = BulkModeModel.ATOMIC,
+):
+    """Создать пачку задач одной транзакцией"""
     try:
-        return task_service.create(
-            title=task.title,
-            description=task.description,
-            priority=task.priority
-        )
+        return _bulk_result(await db_executor.run(task_service.create_many, items, mode))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# ========== PATCH /api/v1/tasks/bulk ==========
+@tasks_router.patch("/bulk", response_model=BulkResponse)
+async def update_tasks_bulk(
+    items: List[Dict[str, Any]] = Body(...),
+    mode: BulkModeModel = BulkModeModel.ATOMIC,
+):
+    """Частично обновить пачку задач одной транзакцией"""
+    try:
+        return _bulk_result(await db_executor.run(task_service.update_many, items, mode))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+# ========== DELETE /api/v1/tasks/bulk ==========
+@tasks_router.delete("/bulk", response_model=BulkResponse)
+async def delete_tasks_bulk(
+    task_ids: List[int] = Body(...),
+    mode: BulkModeModel = BulkModeModel.ATOMIC,
+):
+    """Удалить пачку задач одной транзакцией"""
+    try:
+        return _bulk_result(await db_executor.run(task_service.delete_many, task_ids, mode))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# ========== GET /api/v1/tasks/export ==========
+@tasks_router.get("/export")
+async def export_tasks(format: ExportFormatModel = ExportFormatModel.NDJSON):
+    """Выгрузить все задачи потоком: NDJSON или JSON-массив"""
+    if format == ExportFormatModel.NDJSON:
+        media_type, filename = "application/x-ndjson", "tasks.ndjson"
+    else:
+        media_type, filename = "application/json", "tasks.json"
+    return StreamingResponse(
+        db_executor.iterate(task_service.export(format)),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+# ========== GET /api/v1/tasks/stats ==========
+@tasks_router.get("/stats", response_model=TaskStatsResponse)
+async def get_stats(response: Response, if_none_match: Optional[str] = Header(None)):
+    """Число задач всего и по приоритетам; ETag общий со списком задач"""
+    etag = list_etag(await db_executor.run(task_service.list_version))
+    if etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    stats = await db_executor.run(task_service.stats)
+    _set_etag(response, etag)
+    return _read_response(stats, response)
+
+# ========== GET /api/v1/tasks/changes ==========
+@tasks_router.get("/changes")
+async def stream_changes(
+    after: Optional[int] = Query(None, ge=0, description="seq последнего полученного события"),
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Поток изменений задач (Server-Sent Events): created, updated, deleted с seq в id.
+    Возобновление — с Last-Event-ID (приоритетнее) или after; без них — только новые события
+    """
+    if last_event_id is not None:
+        try:
+            after = int(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+    return StreamingResponse(
+        change_feed.subscribe(after),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # ========== GET /api/v1/tasks/{task_id} ==========
 @tasks_router.get("/{task_id}", response_model=TaskResponse)
-def get_task(task_id: int): 
+async def get_task(task_id: int, response: Response, if_none_match: Optional[str] = Header(None)):
     """Получить задачу по ID"""
+    if if_none_match:
+        version = await db_executor.run(task_service.get_version, task_id)
+        if version is not None and etag_matches(if_none_match, task_etag(task_id, version)):
+            return _not_modified(task_etag(task_id, version))
     try:
-        task = task_service.get(task_id)
-        if not task:
+        found = await db_executor.run(task_service.get_versioned, task_id)
+        if not found:
             raise HTTPException(status_code=404, detail="Task not found")
-        return task
+        task, version = found
+        _set_etag(response, task_etag(task_id, version))
+        return _read_response(task, response)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 # ========== PUT /api/v1/tasks/{task_id} ==========
 @tasks_router.put("/{task_id}", response_model=TaskResponse)
-def update_task(task_id: int, task_update: TaskModel):
-    """Обновить задачу"""
-    try:
-        updated = task_service.update(
-            task_id=task_id,
-            update_data=task_update
-        )
-        return updated
-    except ValueError as e:
-        if "not found" in str(e).lower():
-            raise HTTPException(status_code=404, detail=str(e))
-        else:
-            raise HTTPException(status_code=400, detail=str(e))
+async def update_task(
+    task_id: int,
+    task_update: TaskModel,
+    request: Request,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    idempotency_key: Optional[str] = Header(None),
+):
+    """
+    Обновить задачу; с If-Match — только если задача не менялась (иначе 412),
+    повтор с тем же Idempotency-Key возвращает сохранённый ответ
+    """
+    async def update():
+        try:
+            updated, version = await db_executor.run(
+                task_service.update_versioned,
+                task_id=task_id,
+                update_data=task_update,
+                expected_versions=if_match_versions(if_match, task_id) if if_match else None
+            )
+        except VersionConflictError as e:
+            raise HTTPException(status_code=412, detail=str(e))
+        except ValueError as e:
+            if "not found" in str(e).lower():
+                raise HTTPException(status_code=404, detail=str(e))
+            else:
+                raise HTTPException(status_code=400, detail=str(e))
+        return updated, {"ETag": task_etag(task_id, version)}
+
+    return await _idempotent(request, response, idempotency_key, task_update, update)
 
 # ========== DELETE /api/v1/tasks/{task_id} ==========
 @tasks_router.delete("/{task_id}")
-def delete_task(task_id: int):
-    """Удалить задачу"""
+async def delete_task(task_id: int, if_match: Optional[str] = Header(None)):
+    """Удалить задачу; с If-Match — только если задача не менялась (иначе 412)"""
     try:
-        task_service.delete(task_id)
+        await db_executor.run(
+            task_service.delete,
+            task_id,
+            expected_versions=if_match_versions(if_match, task_id) if if_match else None
+        )
         return {"message": "Task deleted successfully"}
+    except VersionConflictError as e:
+        raise HTTPException(status_code=412, detail=str(e))
     except ValueError as e:
         if "not found" in str(e).lower():
             raise HTTPException(status_code=404, detail=str(e))
@@ -83,6 +494,70 @@ def delete_task(task_id: int):
 
 app.include_router(tasks_router)
 
+
+def admin_token_valid(x_admin_token: Optional[str]) -> bool:
+    """Совпадает ли токен с ADMIN_TOKEN; без ADMIN_TOKEN — никогда"""
+    admin_token = os.getenv("ADMIN_TOKEN")
+    return bool(admin_token) and x_admin_token is not None and secrets.compare_digest(x_admin_token, admin_token)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Доступ к /admin только с заголовком X-Admin-Token, равным ADMIN_TOKEN; без ADMIN_TOKEN раздел выключен"""
+    if not os.getenv("ADMIN_TOKEN"):
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not admin_token_valid(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+admin_router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_admin)]
+)
+
+def _query_log():
+    query_log = task_service.db.query_log
+    if query_log is None:
+        raise HTTPException(status_code=404, detail="Slow query log is disabled, set DB_SLOW_QUERY_MS")
+    return query_log
+
+# ========== GET /admin/queries ==========
+@admin_router.get("/queries")
+async def top_queries(
+    limit: int = Query(20, ge=1, le=200),
+    sort: QuerySortModel = QuerySortModel.TOTAL_TIME,
+):
+    """Самые дорогие запросы к БД с последним снятым планом EXPLAIN QUERY PLAN"""
+    query_log = _query_log()
+    return {
+        "threshold_ms": query_log.threshold * 1000,
+        "queries": query_log.top(limit, sort.value),
+    }
+
+# ========== DELETE /admin/queries ==========
+@admin_router.delete("/queries")
+async def reset_queries():
+    """Сбросить статистику запросов"""
+    _query_log().reset()
+    return {"message": "Query statistics reset"}
+
+# ========== GET /admin/profiling ==========
+@admin_router.get("/profiling")
+async def get_profiling():
+    """Настройки выборочного профилирования и число профилированных запросов"""
+    return profiler.settings()
+
+# ========== PUT /admin/profiling ==========
+@admin_router.put("/profiling")
+async def set_profiling(settings: ProfilingModel):
+    """Изменить долю профилируемых запросов на лету (0 — выключить)"""
+    profiler.sample_rate = settings.sample_rate
+    return profiler.settings()
+
+app.include_router(admin_router)
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    from backend.server import log_config
+    # basicConfig здесь не дошёл бы до процесса, который запускает reload: настройки применяет uvicorn
+    uvicorn.run("backend.app:app", host="0.0.0.0", port=8000, reload=True, log_config=log_config("info"))
\ No newline at end of file
@@ -0,0 +1,146 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from backend.database import (
+    PureDatabase, Statement, delete_task_statement, insert_task_statement, update_task_statement
+)
+from backend.storage.base import TaskStorage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GROUP_COMMIT_MAX = 256
+
+_STOP = object()
+
+
+class WriteBatcherClosedError(RuntimeError):
+    """Пакетная запись остановлена, новые операции не принимаются"""
+
+
+class WriteBatcher:
+    """
+    Group commit для одиночных записей задач.
+
+    Вызывающий поток кладёт оператор в очередь и ждёт результат. Один поток-писатель
+    забирает операторы, пока не наберётся max_batch штук или не пройдёт max_delay
+    секунд с первого из них, и выполняет их одной транзакцией: одна фиксация (и один
+    fsync) на пачку вместо одной на запрос. Результат отдаётся вызывающему только
+    после COMMIT, поэтому подтверждённая запись так же надёжна, как и без пакетов.
+
+    Методы повторяют сигнатуры записи PureDatabase, и TaskService использует их вместо БД.
+    """
+
+    def __init__(self, db: PureDatabase, max_delay: float, max_batch: int = DEFAULT_GROUP_COMMIT_MAX):
+        if max_batch < 1:
+            raise ValueError("max_batch must be positive")
+        self.db = db
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.statements = 0
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def sql_insert_task(self, title: str, description: str, priority: str) -> int:
+        """Вставить задачу, вернуть ID"""
+        return self.submit(insert_task_statement(title, description, priority))[0]['id']
+
+    def sql_update_task(
+            self,
+            task_id: int,
+            title: str,
+            description: str,
+            priority: str,
+            expected_versions: Optional[Sequence[int]] = None
+            ) -> Optional[Dict[str, Any]]:
+        """Обновить задачу, вернуть строку с новой версией или None; без изменений версия прежняя"""
+        rows = self.submit(update_task_statement(task_id, title, description, priority, expected_versions))
+        return rows[0] if rows else None
+
+    def sql_delete_task(self, task_id: int, expected_versions: Optional[Sequence[int]] = None) -> bool:
+        """Удалить задачу, вернуть False, если её нет"""
+        return bool(self.submit(delete_task_statement(task_id, expected_versions)))
+
+    def submit(self, statement: Statement) -> List[Dict[str, Any]]:
+        """Поставить оператор в очередь и дождаться его фиксации"""
+        future: "Future[List[Dict[str, Any]]]" = Future()
+        with self._lock:
+            if self._closed:
+                raise WriteBatcherClosedError("Write batcher is closed")
+            self._queue.put((statement, future))
+        return future.result()
+
+    def close(self) -> None:
+        """Зафиксировать уже принятые операции и остановить поток-писатель"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        """Число пачек и операторов, средний размер пачки"""
+        return {
+            "batches": self.batches,
+            "statements": self.statements,
+            "avg_batch": self.statements / self.batches if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+        }
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+
+    def _commit(self, batch: List[Tuple[Statement, Future]]) -> None:
+        try:
+            results = self.db.sql_write_batch([statement for statement, _ in batch])
+        except BaseException as e:
+            logger.exception("Group commit of %d statements failed", len(batch))
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.statements += len(batch)
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+def batcher_from_env(db: TaskStorage) -> Optional[WriteBatcher]:
+    """
+    Group commit по настройкам окружения: GROUP_COMMIT_MS (0 — выключен) и GROUP_COMMIT_MAX.
+    """
+    delay_ms = float(os.getenv("GROUP_COMMIT_MS", "0"))
+    if delay_ms <= 0:
+        return None
+    if not isinstance(db, PureDatabase):
+        # Группировка коммитов нужна единственному писателю SQLite; другие движки пишут параллельно
+        logger.warning("GROUP_COMMIT_MS is ignored: group commit is only supported by SQLite storage")
+        return None
+    return WriteBatcher(db, delay_ms / 1000, int(os.getenv("GROUP_COMMIT_MAX", DEFAULT_GROUP_COMMIT_MAX)))
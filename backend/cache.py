@@ -0,0 +1,151 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, Iterable, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+# Отметка snapshot(): (корзина ключа или None для всего кэша, её номер инвалидации)
+Snapshot = Tuple[Optional[int], int]
+
+DEFAULT_INVALIDATION_BUCKETS = 1024
+
+
+class LRUCache(Generic[V]):
+    """
+    Потокобезопасный LRU-кэш с TTL и счётчиками попаданий, промахов и вытеснений.
+
+    Чтобы запись, прочитанная из БД до инвалидации, не попала в кэш после неё,
+    читатель берёт snapshot(key) до запроса и передаёт его в set(): если с тех пор
+    была инвалидация этого ключа, значение не кэшируется. Инвалидации считаются
+    по корзинам хэша ключа, так что запись одного ключа не сбрасывает чтения
+    остальных (кроме редких соседей по корзине).
+    """
+
+    def __init__(
+            self,
+            max_entries: int,
+            ttl: float,
+            clock: Callable[[], float] = time.monotonic,
+            buckets: int = DEFAULT_INVALIDATION_BUCKETS
+            ):
+        if max_entries < 1:
+            raise ValueError("max_entries must be positive")
+        if buckets < 1:
+            raise ValueError("buckets must be positive")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[V, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._invalidations = 0
+        self._generations = [0] * buckets
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """Значение по ключу или None, если его нет или истёк TTL"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def _bucket(self, key: Hashable) -> int:
+        return hash(key) % len(self._generations)
+
+    def snapshot(self, key: Optional[Hashable] = None) -> Snapshot:
+        """Отметка для set(): номер последней инвалидации ключа (без ключа — любой)"""
+        with self._lock:
+            if key is None:
+                return None, self._invalidations
+            bucket = self._bucket(key)
+            return bucket, self._generations[bucket]
+
+    def _stale(self, snapshot: Snapshot) -> bool:
+        bucket, generation = snapshot
+        if bucket is None:
+            return generation != self._invalidations
+        return generation != self._generations[bucket]
+
+    def _bump(self, buckets: Iterable[int]) -> None:
+        self._invalidations += 1
+        for bucket in buckets:
+            self._generations[bucket] += 1
+
+    def set(self, key: Hashable, value: V, snapshot: Optional[Snapshot] = None) -> bool:
+        """Положить значение; вернуть False, если с snapshot была инвалидация"""
+        with self._lock:
+            if snapshot is not None and self._stale(snapshot):
+                return False
+            self._entries[key] = (value, self._clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def write_through(self, key: Hashable, value: V, snapshot: Snapshot) -> bool:
+        """
+        Положить значение, записанное в БД после snapshot, и инвалидировать чтения, начатые до записи.
+        Если с snapshot была другая инвалидация — запись могла быть перекрыта: ключ удаляется, вернуть False
+        """
+        with self._lock:
+            stale = self._stale(snapshot)
+            self._bump((self._bucket(key),))
+            if stale:
+                self._entries.pop(key, None)
+                return False
+            self._entries[key] = (value, self._clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def invalidate(self, key: Hashable) -> None:
+        """Удалить ключ из кэша"""
+        self.invalidate_many((key,))
+
+    def invalidate_many(self, keys: Iterable[Hashable]) -> None:
+        """Удалить набор ключей из кэша"""
+        with self._lock:
+            keys = list(keys)
+            self._bump({self._bucket(key) for key in keys})
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Очистить кэш"""
+        with self._lock:
+            self._bump(range(len(self._generations)))
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Размер кэша и счётчики"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
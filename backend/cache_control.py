@@ -0,0 +1,51 @@
+"""
+Заголовок Cache-Control по маршруту.
+
+Политики задаются одной таблицей {шаблон маршрута: значение} для GET и HEAD;
+ответы на остальные методы получают no-store. Заголовок, который обработчик
+выставил сам, не меняется. Маршруты вне таблицы (документация) остаются без него.
+"""
+from typing import Mapping
+
+from starlette.datastructures import MutableHeaders
+
+# Ответ можно хранить, но перед использованием нужно сверить ETag через If-None-Match
+REVALIDATE = "no-cache"
+# Ответ нельзя хранить вовсе
+NO_STORE = "no-store"
+
+_SAFE_METHODS = frozenset(("GET", "HEAD"))
+
+
+def revalidate_after(max_age: int) -> str:
+    """Политика чтения с ETag: max_age секунд ответ используется без запроса, потом сверяется"""
+    if max_age <= 0:
+        return REVALIDATE
+    return f"private, max-age={max_age}"
+
+
+class CacheControlMiddleware:
+    """ASGI-middleware: Cache-Control по шаблону маршрута из policies, no-store для записи"""
+
+    def __init__(self, app, policies: Mapping[str, str]):
+        self.app = app
+        self.policies = policies
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_policy(message):
+            if message["type"] == "http.response.start":
+                # Маршрут известен только после разбора пути роутером
+                route = scope.get("route")
+                path = getattr(route, "path", None)
+                if path is not None:
+                    policy = self.policies.get(path) if scope["method"] in _SAFE_METHODS else NO_STORE
+                    headers = MutableHeaders(scope=message)
+                    if policy is not None and "cache-control" not in headers:
+                        headers["Cache-Control"] = policy
+            await send(message)
+
+        await self.app(scope, receive, send_with_policy)
@@ -0,0 +1,182 @@
+"""
+Поток изменений задач для GET /api/v1/tasks/changes (Server-Sent Events).
+
+События лежат в журнале изменений БД (task_changes), их пишут триггеры в той же
+транзакции, что и саму задачу. В каждом воркере один опросчик читает журнал после
+последнего разосланного seq и раздаёт события подписчикам: на всех подписчиков —
+один индексный запрос раз в CHANGES_POLL_INTERVAL секунд (по умолчанию 1), а запись
+через этот же воркер будит опросчик сразу. Записи других воркеров приходят
+с ближайшим опросом.
+
+Каждое событие — SSE с id, равным seq. Клиент возобновляет поток с места обрыва
+заголовком Last-Event-ID (браузерный EventSource шлёт его сам) или параметром after.
+Если события после курсора уже удалены из журнала (хранится CHANGES_RETENTION
+последних), приходит событие reset: клиенту нужно перечитать список задач и
+продолжить с его id.
+"""
+import asyncio
+import json
+import logging
+import os
+from typing import Any, AsyncIterator, Dict, Optional, Set, Tuple
+
+from backend.executor import db_executor
+from backend.task import CHANGES_BATCH_SIZE, TaskService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_HEARTBEAT = 15.0
+DEFAULT_RETENTION = 100_000
+DEFAULT_PRUNE_INTERVAL = 60.0
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+# Комментарий SSE: держит соединение живым через прокси и проверяет, что клиент ещё здесь
+KEEPALIVE = ": keepalive\n\n"
+
+# Событие в очереди подписчика: seq и готовый кадр SSE (сериализуется один раз на всех)
+Frame = Tuple[int, str]
+
+
+def format_event(change: Dict[str, Any]) -> str:
+    """Кадр SSE для события журнала изменений"""
+    return f"id: {change['seq']}\nevent: {change['op']}\ndata: {json.dumps(change, ensure_ascii=False)}\n\n"
+
+
+def format_reset(seq: int) -> str:
+    """Кадр SSE reset: курсор клиента устарел, продолжать нужно с seq после перечитывания списка"""
+    return f"id: {seq}\nevent: reset\ndata: {json.dumps({'seq': seq})}\n\n"
+
+
+class _Subscriber:
+    def __init__(self, seq: int):
+        # Последнее отданное клиенту событие
+        self.seq = seq
+        self.queue: asyncio.Queue[Frame] = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        # Очередь переполнялась или подписчик только пришёл: события дочитываются из журнала
+        self.lagging = True
+
+
+class ChangeFeed:
+    def __init__(
+            self,
+            service: TaskService,
+            poll_interval: Optional[float] = None,
+            heartbeat: float = DEFAULT_HEARTBEAT,
+            batch_size: int = CHANGES_BATCH_SIZE
+            ):
+        self.service = service
+        if poll_interval is None:
+            poll_interval = float(os.getenv("CHANGES_POLL_INTERVAL", DEFAULT_POLL_INTERVAL))
+        self.poll_interval = poll_interval
+        self.heartbeat = heartbeat
+        self.batch_size = batch_size
+        self._subscribers: Set[_Subscriber] = set()
+        self._poller: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        # Последнее разосланное подписчикам событие
+        self._seq = 0
+
+    def notify(self) -> None:
+        """Разбудить опросчик: вызывается TaskService после записи из потока исполнителя"""
+        loop, wake = self._loop, self._wake
+        if self._poller is None or loop is None or wake is None or wake.is_set():
+            return
+        try:
+            loop.call_soon_threadsafe(wake.set)
+        except RuntimeError:
+            # Цикл событий уже закрыт
+            pass
+
+    async def subscribe(self, after: Optional[int] = None) -> AsyncIterator[str]:
+        """Кадры SSE с событиями после seq after (без after — только новые) до отключения клиента"""
+        _, last = await db_executor.run(self.service.change_bounds)
+        subscriber = _Subscriber(last if after is None else after)
+        self._subscribers.add(subscriber)
+        if self._poller is None:
+            self._seq = last
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._poller = asyncio.create_task(self._poll())
+        getter: Optional[asyncio.Future] = None
+        try:
+            while True:
+                if subscriber.lagging:
+                    subscriber.lagging = False
+                    async for frame in self._catch_up(subscriber):
+                        yield frame
+                if getter is None:
+                    getter = asyncio.ensure_future(subscriber.queue.get())
+                # Ожидание без отмены get(): событие, пришедшее одновременно с таймаутом, не теряется
+                done, _ = await asyncio.wait({getter}, timeout=self.heartbeat)
+                if not done:
+                    yield KEEPALIVE
+                    continue
+                seq, frame = getter.result()
+                getter = None
+                if seq > subscriber.seq:
+                    subscriber.seq = seq
+                    yield frame
+        finally:
+            if getter is not None:
+                getter.cancel()
+            self._subscribers.discard(subscriber)
+
+    async def _catch_up(self, subscriber: _Subscriber) -> AsyncIterator[str]:
+        """Дочитать из журнала всё после курсора подписчика; reset, если курсора там уже нет"""
+        first, last = await db_executor.run(self.service.change_bounds)
+        if subscriber.seq > last or (first and subscriber.seq < first - 1):
+            subscriber.seq = last
+            yield format_reset(last)
+        while True:
+            changes = await db_executor.run(self.service.changes, subscriber.seq, self.batch_size)
+            for change in changes:
+                subscriber.seq = change["seq"]
+                yield format_event(change)
+            if len(changes) < self.batch_size:
+                return
+
+    async def _poll(self) -> None:
+        """Читать журнал и раздавать события, пока есть подписчики"""
+        try:
+            while self._subscribers:
+                self._wake.clear()
+                try:
+                    changes = await db_executor.run(self.service.changes, self._seq, self.batch_size)
+                except Exception:
+                    logger.exception("Failed to read task changes")
+                    changes = []
+                for change in changes:
+                    self._broadcast((change["seq"], format_event(change)))
+                    self._seq = change["seq"]
+                if len(changes) == self.batch_size:
+                    continue
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._poller = None
+
+    def _broadcast(self, frame: Frame) -> None:
+        for subscriber in self._subscribers:
+            if subscriber.lagging:
+                continue
+            try:
+                subscriber.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                # Медленный клиент не тормозит остальных: он дочитает пропущенное из журнала
+                subscriber.lagging = True
+
+    async def prune_periodically(self, keep: int, interval: float = DEFAULT_PRUNE_INTERVAL) -> None:
+        """Раз в interval секунд оставлять в журнале keep последних событий"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                pruned = await db_executor.run(self.service.prune_changes, keep)
+            except Exception:
+                logger.exception("Failed to prune task changes")
+                continue
+            if pruned:
+                logger.debug("Pruned %d task changes", pruned)
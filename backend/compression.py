@@ -0,0 +1,157 @@
+"""
+Сжатие ответов API: brotli или gzip по Accept-Encoding клиента.
+
+Список задач в JSON на треть и больше состоит из повторяющихся ключей title,
+description, priority — такие ответы сжимаются в разы. Настройки окружения:
+COMPRESSION_ENCODINGS — допустимые кодировки в порядке предпочтения сервера
+(по умолчанию "br,gzip"; пусто — сжатие выключено), COMPRESSION_MIN_SIZE — ответы
+меньше стольких байт уходят как есть (по умолчанию 1024: такой ответ и так помещается
+в один TCP-сегмент), COMPRESSION_GZIP_LEVEL (по умолчанию 6) и COMPRESSION_BROTLI_QUALITY
+(по умолчанию 5). На странице из 1000 задач оба уровня сжимают ~70 КБ примерно в 9 раз
+за 1–2 мс CPU; gzip 9 и brotli 11 выигрывают 5–20% размера ценой в 3 и 100 раз большего
+CPU (см. benchmarks/bench_compression.py).
+
+Brotli — необязательная зависимость (pip install brotli); без неё используется gzip.
+Потоковые ответы (выгрузка) сжимаются по частям, поток изменений (text/event-stream)
+не сжимается: буферизация задержала бы события. У сжатого ответа к сильному ETag
+добавляется суффикс кодировки ("task-1-v2-gzip"): по RFC 9110 разные байты не могут
+делить один сильный валидатор. If-None-Match и If-Match сравнивают ETag без суффикса,
+а ответ 304 повторяет ETag из If-None-Match для кодировки, выбранной клиентом.
+"""
+import logging
+import os
+from typing import Optional, Sequence, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+
+from backend.etag import with_coding
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENCODINGS = ("br", "gzip")
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 5
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app, minimum_size: int, quality: int = DEFAULT_BROTLI_QUALITY):
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        # flush после каждой части потока: клиент получает данные, не дожидаясь конца ответа
+        compressed = self.compressor.process(body)
+        return compressed + (self.compressor.flush() if more_body else self.compressor.finish())
+
+
+def negotiate(accept_encoding: str, encodings: Sequence[str]) -> Optional[str]:
+    """Кодировка из encodings с наибольшим q в Accept-Encoding (при равенстве — первая в encodings)"""
+    weights = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip()] = q
+    best, best_q = None, 0.0
+    for encoding in encodings:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressionMiddleware:
+    """ASGI-middleware: сжимает ответы от minimum_size байт первой подходящей кодировкой из encodings"""
+
+    def __init__(
+            self,
+            app,
+            encodings: Sequence[str] = DEFAULT_ENCODINGS,
+            minimum_size: int = DEFAULT_MIN_SIZE,
+            gzip_level: int = DEFAULT_GZIP_LEVEL,
+            brotli_quality: int = DEFAULT_BROTLI_QUALITY
+            ):
+        unknown = set(encodings) - set(DEFAULT_ENCODINGS)
+        if unknown:
+            raise ValueError(f"Unsupported encodings: {', '.join(sorted(unknown))}")
+        self.app = app
+        self.encodings: Tuple[str, ...] = tuple(
+            encoding for encoding in encodings if encoding != "br" or brotli is not None
+        )
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = negotiate(request_headers.get("accept-encoding", ""), self.encodings)
+        if_none_match = request_headers.get("if-none-match", "")
+
+        async def send_tagged(message):
+            if message["type"] == "http.response.start":
+                _tag_representation(message, encoding, if_none_match)
+            await send(message)
+
+        if encoding == "br":
+            responder = BrotliResponder(self.app, self.minimum_size, self.brotli_quality)
+        elif encoding == "gzip":
+            responder = GZipResponder(self.app, self.minimum_size, compresslevel=self.gzip_level)
+        else:
+            # Без сжатия, но с Vary: Accept-Encoding для ответов, которые могли бы сжиматься
+            responder = IdentityResponder(self.app, self.minimum_size)
+        await responder(scope, receive, send_tagged)
+
+
+def _tag_representation(message, encoding: Optional[str], if_none_match: str) -> None:
+    """
+    Суффикс кодировки к ETag сжатого ответа; для 304 — если клиент прислал в If-None-Match
+    ETag сжатого представления, ответ подтверждает именно его
+    """
+    headers = MutableHeaders(raw=message["headers"])
+    etag = headers.get("etag")
+    if etag is None:
+        return
+    coding = headers.get("content-encoding")
+    if coding is not None:
+        headers["etag"] = with_coding(etag, coding)
+    elif message["status"] == 304 and encoding is not None:
+        tagged = with_coding(etag, encoding)
+        if tagged in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+            headers["etag"] = tagged
+
+
+def compression_from_env() -> dict:
+    """Параметры CompressionMiddleware по настройкам окружения (см. описание модуля)"""
+    configured = os.getenv("COMPRESSION_ENCODINGS")
+    encodings = [
+        encoding.strip().lower()
+        for encoding in (configured if configured is not None else ",".join(DEFAULT_ENCODINGS)).split(",")
+        if encoding.strip()
+    ]
+    # Предупреждать, только если brotli запрошен явно: по умолчанию молча остаётся gzip
+    if configured is not None and "br" in encodings and brotli is None:
+        logger.warning("brotli is not installed, responses are compressed with gzip only: pip install brotli")
+    return {
+        "encodings": encodings,
+        "minimum_size": int(os.getenv("COMPRESSION_MIN_SIZE", DEFAULT_MIN_SIZE)),
+        "gzip_level": int(os.getenv("COMPRESSION_GZIP_LEVEL", DEFAULT_GZIP_LEVEL)),
+        "brotli_quality": int(os.getenv("COMPRESSION_BROTLI_QUALITY", DEFAULT_BROTLI_QUALITY)),
+    }
@@ -0,0 +1,23 @@
+import base64
+import json
+from typing import Any, List, Sequence, Tuple
+
+
+def encode_cursor(sort: str, key: Sequence[Any]) -> str:
+    """Упаковать позицию выборки в непрозрачную строку курсора"""
+    payload = json.dumps({"s": sort, "k": list(key)}, separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, List[Any]]:
+    """Распаковать курсор, вернуть (сортировка, ключ последней записи)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        sort, key = payload["s"], payload["k"]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(sort, str) or not isinstance(key, list) \
+            or not all(isinstance(value, (str, int, float)) for value in key):
+        raise ValueError("Invalid cursor")
+    return sort, key
@@ -1,105 +1,630 @@
+import functools
+import os
+import re
+import time
+from contextlib import contextmanager
+from pathlib import Path
+import json
+from typing import Iterator, List, Optional, Dict, Any, Sequence, Set, Tuple, Union
+
 import pysqlite3 as sqlite3
-from typing import List, Optional, Dict, Any  
+
+from backend.metrics import timed_query
+from backend.migrations import MIGRATIONS, Migrator, migration_lock
+from backend.pool import ConnectionPool
+from backend.querylog import QueryLog, query_log_from_env
+
+
+DEFAULT_POOL_SIZE = 40
+DEFAULT_POOL_TIMEOUT = 30.0
+DEFAULT_STORAGE_PROFILE = "wal"
+
+# Профили хранения: PRAGMA применяются к каждому соединению пула в указанном порядке.
+# busy_timeout идёт первым, чтобы переключение journal_mode ждало блокировку, а не падало.
+STORAGE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "safe": {
+        "busy_timeout": 5000,
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+    },
+    "wal": {
+        "busy_timeout": 5000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,
+        "temp_store": "MEMORY",
+    },
+}
+
+# PRAGMA, которые меняют файл БД или касаются только записи: на соединениях читателей не применяются
+_WRITER_PRAGMAS = frozenset({"journal_mode", "synchronous"})
+
+# Колонки ключа keyset-пагинации для каждой сортировки; id всегда последний,
+# чтобы ключ был уникальным
+SORT_KEYS: Dict[str, Tuple[str, ...]] = {
+    "id": ("id",),
+    "title": ("title", "id"),
+}
+
+# Колонки задачи в ответах API; служебная колонка version читается только там, где нужна для ETag
+TASK_COLUMNS = "id, title, description, priority"
+
+# Колонки события журнала изменений; у удаления title, description и priority — NULL
+CHANGE_COLUMNS = "seq, op, task_id, version, title, description, priority"
+
+# Колонки idempotency_keys, которые читают хранилища
+IDEMPOTENCY_COLUMNS = "key, fingerprint, status, body, headers, expires_at"
+
+_FTS_TOKEN = re.compile(r"\w+")
+_PRIORITIES = frozenset({"low", "medium", "high"})
+_SYNCHRONOUS_NAMES = {0: "OFF", 1: "NORMAL", 2: "FULL", 3: "EXTRA"}
+_TEMP_STORE_NAMES = {0: "DEFAULT", 1: "FILE", 2: "MEMORY"}
+
+
+def search_tokens(text: str) -> List[str]:
+    """Слова поискового запроса; последнее ищется как префикс"""
+    tokens = _FTS_TOKEN.findall(text)
+    if not tokens:
+        raise ValueError("Search query must contain at least one word")
+    return tokens
+
+
+def _fts_query(text: str) -> str:
+    """Запрос FTS5 из пользовательского текста: слова в кавычках, последнее — префикс"""
+    return " ".join(f'"{token}"' for token in search_tokens(text)) + "*"
+
+
+def stats_drift(stored: Dict[str, int], actual: Dict[str, int]) -> Dict[str, Tuple[int, int]]:
+    """Расхождения счётчиков задач с пересчётом: {priority: (в счётчике, на самом деле)}"""
+    return {
+        priority: (stored.get(priority, 0), actual.get(priority, 0))
+        for priority in stored.keys() | actual.keys()
+        if stored.get(priority, 0) != actual.get(priority, 0)
+    }
+
+
+def validate_task_rows(rows: Sequence[Tuple[str, str, str]]) -> None:
+    """
+    Проверить всю пачку (title, description, priority) до записи: отклонённая пачка
+    не должна ни частично вставиться, ни занять ID из последовательности
+    """
+    for index, (title, description, priority) in enumerate(rows):
+        if not isinstance(title, str) or not title:
+            raise ValueError(f"Row {index}: title must be a non-empty string")
+        if description is not None and not isinstance(description, str):
+            raise ValueError(f"Row {index}: description must be a string")
+        if priority not in _PRIORITIES:
+            raise ValueError(f"Row {index}: unknown priority '{priority}'")
+
+
+# Одиночный оператор записи с RETURNING: (SQL, параметры)
+Statement = Tuple[str, tuple]
+
+
+def insert_task_statement(title: str, description: str, priority: str) -> Statement:
+    """Вставка задачи, RETURNING id"""
+    return (
+        'INSERT INTO tasks (title, description, priority) VALUES (?, ?, ?) RETURNING id',
+        (title, description if description else "", priority)
+    )
+
+
+# Версия растёт, только если строка действительно меняется: строку без изменений
+# оператор переписывает с прежней версией, и триггеры версии таблицы и журнала
+# изменений (WHEN new.version IS NOT old.version) на ней не срабатывают
+_VERSION_BUMP = 'version = version + ((title, description, priority) IS NOT ({}, {}, {}))'
+
+
+def update_task_statement(
+        task_id: int,
+        title: str,
+        description: str,
+        priority: str,
+        expected_versions: Optional[Sequence[int]] = None
+        ) -> Statement:
+    """
+    Обновление задачи (условное при expected_versions), RETURNING строка с новой версией.
+    Если в строке уже эти значения, версия остаётся прежней
+    """
+    values = (title, description if description else "", priority)
+    query = (f'UPDATE tasks SET title = ?, description = ?, priority = ?, {_VERSION_BUMP.format("?", "?", "?")} '
+             'WHERE id = ?')
+    params: List[Any] = [*values, *values, task_id]
+    if expected_versions is not None:
+        query += ' AND version IN (SELECT value FROM json_each(?))'
+        params.append(json.dumps(list(expected_versions)))
+    return f'{query} RETURNING {TASK_COLUMNS}, version', tuple(params)
+
+
+def delete_task_statement(task_id: int, expected_versions: Optional[Sequence[int]] = None) -> Statement:
+    """Удаление задачи (условное при expected_versions), RETURNING id"""
+    query = 'DELETE FROM tasks WHERE id = ?'
+    params: List[Any] = [task_id]
+    if expected_versions is not None:
+        query += ' AND version IN (SELECT value FROM json_each(?))'
+        params.append(json.dumps(list(expected_versions)))
+    return f'{query} RETURNING id', tuple(params)
 
 
 class PureDatabase:
-    def __init__(self, db_path: str = "tasks.db"):
+    def __init__(
+            self,
+            db_path: str = "tasks.db",
+            pool_size: Optional[int] = None,
+            pool_timeout: Optional[float] = None,
+            storage_profile: Optional[str] = None,
+            pragmas: Optional[Dict[str, Any]] = None,
+            slow_query_ms: Optional[float] = None,
+            split_reads: Optional[bool] = None
+            ):
         self.db_path = db_path
-        self._create_table()
-    
-    def _create_table(self):
-        """Создать таблицу если не существует"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                description TEXT NOT NULL,
-                priority TEXT NOT NULL DEFAULT 'medium' 
+        # Журнал медленных запросов (см. backend/querylog.py); None — выключен
+        self.query_log: Optional[QueryLog] = query_log_from_env(slow_query_ms)
+        if storage_profile is None:
+            storage_profile = os.getenv("DB_STORAGE_PROFILE", DEFAULT_STORAGE_PROFILE)
+        if storage_profile not in STORAGE_PROFILES:
+            raise ValueError(
+                f"Unknown storage profile '{storage_profile}', expected one of {sorted(STORAGE_PROFILES)}"
             )
-        ''')
-        conn.commit()
-        conn.close()
-
-    def _get_connection(self) -> sqlite3.Connection:
-        """Получить соединение с БД"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  
+        self.storage_profile = storage_profile
+        self.pragmas = {**STORAGE_PROFILES[storage_profile], **(pragmas or {})}
+        if pool_size is None:
+            pool_size = int(os.getenv("DB_POOL_SIZE", DEFAULT_POOL_SIZE))
+        if pool_timeout is None:
+            pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", DEFAULT_POOL_TIMEOUT))
+        if split_reads is None:
+            split_reads = os.getenv("DB_SPLIT_READS", "1").lower() not in ("0", "false", "no", "off")
+        # Разделение чтения и записи: читатели — пул соединений mode=ro с query_only,
+        # все записи — через одно соединение писателя. В WAL читатель видит снимок
+        # на момент начала запроса и не ждёт писателя, а записи выстраиваются в очередь
+        # пула писателя вместо повторов по SQLITE_BUSY. У :memory: у каждого соединения
+        # своя пустая БД, поэтому там один общий пул из одного соединения.
+        if db_path == ":memory:":
+            pool_size = 1
+        self.split_reads = split_reads and db_path != ":memory:"
+        self._write_pool = ConnectionPool(
+            self._get_connection,
+            max_size=1 if self.split_reads else pool_size,
+            timeout=pool_timeout
+        )
+        self._migrate()
+        self._pool = ConnectionPool(
+            functools.partial(self._get_connection, read_only=True),
+            max_size=pool_size,
+            timeout=pool_timeout
+        ) if self.split_reads else self._write_pool
+
+    def _migrate(self) -> None:
+        """Привести схему к последней версии (см. backend/migrations) под межпроцессной блокировкой"""
+        with migration_lock(self.db_path), self._write_pool.connection() as conn:
+            Migrator(conn).migrate(MIGRATIONS)
+
+    def _get_connection(self, read_only: bool = False) -> sqlite3.Connection:
+        """Открыть новое соединение с БД (фабрика для пулов); read_only — mode=ro и query_only"""
+        conn = sqlite3.connect(
+            f"{Path(self.db_path).absolute().as_uri()}?mode=ro" if read_only else self.db_path,
+            isolation_level=None,
+            check_same_thread=False,
+            uri=read_only
+        )
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            if not (read_only and name in _WRITER_PRAGMAS):
+                conn.execute(f"PRAGMA {name} = {value}")
+        if read_only:
+            conn.execute("PRAGMA query_only = 1")
         return conn
-    
-    
-    def _fetch_all(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]: 
-        """Выполнить запрос и получить все результаты"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        cursor.execute(query, params)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Выполнить блок в одной транзакции записи на соединении писателя"""
+        with self._write_pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield cursor
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def close(self) -> None:
+        """Закрыть пулы соединений"""
+        self._pool.close()
+        self._write_pool.close()
+
+    def pool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Текущее состояние пулов читателей и писателя"""
+        return {"read": self._pool.stats(), "write": self._write_pool.stats()}
+
+    def storage_settings(self) -> Dict[str, Any]:
+        """Фактические значения PRAGMA на соединении писателя"""
+        with self._write_pool.connection() as conn:
+            settings = {
+                name: conn.execute(f"PRAGMA {name}").fetchone()[0]
+                for name in ("journal_mode", "synchronous", "mmap_size",
+                             "cache_size", "busy_timeout", "temp_store")
+            }
+        settings["synchronous"] = _SYNCHRONOUS_NAMES.get(settings["synchronous"], settings["synchronous"])
+        settings["temp_store"] = _TEMP_STORE_NAMES.get(settings["temp_store"], settings["temp_store"])
+        return {"engine": "sqlite", "profile": self.storage_profile, "split_reads": self.split_reads, **settings}
+
+    def _execute(
+            self,
+            target: Union[sqlite3.Connection, sqlite3.Cursor],
+            query: str,
+            params: Any = (),
+            many: bool = False
+            ) -> List[sqlite3.Row]:
+        """Выполнить запрос (executemany при many) и прочитать строки; при включённом журнале — с замером"""
+        if self.query_log is None:
+            if many:
+                return target.executemany(query, params).fetchall()
+            return target.execute(query, params).fetchall()
+        started = time.perf_counter()
+        cursor = target.executemany(query, params) if many else target.execute(query, params)
         rows = cursor.fetchall()
-        conn.close()
-        return [dict(row) for row in rows]  
-    
-    def _fetch_one(self, query: str, params: tuple = ()) -> Optional[Dict[str, Any]]:  
+        elapsed = time.perf_counter() - started
+        conn = target if isinstance(target, sqlite3.Connection) else target.connection
+        if many:
+            # План и параметры в логе — по первому набору параметров
+            params = params[0] if params else ()
+        self.query_log.record(conn, query, params, elapsed, max(cursor.rowcount, 0) if many else len(rows))
+        return rows
+
+    def _fetch_all(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        """Выполнить запрос и получить все результаты"""
+        with self._pool.connection() as conn:
+            rows = self._execute(conn, query, params)
+        return [dict(row) for row in rows]
+
+    def _fetch_one(self, query: str, params: tuple = ()) -> Optional[Dict[str, Any]]:
         """Выполнить запрос и получить одну запись"""
-        conn = self._get_connection()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        row = cursor.fetchone()
-        conn.close()
-        return dict(row) if row else None  
-    
-    
-    def sql_insert_task(self, title: str, description: str, priority: str) -> int: 
+        with self._pool.connection() as conn:
+            rows = self._execute(conn, query, params)
+        return dict(rows[0]) if rows else None
+
+    def _write_returning(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        """Выполнить одиночный оператор записи с RETURNING: один оператор — одна транзакция"""
+        with self._write_pool.connection() as conn:
+            rows = self._execute(conn, query, params)
+        return [dict(row) for row in rows]
+
+    @timed_query("write_batch")
+    def sql_write_batch(self, statements: Sequence[Statement]) -> List[Union[List[Dict[str, Any]], Exception]]:
+        """
+        Выполнить пачку одиночных операторов записи одной транзакцией (group commit).
+        Каждый оператор идёт в своей SAVEPOINT: ошибка одного не откатывает остальные.
+        Вернуть для каждого строки RETURNING или исключение.
+        """
+        results: List[Union[List[Dict[str, Any]], Exception]] = []
+        with self._transaction() as cursor:
+            for query, params in statements:
+                cursor.execute("SAVEPOINT batch_item")
+                try:
+                    rows = [dict(row) for row in self._execute(cursor, query, params)]
+                except sqlite3.Error as e:
+                    cursor.execute("ROLLBACK TO batch_item")
+                    results.append(e)
+                else:
+                    results.append(rows)
+                cursor.execute("RELEASE batch_item")
+        return results
+
+    @timed_query("insert_task")
+    def sql_insert_task(self, title: str, description: str, priority: str) -> int:
         """Вставить задачу в БД, вернуть ID"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-    
-        cursor.execute(
-            'INSERT INTO tasks (title, description, priority) VALUES (?, ?, ?)',
-            (title, description if description else "", priority)  
+        rows = self._write_returning(*insert_task_statement(title, description, priority))
+        return rows[0]['id']
+
+    @timed_query("insert_tasks")
+    def sql_insert_tasks(self, rows: Sequence[Tuple[str, str, str]]) -> List[int]:
+        """Вставить пачку задач одной транзакцией, вернуть ID в порядке rows"""
+        if not rows:
+            return []
+        validate_task_rows(rows)
+        with self._transaction() as cursor:
+            self._execute(
+                cursor,
+                'INSERT INTO tasks (title, description, priority) VALUES (?, ?, ?)',
+                [(title, description if description else "", priority) for title, description, priority in rows],
+                many=True
+            )
+            # AUTOINCREMENT под BEGIN IMMEDIATE выдаёт ID подряд, последний лежит в sqlite_sequence
+            last_id = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'tasks'").fetchone()[0]
+        return list(range(last_id - len(rows) + 1, last_id + 1))
+
+    @timed_query("update_tasks")
+    def sql_update_tasks(
+            self,
+            rows: Sequence[Tuple[int, Optional[str], Optional[str], Optional[str]]],
+            atomic: bool = True
+            ) -> Set[int]:
+        """
+        Частично обновить пачку задач (id, title, description, priority) одной транзакцией;
+        None оставляет поле без изменений. Вернуть множество найденных ID.
+        В режиме atomic при отсутствии хотя бы одного ID ничего не меняется.
+        """
+        if not rows:
+            return set()
+        with self._transaction() as cursor:
+            existing = self._existing_ids(cursor, [row[0] for row in rows])
+            if atomic and len(existing) < len({row[0] for row in rows}):
+                return existing
+            self._execute(
+                cursor,
+                'UPDATE tasks SET title = COALESCE(?, title), description = COALESCE(?, description), '
+                'priority = COALESCE(?, priority), '
+                f'{_VERSION_BUMP.format("COALESCE(?, title)", "COALESCE(?, description)", "COALESCE(?, priority)")} '
+                'WHERE id = ?',
+                [(title, description, priority, title, description, priority, task_id)
+                 for task_id, title, description, priority in rows if task_id in existing],
+                many=True
+            )
+        return existing
+
+    @timed_query("delete_tasks")
+    def sql_delete_tasks(self, task_ids: Sequence[int], atomic: bool = True) -> Set[int]:
+        """
+        Удалить пачку задач одной транзакцией, вернуть множество найденных ID.
+        В режиме atomic при отсутствии хотя бы одного ID ничего не удаляется.
+        """
+        if not task_ids:
+            return set()
+        with self._transaction() as cursor:
+            existing = self._existing_ids(cursor, task_ids)
+            if atomic and len(existing) < len(set(task_ids)):
+                return existing
+            self._execute(
+                cursor,
+                'DELETE FROM tasks WHERE id IN (SELECT value FROM json_each(?))',
+                (json.dumps(sorted(existing)),)
+            )
+        return existing
+
+    def _existing_ids(self, cursor: sqlite3.Cursor, task_ids: Sequence[int]) -> Set[int]:
+        rows = self._execute(
+            cursor,
+            'SELECT id FROM tasks WHERE id IN (SELECT value FROM json_each(?))',
+            (json.dumps(list(task_ids)),)
         )
-        task_id = cursor.lastrowid  
-    
-        conn.commit()
-        conn.close()
-    
-        return task_id  
-    
+        return {row[0] for row in rows}
+
+    @timed_query("select_all_tasks")
     def sql_select_all_tasks(self) -> List[Dict[str, Any]]:
         """Выбрать все задачи"""
-        return self._fetch_all('SELECT * FROM tasks ORDER BY id')
-    
-    def sql_select_task_by_id(self, task_id: int) -> Optional[Dict[str, Any]]:  
-        """Выбрать задачу по ID"""
-        return self._fetch_one('SELECT * FROM tasks WHERE id = ?', (task_id,))
-    
-    def sql_update_task(self, task_id: int, title: str, description: str, priority: str) -> bool:
-        """Обновить задачу"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            'UPDATE tasks SET title = ?, description = ?, priority = ? WHERE id = ?',
-            (title, description if description else "", priority, task_id)
+        return self._fetch_all(f'SELECT {TASK_COLUMNS} FROM tasks ORDER BY id')
+
+    @timed_query("select_tasks_page")
+    def sql_select_tasks_page(
+            self,
+            limit: int,
+            after: Optional[Sequence[Any]] = None,
+            priority: Optional[str] = None,
+            sort: str = "id",
+            descending: bool = False
+            ) -> List[Dict[str, Any]]:
+        """Выбрать страницу задач после ключа after (keyset-пагинация)"""
+        columns = SORT_KEYS[sort]
+        direction = "DESC" if descending else "ASC"
+        conditions = []
+        params: List[Any] = []
+        if priority is not None:
+            conditions.append("priority = ?")
+            params.append(priority)
+        if after is not None:
+            if len(after) != len(columns):
+                raise ValueError("Invalid cursor")
+            placeholders = ", ".join("?" for _ in columns)
+            conditions.append(f"({', '.join(columns)}) {'<' if descending else '>'} ({placeholders})")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        order_by = ", ".join(f"{column} {direction}" for column in columns)
+        params.append(limit)
+        return self._fetch_all(
+            f"SELECT {TASK_COLUMNS} FROM tasks {where}ORDER BY {order_by} LIMIT ?",
+            tuple(params)
+        )
+
+    def iter_tasks(self, batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """Потоково выбрать все задачи пачками по batch_size строк; в WAL — из одного снимка БД"""
+        with self._pool.connection() as conn:
+            cursor = conn.execute(f'SELECT {TASK_COLUMNS} FROM tasks ORDER BY id')
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield [dict(row) for row in rows]
+
+    @timed_query("search_tasks")
+    def sql_search_tasks(
+            self,
+            text: str,
+            limit: int,
+            ranked: bool = True,
+            after_id: Optional[int] = None,
+            after_rank: Optional[float] = None
+            ) -> List[Dict[str, Any]]:
+        """
+        Найти задачи, в title или description которых есть все слова из text;
+        последнее слово ищется как префикс. ranked — лучшие совпадения первыми
+        (по rank bm25, меньше — лучше; строки с ключом rank, страницы после
+        (after_rank, after_id)), иначе по возрастанию ID (страницы после after_id).
+        """
+        conditions = ["tasks_fts MATCH ?"]
+        params: List[Any] = [_fts_query(text)]
+        if ranked:
+            columns = ", tasks_fts.rank AS rank"
+            order_by = "tasks_fts.rank, t.id"
+            if after_id is not None:
+                conditions.append("(tasks_fts.rank, t.id) > (?, ?)")
+                params.extend((after_rank, after_id))
+        else:
+            # Порядок rowid FTS5 отдаёт потоково, без ранжирования всех совпадений
+            columns = ""
+            order_by = "tasks_fts.rowid"
+            if after_id is not None:
+                conditions.append("tasks_fts.rowid > ?")
+                params.append(after_id)
+        params.append(limit)
+        return self._fetch_all(
+            f'''
+                SELECT t.id, t.title, t.description, t.priority{columns}
+                FROM tasks_fts JOIN tasks t ON t.id = tasks_fts.rowid
+                WHERE {" AND ".join(conditions)}
+                ORDER BY {order_by}
+                LIMIT ?
+            ''',
+            tuple(params)
+        )
+
+    @timed_query("select_task_by_id")
+    def sql_select_task_by_id(self, task_id: int) -> Optional[Dict[str, Any]]:
+        """Выбрать задачу по ID вместе с её версией"""
+        return self._fetch_one(f'SELECT {TASK_COLUMNS}, version FROM tasks WHERE id = ?', (task_id,))
+
+    @timed_query("select_task_version")
+    def sql_select_task_version(self, task_id: int) -> Optional[int]:
+        """Версия задачи или None, если задачи нет"""
+        row = self._fetch_one('SELECT version FROM tasks WHERE id = ?', (task_id,))
+        return row['version'] if row else None
+
+    @timed_query("select_tasks_version")
+    def sql_select_tasks_version(self) -> int:
+        """Версия таблицы задач: растёт при каждой вставке, изменении и удалении"""
+        row = self._fetch_one("SELECT version FROM table_versions WHERE name = 'tasks'")
+        return row['version'] if row else 0
+
+    @timed_query("update_task")
+    def sql_update_task(
+            self,
+            task_id: int,
+            title: str,
+            description: str,
+            priority: str,
+            expected_versions: Optional[Sequence[int]] = None
+            ) -> Optional[Dict[str, Any]]:
+        """
+        Обновить задачу, вернуть обновлённую строку с новой версией или None, если задачи нет.
+        С expected_versions строка меняется, только если её версия входит в этот набор.
+        Если в задаче уже эти значения, версия остаётся прежней.
+        """
+        rows = self._write_returning(
+            *update_task_statement(task_id, title, description, priority, expected_versions)
+        )
+        return rows[0] if rows else None
+
+    @timed_query("delete_task")
+    def sql_delete_task(self, task_id: int, expected_versions: Optional[Sequence[int]] = None) -> bool:
+        """Удалить задачу, вернуть False, если задачи нет или её версия не входит в expected_versions"""
+        return bool(self._write_returning(*delete_task_statement(task_id, expected_versions)))
+
+    @timed_query("select_changes")
+    def sql_select_changes(self, after: int, limit: int) -> List[Dict[str, Any]]:
+        """События журнала изменений с seq больше after по возрастанию seq"""
+        return self._fetch_all(
+            f'SELECT {CHANGE_COLUMNS} FROM task_changes WHERE seq > ? ORDER BY seq LIMIT ?',
+            (after, limit)
+        )
+
+    @timed_query("select_change_bounds")
+    def sql_select_change_bounds(self) -> Tuple[int, int]:
+        """seq самого старого и самого нового события в журнале; (0, 0), если журнал пуст"""
+        # Отдельные подзапросы: MIN и MAX в одном SELECT SQLite считает полным проходом
+        row = self._fetch_one(
+            'SELECT (SELECT MIN(seq) FROM task_changes) AS first, (SELECT MAX(seq) FROM task_changes) AS last'
+        )
+        return row['first'] or 0, row['last'] or 0
+
+    @timed_query("prune_changes")
+    def sql_prune_changes(self, keep: int) -> int:
+        """Оставить в журнале изменений keep последних событий, вернуть число удалённых"""
+        with self._transaction() as cursor:
+            cursor.execute(
+                'DELETE FROM task_changes WHERE seq <= (SELECT MAX(seq) FROM task_changes) - ?', (keep,)
+            )
+            return cursor.rowcount
+
+    @timed_query("reserve_idempotency_key")
+    def sql_reserve_idempotency_key(
+            self,
+            key: str,
+            fingerprint: str,
+            now: float,
+            expires_at: float
+            ) -> Optional[Dict[str, Any]]:
+        """
+        Занять ключ идемпотентности до expires_at. Вернуть None, если ключ свободен
+        (или его срок истёк) и теперь занят этим запросом, иначе — его запись.
+        """
+        with self._transaction() as cursor:
+            self._execute(cursor, 'DELETE FROM idempotency_keys WHERE key = ? AND expires_at <= ?', (key, now))
+            inserted = self._execute(
+                cursor,
+                'INSERT INTO idempotency_keys (key, fingerprint, created_at, expires_at) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (key) DO NOTHING RETURNING key',
+                (key, fingerprint, now, expires_at)
+            )
+            if inserted:
+                return None
+            rows = self._execute(cursor, f'SELECT {IDEMPOTENCY_COLUMNS} FROM idempotency_keys WHERE key = ?', (key,))
+        return dict(rows[0])
+
+    @timed_query("complete_idempotency_key")
+    def sql_complete_idempotency_key(
+            self,
+            key: str,
+            status: int,
+            body: bytes,
+            headers: str,
+            expires_at: float
+            ) -> None:
+        """Сохранить ответ на запрос, занявший ключ"""
+        self._write_returning(
+            'UPDATE idempotency_keys SET status = ?, body = ?, headers = ?, expires_at = ? WHERE key = ?',
+            (status, body, headers, expires_at, key)
         )
-        
-        updated = cursor.rowcount > 0  
-        
-        conn.commit()
-        conn.close()
-        
-        return updated  
-
-    def sql_delete_task(self, task_id: int) -> bool:
-        """Удалить задачу"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
-        
-        deleted = cursor.rowcount > 0 
-        
-        conn.commit()
-        conn.close()
-        
-        return deleted  
\ No newline at end of file
+
+    @timed_query("delete_idempotency_key")
+    def sql_delete_idempotency_key(self, key: str) -> None:
+        """Освободить ключ: запрос не удался, повтор выполнится заново"""
+        self._write_returning('DELETE FROM idempotency_keys WHERE key = ?', (key,))
+
+    @timed_query("prune_idempotency_keys")
+    def sql_prune_idempotency_keys(self, now: float, keep: int) -> int:
+        """Удалить истёкшие ключи и все, кроме keep самых новых; вернуть число удалённых"""
+        with self._transaction() as cursor:
+            cursor.execute('DELETE FROM idempotency_keys WHERE expires_at <= ?', (now,))
+            pruned = cursor.rowcount
+            cursor.execute(
+                'DELETE FROM idempotency_keys WHERE key IN ('
+                'SELECT key FROM idempotency_keys ORDER BY created_at DESC LIMIT -1 OFFSET ?)',
+                (keep,)
+            )
+            return pruned + cursor.rowcount
+
+    @timed_query("select_task_stats")
+    def sql_select_task_stats(self) -> Dict[str, int]:
+        """Число задач по приоритету из счётчиков, которые триггеры ведут при каждой записи"""
+        return {row['priority']: row['count'] for row in self._fetch_all('SELECT priority, count FROM task_stats')}
+
+    @timed_query("reconcile_task_stats")
+    def sql_reconcile_task_stats(self, fix: bool = True) -> Dict[str, Tuple[int, int]]:
+        """
+        Пересчитать задачи по приоритету и сравнить со счётчиками, вернуть расхождения.
+        С fix счётчики заменяются пересчитанными в той же транзакции.
+        """
+        with self._transaction() as cursor:
+            stored = {row[0]: row[1] for row in self._execute(cursor, 'SELECT priority, count FROM task_stats')}
+            actual = {
+                row[0]: row[1]
+                for row in self._execute(cursor, 'SELECT priority, COUNT(*) FROM tasks GROUP BY priority')
+            }
+            drift = stats_drift(stored, actual)
+            if drift and fix:
+                self._execute(cursor, 'DELETE FROM task_stats')
+                self._execute(
+                    cursor, 'INSERT INTO task_stats (priority, count) VALUES (?, ?)', list(actual.items()), many=True
+                )
+        return drift
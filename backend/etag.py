@@ -0,0 +1,61 @@
+import re
+from typing import List, Optional
+
+_TASK_ETAG = re.compile(r'^"task-(\d+)-v(\d+)(?:-(?:gzip|br))?"$')
+_CODING_SUFFIX = re.compile(r'-(?:gzip|br)"$')
+
+
+def task_etag(task_id: int, version: int) -> str:
+    """Сильный ETag задачи по её версии"""
+    return f'"task-{task_id}-v{version}"'
+
+
+def list_etag(version: int) -> str:
+    """Сильный ETag списка задач по версии таблицы"""
+    return f'"tasks-v{version}"'
+
+
+def with_coding(etag: str, coding: str) -> str:
+    """
+    ETag сжатого представления: байты gzip, br и несжатого тела разные, поэтому сильный
+    ETag у них тоже должен быть разным (RFC 9110, 8.8.3). Слабый ETag остаётся как есть
+    """
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{coding}"'
+
+
+def strip_coding(tag: str) -> str:
+    """ETag данных без суффикса кодировки, добавленного with_coding"""
+    return _CODING_SUFFIX.sub('"', tag)
+
+
+def _split(header: str) -> List[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Совпадает ли If-None-Match с ETag (слабое сравнение, как требует RFC 9110);
+    ETag сжатых представлений совпадает с ETag данных
+    """
+    if not if_none_match:
+        return False
+    tags = _split(if_none_match)
+    return "*" in tags or any(strip_coding(tag.removeprefix("W/")) == etag for tag in tags)
+
+
+def if_match_versions(if_match: str, task_id: int) -> Optional[List[int]]:
+    """
+    Версии задачи из If-Match (сильное сравнение, суффикс кодировки не учитывается):
+    None для «*», пустой список, если ни один ETag не относится к этой задаче
+    """
+    tags = _split(if_match)
+    if "*" in tags:
+        return None
+    versions = []
+    for tag in tags:
+        match = _TASK_ETAG.match(tag)
+        if match and int(match.group(1)) == task_id:
+            versions.append(int(match.group(2)))
+    return versions
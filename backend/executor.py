@@ -0,0 +1,93 @@
+import asyncio
+import contextvars
+import functools
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, TypeVar
+
+from backend.database import DEFAULT_POOL_SIZE
+from backend.metrics import DB_EXECUTOR_WAIT, SERVICE_CALL_DURATION
+from backend.profiling import current_session
+
+T = TypeVar("T")
+
+_END = object()
+
+
+class DatabaseExecutor:
+    """
+    Выделенный пул потоков для блокирующих вызовов TaskService/PureDatabase.
+
+    Асинхронные обработчики ждут результат на event loop и не занимают слоты
+    общего threadpool Starlette, поэтому число одновременных запросов им не
+    ограничено. Размер пула по умолчанию равен размеру пула соединений:
+    поток исполнителя никогда не ждёт свободное соединение.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        if max_workers is None:
+            max_workers = int(os.getenv(
+                "DB_EXECUTOR_WORKERS",
+                os.getenv("DB_POOL_SIZE", DEFAULT_POOL_SIZE)
+            )) or DEFAULT_POOL_SIZE
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="db-executor")
+            return self._executor
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Выполнить fn в потоке исполнителя, сохранив contextvars вызывающего"""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, self._timed, time.perf_counter(), fn, *args, **kwargs)
+        return await loop.run_in_executor(self._get_executor(), call)
+
+    @staticmethod
+    def _timed(submitted: float, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Вызов в потоке исполнителя с метриками ожидания потока и длительности вызова"""
+        started = time.perf_counter()
+        DB_EXECUTOR_WAIT.observe(started - submitted)
+        # Запрос профилируется: пока идёт вызов, этот поток работает на него
+        session = current_session.get()
+        if session is not None:
+            session.enter(sys._getframe())
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            if session is not None:
+                session.exit()
+            SERVICE_CALL_DURATION.observe(
+                time.perf_counter() - started,
+                (getattr(fn, "__name__", "other"),)
+            )
+
+    async def iterate(self, iterator: Iterator[T]) -> AsyncIterator[T]:
+        """Асинхронно пройти блокирующий итератор, вызывая next() в исполнителе"""
+        try:
+            while True:
+                item = await self.run(next, iterator, _END)
+                if item is _END:
+                    return
+                yield item
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                await self.run(close)
+
+    def shutdown(self) -> None:
+        """Дождаться текущих вызовов и остановить потоки"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+db_executor = DatabaseExecutor()
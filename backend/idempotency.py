@@ -0,0 +1,155 @@
+"""
+Заголовок Idempotency-Key для POST /api/v1/tasks и PUT /api/v1/tasks/{task_id}.
+
+Первый запрос с ключом занимает его в хранилище (таблица idempotency_keys),
+выполняется и сохраняет ответ: статус, тело и заголовки. Повтор с тем же ключом
+и тем же запросом получает сохранённый ответ с заголовком Idempotent-Replayed
+и не трогает задачи — клиент может смело повторять запрос после таймаута.
+Перед хранилищем стоит LRU-кэш готовых ответов (IDEMPOTENCY_CACHE_SIZE, по
+умолчанию 10000, 0 — без кэша): частые повторы не доходят до БД.
+
+Ответы хранятся IDEMPOTENCY_TTL секунд (по умолчанию сутки), не больше
+IDEMPOTENCY_MAX_KEYS ключей (по умолчанию 1000000): лишние и истёкшие удаляются
+раз в минуту. Повтор, пока первый запрос ещё выполняется, получает 409; тот же
+ключ с другим телом, методом или путём — 422. Сохраняются только успешные ответы:
+после ошибки ключ освобождается, и повтор выполняется заново. Если воркер упал
+между записью задачи и сохранением ответа, ключ освобождается через
+IDEMPOTENCY_PENDING_TTL секунд (по умолчанию 60).
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+from pydantic import BaseModel
+
+from backend.cache import LRUCache
+from backend.executor import db_executor
+from backend.metrics import IDEMPOTENCY_REQUESTS
+from backend.task import TaskService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 24 * 3600.0
+DEFAULT_PENDING_TTL = 60.0
+DEFAULT_CACHE_SIZE = 10_000
+DEFAULT_MAX_KEYS = 1_000_000
+DEFAULT_PRUNE_INTERVAL = 60.0
+MAX_KEY_LENGTH = 255
+
+
+class StoredResponse(NamedTuple):
+    status: int
+    body: bytes
+    headers: Dict[str, str]
+
+
+class IdempotencyKeyInProgressError(Exception):
+    """Запрос с этим ключом ещё выполняется"""
+
+
+class IdempotencyKeyReusedError(Exception):
+    """Ключ уже использован для другого запроса"""
+
+
+def request_fingerprint(method: str, path: str, payload: BaseModel) -> str:
+    """Отпечаток запроса: метод, путь и тело после валидации (порядок ключей и пробелы не важны)"""
+    digest = hashlib.sha256(f"{method} {path}\n".encode())
+    digest.update(payload.model_dump_json().encode())
+    return digest.hexdigest()
+
+
+class IdempotencyStore:
+    """Ключи идемпотентности в хранилище сервиса с LRU-кэшем готовых ответов перед ним"""
+
+    def __init__(
+            self,
+            service: TaskService,
+            ttl: float = DEFAULT_TTL,
+            pending_ttl: float = DEFAULT_PENDING_TTL,
+            cache_size: int = DEFAULT_CACHE_SIZE,
+            max_keys: int = DEFAULT_MAX_KEYS,
+            clock: Callable[[], float] = time.time
+            ):
+        self.service = service
+        self.ttl = ttl
+        self.pending_ttl = pending_ttl
+        self.max_keys = max_keys
+        # Ключ -> (отпечаток, ответ, срок хранения в БД): запись, поднятая из БД под конец
+        # срока, не должна пережить его в кэше
+        self.cache: Optional[LRUCache[Tuple[str, StoredResponse, float]]] = (
+            LRUCache(cache_size, ttl) if cache_size > 0 else None
+        )
+        self._clock = clock
+
+    def begin(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        """
+        Сохранённый ответ для повтора или None, если ключ занят этим запросом и его нужно выполнить
+        """
+        now = self._clock()
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is None or cached[2] <= now:
+            record = self.service.db.sql_reserve_idempotency_key(key, fingerprint, now, now + self.pending_ttl)
+            if record is None:
+                IDEMPOTENCY_REQUESTS.inc(labels=("new",))
+                return None
+            if record["status"] is None:
+                result = "in_progress" if record["fingerprint"] == fingerprint else "reused"
+                IDEMPOTENCY_REQUESTS.inc(labels=(result,))
+                if result == "reused":
+                    raise IdempotencyKeyReusedError("Idempotency-Key was used for a different request")
+                raise IdempotencyKeyInProgressError("A request with this Idempotency-Key is in progress")
+            cached = (record["fingerprint"], StoredResponse(
+                record["status"], bytes(record["body"]), json.loads(record["headers"])
+            ), record["expires_at"])
+            if self.cache is not None:
+                self.cache.set(key, cached)
+        stored_fingerprint, response, _ = cached
+        if stored_fingerprint != fingerprint:
+            IDEMPOTENCY_REQUESTS.inc(labels=("reused",))
+            raise IdempotencyKeyReusedError("Idempotency-Key was used for a different request")
+        IDEMPOTENCY_REQUESTS.inc(labels=("replayed",))
+        return response
+
+    def complete(self, key: str, fingerprint: str, response: StoredResponse) -> None:
+        """Сохранить ответ запроса, занявшего ключ"""
+        expires_at = self._clock() + self.ttl
+        self.service.db.sql_complete_idempotency_key(
+            key, response.status, response.body, json.dumps(response.headers), expires_at
+        )
+        if self.cache is not None:
+            self.cache.set(key, (fingerprint, response, expires_at))
+
+    def abort(self, key: str) -> None:
+        """Освободить ключ после ошибки"""
+        self.service.db.sql_delete_idempotency_key(key)
+
+    def prune(self) -> int:
+        """Удалить истёкшие ключи и все, кроме max_keys самых новых"""
+        return self.service.db.sql_prune_idempotency_keys(self._clock(), self.max_keys)
+
+    async def prune_periodically(self, interval: float = DEFAULT_PRUNE_INTERVAL) -> None:
+        """Раз в interval секунд удалять истёкшие и лишние ключи"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                pruned = await db_executor.run(self.prune)
+            except Exception:
+                logger.exception("Failed to prune idempotency keys")
+                continue
+            if pruned:
+                logger.debug("Pruned %d idempotency keys", pruned)
+
+
+def idempotency_from_env(service: TaskService) -> IdempotencyStore:
+    """Хранилище ключей по настройкам окружения (см. описание модуля)"""
+    return IdempotencyStore(
+        service,
+        ttl=float(os.getenv("IDEMPOTENCY_TTL", DEFAULT_TTL)),
+        pending_ttl=float(os.getenv("IDEMPOTENCY_PENDING_TTL", DEFAULT_PENDING_TTL)),
+        cache_size=int(os.getenv("IDEMPOTENCY_CACHE_SIZE", DEFAULT_CACHE_SIZE)),
+        max_keys=int(os.getenv("IDEMPOTENCY_MAX_KEYS", DEFAULT_MAX_KEYS))
+    )
@@ -0,0 +1,148 @@
+"""
+Управление схемой БД.
+
+Запуск из корня репозитория:
+    python -m backend.manage status   [--db tasks.db]
+    python -m backend.manage plan     [--db tasks.db] [--target N]
+    python -m backend.manage dry-run  [--db tasks.db] [--target N]
+    python -m backend.manage migrate  [--db tasks.db] [--target N] [--batch-size 1000] [--pause 0.0]
+    python -m backend.manage reconcile-stats [--db tasks.db | --url DATABASE_URL] [--check]
+
+dry-run применяет миграции к копии БД во временном каталоге и печатает
+выполненные SQL-операторы и время каждой миграции; исходная БД не меняется.
+
+reconcile-stats пересчитывает задачи по приоритету и сверяет со счётчиками
+/api/v1/tasks/stats: расхождения печатаются и исправляются, с --check — только
+печатаются (код выхода 1). --url принимает любой DATABASE_URL, в том числе PostgreSQL.
+"""
+import argparse
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import pysqlite3 as sqlite3
+
+from backend.migrations import DEFAULT_BATCH_SIZE, MIGRATIONS, Migration, Migrator, migration_lock
+from backend.storage import storage_from_url
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """Соединение для миграций: autocommit и ожидание блокировки вместо ошибки"""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout = 5000")
+    return conn
+
+
+def print_plan(migrations: List[Migration]) -> None:
+    if not migrations:
+        print("Schema is up to date")
+    for migration in migrations:
+        print(f"  {migration.version:04d} {migration.name}: {migration.description}")
+
+
+def status(db_path: str) -> int:
+    conn = connect(db_path)
+    try:
+        print(f"Schema version: {Migrator(conn).version} (latest: {MIGRATIONS[-1].version})")
+    finally:
+        conn.close()
+    return 0
+
+
+def plan(db_path: str, target: Optional[int]) -> int:
+    conn = connect(db_path)
+    try:
+        migrator = Migrator(conn)
+        print(f"Schema version: {migrator.version}")
+        print_plan(migrator.pending(MIGRATIONS, target))
+    finally:
+        conn.close()
+    return 0
+
+
+def dry_run(db_path: str, target: Optional[int], batch_size: int) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        copy_path = str(Path(tmp) / "dry-run.db")
+        source = connect(db_path)
+        copy = connect(copy_path)
+        try:
+            source.backup(copy)
+        finally:
+            source.close()
+        try:
+            migrator = Migrator(copy, batch_size=batch_size)
+            pending = migrator.pending(MIGRATIONS, target)
+            print(f"Schema version: {migrator.version}")
+            print_plan(pending)
+            copy.set_trace_callback(lambda statement: print(f"    {' '.join(statement.split())}"))
+            for migration in pending:
+                print(f"-- {migration.version:04d} {migration.name}")
+                started = time.perf_counter()
+                migrator.migrate(MIGRATIONS, target=migration.version)
+                print(f"-- {migration.version:04d} done in {time.perf_counter() - started:.3f} s")
+        finally:
+            copy.close()
+    return 0
+
+
+def migrate(db_path: str, target: Optional[int], batch_size: int, pause: float) -> int:
+    with migration_lock(db_path):
+        conn = connect(db_path)
+        try:
+            migrator = Migrator(conn, batch_size=batch_size, pause=pause)
+            if not migrator.migrate(MIGRATIONS, target):
+                print("Schema is up to date")
+            print(f"Schema version: {migrator.version}")
+        finally:
+            conn.close()
+    return 0
+
+
+def reconcile_stats(url: str, check: bool) -> int:
+    db = storage_from_url(url)
+    try:
+        drift = db.sql_reconcile_task_stats(fix=not check)
+    finally:
+        db.close()
+    if not drift:
+        print("Task stats are consistent")
+        return 0
+    for priority, (stored, actual) in sorted(drift.items()):
+        print(f"  {priority}: counter {stored}, actual {actual}")
+    if check:
+        return 1
+    print("Task stats rebuilt")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["status", "plan", "dry-run", "migrate", "reconcile-stats"])
+    parser.add_argument("--db", default="tasks.db")
+    parser.add_argument("--url", default=None, help="DATABASE_URL вместо --db (только reconcile-stats)")
+    parser.add_argument("--target", type=int, default=None, help="последняя применяемая версия")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="строк на транзакцию заполнения")
+    parser.add_argument("--pause", type=float, default=0.0, help="пауза между пачками заполнения, с")
+    parser.add_argument("--check", action="store_true", help="только найти расхождения (reconcile-stats)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.url is None and args.command != "migrate" and not Path(args.db).exists():
+        print(f"Database {args.db} does not exist", file=sys.stderr)
+        return 1
+    if args.command == "status":
+        return status(args.db)
+    if args.command == "plan":
+        return plan(args.db, args.target)
+    if args.command == "dry-run":
+        return dry_run(args.db, args.target, args.batch_size)
+    if args.command == "reconcile-stats":
+        return reconcile_stats(args.url or f"sqlite:///{args.db}", args.check)
+    return migrate(args.db, args.target, args.batch_size, args.pause)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
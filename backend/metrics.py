@@ -0,0 +1,368 @@
+"""
+Метрики в текстовом формате Prometheus без внешних зависимостей.
+
+Счётчики и гистограммы обновляются под коротким замком на метрику; значения,
+которые и так хранятся в других объектах (размер пула, счётчики кэша), читаются
+функциями только в момент выдачи /metrics и ничего не стоят на горячем пути.
+"""
+import functools
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, TypeVar, Union
+
+T = TypeVar("T")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Границы гистограмм длительности, с: от долей миллисекунды (кэш, точечный SELECT) до секунд
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _check(self, labels: Labels) -> None:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+
+    def samples(self) -> Iterator[Tuple[str, Labels, str, float]]:
+        """(суффикс имени, значения меток, доп. метка, значение)"""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for suffix, labels, extra, value in self.samples():
+            lines.append(
+                f"{self.name}{suffix}{_format_labels(self.labelnames, labels, extra)} {_format_value(value)}"
+            )
+        return lines
+
+
+class Counter(_Metric):
+    """Монотонный счётчик"""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, labels: Labels = ()) -> None:
+        if amount < 0:
+            raise ValueError("Counter can only increase")
+        self._check(labels)
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Labels = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterator[Tuple[str, Labels, str, float]]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield "", labels, "", value
+
+
+class Gauge(_Metric):
+    """Текущее значение, которое может расти и убывать"""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, labels: Labels = ()) -> None:
+        self._check(labels)
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, amount: float = 1.0, labels: Labels = ()) -> None:
+        self.inc(-amount, labels)
+
+    def set(self, value: float, labels: Labels = ()) -> None:
+        self._check(labels)
+        with self._lock:
+            self._values[labels] = value
+
+    def value(self, labels: Labels = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterator[Tuple[str, Labels, str, float]]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield "", labels, "", value
+
+
+class Histogram(_Metric):
+    """Распределение значений по корзинам с суммой и числом наблюдений"""
+    type_name = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = LATENCY_BUCKETS
+            ):
+        super().__init__(name, documentation, labelnames)
+        if list(buckets) != sorted(buckets):
+            raise ValueError("Histogram buckets must be sorted")
+        self.buckets = tuple(buckets)
+        # Для каждого набора меток: [счётчики по корзинам (последняя — +Inf), сумма]
+        self._values: Dict[Labels, List[Any]] = {}
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                self._check(labels)
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def count(self, labels: Labels = ()) -> int:
+        entry = self._values.get(labels)
+        return sum(entry[0]) if entry else 0
+
+    def sum(self, labels: Labels = ()) -> float:
+        entry = self._values.get(labels)
+        return entry[1] if entry else 0.0
+
+    def samples(self) -> Iterator[Tuple[str, Labels, str, float]]:
+        with self._lock:
+            values = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield "_bucket", labels, f'le="{_format_value(bound)}"', cumulative
+            yield "_sum", labels, "", total
+            yield "_count", labels, "", cumulative
+
+
+class FunctionMetric(_Metric):
+    """
+    Значение, вычисляемое функцией при выдаче метрик: число или {значения меток: число}.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            fn: Callable[[], Union[float, Mapping[Labels, float]]],
+            labelnames: Sequence[str] = (),
+            type_name: str = "gauge"
+            ):
+        super().__init__(name, documentation, labelnames)
+        self.fn = fn
+        self.type_name = type_name
+
+    def samples(self) -> Iterator[Tuple[str, Labels, str, float]]:
+        value = self.fn()
+        if isinstance(value, Mapping):
+            for labels, item in sorted(value.items()):
+                yield "", labels, "", item
+        else:
+            yield "", (), "", value
+
+
+class MetricsRegistry:
+    """Набор метрик процесса; render() — текст для /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def unregister(self, name: str) -> None:
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = LATENCY_BUCKETS
+            ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def function(
+            self,
+            name: str,
+            documentation: str,
+            fn: Callable[[], Union[float, Mapping[Labels, float]]],
+            labelnames: Sequence[str] = (),
+            type_name: str = "gauge"
+            ) -> FunctionMetric:
+        """Зарегистрировать (или заменить) метрику, значение которой читается функцией"""
+        self.unregister(name)
+        return self.register(FunctionMetric(name, documentation, fn, labelnames, type_name))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP-запроса от приёма до отправки ответа",
+    ("method", "route", "status")
+)
+HTTP_REQUESTS_IN_PROGRESS = REGISTRY.gauge(
+    "http_requests_in_progress",
+    "Число HTTP-запросов в обработке"
+)
+SERVICE_CALL_DURATION = REGISTRY.histogram(
+    "task_service_call_duration_seconds",
+    "Время вызова TaskService в потоке db_executor (логика сервиса вместе с SQL)",
+    ("operation",)
+)
+DB_EXECUTOR_WAIT = REGISTRY.histogram(
+    "db_executor_queue_wait_seconds",
+    "Ожидание свободного потока db_executor"
+)
+ADMISSION_REJECTED = REGISTRY.counter(
+    "admission_rejected_total",
+    "Запросы, отклонённые контролем нагрузки: rate_limited (429) и overloaded (503)",
+    ("traffic", "reason")
+)
+IDEMPOTENCY_REQUESTS = REGISTRY.counter(
+    "idempotency_requests_total",
+    "Запросы с Idempotency-Key: new, replayed, in_progress (409) и reused (422)",
+    ("result",)
+)
+DB_QUERY_DURATION = REGISTRY.histogram(
+    "db_query_duration_seconds",
+    "Время выполнения запроса PureDatabase, включая ожидание соединения",
+    ("query",)
+)
+DB_QUERY_ROWS = REGISTRY.counter(
+    "db_query_rows_total",
+    "Строк прочитано или изменено запросами PureDatabase",
+    ("query",)
+)
+DB_QUERY_ERRORS = REGISTRY.counter(
+    "db_query_errors_total",
+    "Запросы PureDatabase, завершившиеся исключением",
+    ("query",)
+)
+DB_POOL_WAIT = REGISTRY.histogram(
+    "db_pool_acquire_seconds",
+    "Время получения соединения из пула (ожидание, открытие, проверка)"
+)
+
+
+def _row_count(result: Any) -> int:
+    """Число строк по уже полученному результату метода (len, без запросов к БД)"""
+    if result is None or result is False:
+        return 0
+    if isinstance(result, (list, set, tuple)):
+        return len(result)
+    return 1
+
+
+def timed_query(label: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Декоратор метода PureDatabase: время, число строк результата и ошибки с меткой query=label"""
+    labels = (label,)
+
+    def decorator(fn: Callable[..., T]) -> Callable[..., T]:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> T:
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                DB_QUERY_ERRORS.inc(labels=labels)
+                raise
+            finally:
+                DB_QUERY_DURATION.observe(time.perf_counter() - started, labels)
+            DB_QUERY_ROWS.inc(_row_count(result), labels)
+            return result
+        return wrapper
+    return decorator
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: длительность запросов по шаблону маршрута, методу и статусу,
+    число запросов в обработке. Метка route — шаблон (/api/v1/tasks/{task_id}),
+    а не путь, чтобы число рядов не росло с числом задач.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started,
+                (scope["method"], getattr(route, "path", "<unmatched>"), str(status))
+            )
@@ -0,0 +1,19 @@
+from backend.migrations.base import DEFAULT_BATCH_SIZE, Migration, Migrator, migration_lock
+from backend.migrations import (
+    m0001_create_tasks, m0002_page_indexes, m0003_task_versions, m0004_tasks_search, m0005_task_changes,
+    m0006_task_stats, m0007_idempotency_keys, m0008_unchanged_updates
+)
+
+# Все миграции схемы по возрастанию версии; новая миграция — новый модуль mNNNN_*.py в конце списка
+MIGRATIONS = [
+    m0001_create_tasks.migration,
+    m0002_page_indexes.migration,
+    m0003_task_versions.migration,
+    m0004_tasks_search.migration,
+    m0005_task_changes.migration,
+    m0006_task_stats.migration,
+    m0007_idempotency_keys.migration,
+    m0008_unchanged_updates.migration,
+]
+
+__all__ = ["DEFAULT_BATCH_SIZE", "MIGRATIONS", "Migration", "Migrator", "migration_lock"]
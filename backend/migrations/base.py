@@ -0,0 +1,184 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Sequence
+
+import pysqlite3 as sqlite3
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировки нет, там запускается один процесс
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+@contextmanager
+def migration_lock(db_path: str) -> Iterator[None]:
+    """
+    Межпроцессная блокировка на время миграций: файл <db_path>.lock рядом с БД.
+    Воркеры, стартующие одновременно, мигрируют по очереди, и последующие видят уже готовую схему.
+    """
+    if fcntl is None or db_path == ":memory:":
+        yield
+        return
+    with open(f"{db_path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class Migration:
+    """Один шаг схемы: номер версии, имя и функция upgrade(migrator)"""
+
+    def __init__(self, version: int, name: str, upgrade: Callable[["Migrator"], None]):
+        self.version = version
+        self.name = name
+        self.upgrade = upgrade
+
+    @property
+    def description(self) -> str:
+        """Первая строка docstring функции upgrade"""
+        return (self.upgrade.__doc__ or "").strip().split("\n")[0]
+
+    def __repr__(self) -> str:
+        return f"Migration({self.version}, {self.name!r})"
+
+
+class Migrator:
+    """
+    Применяет миграции к соединению SQLite и хранит номер версии схемы в PRAGMA user_version.
+
+    Каждая миграция идемпотентна и пишет короткими транзакциями BEGIN IMMEDIATE:
+    большие заполнения идут пачками по batch_size строк, между пачками другие
+    писатели получают блокировку. Прогресс заполнения лежит в schema_backfills,
+    поэтому прерванная миграция продолжается с места остановки.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, batch_size: int = DEFAULT_BATCH_SIZE, pause: float = 0.0):
+        if batch_size < 1:
+            raise ValueError("batch_size must be positive")
+        self.conn = conn
+        self.batch_size = batch_size
+        self.pause = pause
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Короткая транзакция записи"""
+        cursor = self.conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            yield cursor
+        except BaseException:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+
+    @property
+    def version(self) -> int:
+        """Текущая версия схемы"""
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def pending(self, migrations: Sequence[Migration], target: Optional[int] = None) -> List[Migration]:
+        """Миграции, которые ещё не применены (до target включительно)"""
+        _check_order(migrations)
+        current = self.version
+        return [
+            migration for migration in migrations
+            if migration.version > current and (target is None or migration.version <= target)
+        ]
+
+    def migrate(self, migrations: Sequence[Migration], target: Optional[int] = None) -> List[Migration]:
+        """Применить ожидающие миграции по порядку, вернуть применённые"""
+        if migrations and self.version > migrations[-1].version:
+            logger.warning(
+                "Schema version %s is newer than the latest known migration %s",
+                self.version, migrations[-1].version
+            )
+        applied = []
+        for migration in self.pending(migrations, target):
+            started = time.perf_counter()
+            migration.upgrade(self)
+            with self.transaction() as cursor:
+                cursor.execute(f"PRAGMA user_version = {int(migration.version)}")
+            logger.info(
+                "Applied migration %04d %s in %.3f s",
+                migration.version, migration.name, time.perf_counter() - started
+            )
+            applied.append(migration)
+        return applied
+
+    def table_exists(self, name: str) -> bool:
+        """Есть ли таблица (в том числе виртуальная)"""
+        return self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        ).fetchone() is not None
+
+    def column_exists(self, table: str, column: str) -> bool:
+        """Есть ли колонка в таблице"""
+        return any(row[1] == column for row in self.conn.execute(f"PRAGMA table_info({table})"))
+
+    @staticmethod
+    def start_backfill(cursor: sqlite3.Cursor, name: str, end: int) -> None:
+        """
+        Зарегистрировать заполнение строк с id до end включительно; повторный вызов
+        сохраняет уже сделанный прогресс. Вызывается в транзакции миграции.
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schema_backfills (
+                name TEXT PRIMARY KEY,
+                position INTEGER NOT NULL,
+                end_id INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute(
+            "INSERT OR IGNORE INTO schema_backfills (name, position, end_id) VALUES (?, 0, ?)",
+            (name, end)
+        )
+
+    def backfill_pending(self, name: str) -> bool:
+        """Зарегистрировано ли незавершённое заполнение"""
+        return self.table_exists("schema_backfills") and self.conn.execute(
+            "SELECT 1 FROM schema_backfills WHERE name = ?", (name,)
+        ).fetchone() is not None
+
+    def backfill(self, name: str, table: str, statement: str) -> int:
+        """
+        Выполнить statement пачками по id таблицы table: в каждой транзакции
+        параметры :lo и :hi ограничивают диапазон (lo, hi] не более чем batch_size строками.
+        Вернуть число пройденных пачек.
+        """
+        position, end = self.conn.execute(
+            "SELECT position, end_id FROM schema_backfills WHERE name = ?", (name,)
+        ).fetchone()
+        batches = 0
+        while position < end:
+            row = self.conn.execute(
+                f"SELECT id FROM {table} WHERE id > ? AND id <= ? ORDER BY id LIMIT 1 OFFSET ?",
+                (position, end, self.batch_size - 1)
+            ).fetchone()
+            upper = row[0] if row else end
+            with self.transaction() as cursor:
+                cursor.execute(statement, {"lo": position, "hi": upper})
+                cursor.execute("UPDATE schema_backfills SET position = ? WHERE name = ?", (upper, name))
+            position = upper
+            batches += 1
+            logger.debug("Backfill %s: %s of %s", name, position, end)
+            if self.pause:
+                time.sleep(self.pause)
+        return batches
+
+    @staticmethod
+    def finish_backfill(cursor: sqlite3.Cursor, name: str) -> None:
+        """Снять регистрацию заполнения (в транзакции, завершающей миграцию)"""
+        cursor.execute("DELETE FROM schema_backfills WHERE name = ?", (name,))
+
+
+def _check_order(migrations: Sequence[Migration]) -> None:
+    versions = [migration.version for migration in migrations]
+    if versions != sorted(set(versions)) or (versions and versions[0] < 1):
+        raise ValueError(f"Migration versions must be positive, unique and ordered: {versions}")
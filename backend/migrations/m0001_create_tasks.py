@@ -0,0 +1,17 @@
+from backend.migrations.base import Migration, Migrator
+
+
+def upgrade(migrator: Migrator) -> None:
+    """Таблица задач"""
+    with migrator.transaction() as cursor:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                description TEXT NOT NULL,
+                priority TEXT NOT NULL DEFAULT 'medium'
+            )
+        ''')
+
+
+migration = Migration(1, "create_tasks", upgrade)
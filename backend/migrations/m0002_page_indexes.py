@@ -0,0 +1,19 @@
+from backend.migrations.base import Migration, Migrator
+
+INDEXES = {
+    "idx_tasks_priority_id": "tasks (priority, id)",
+    "idx_tasks_title_id": "tasks (title, id)",
+    "idx_tasks_priority_title_id": "tasks (priority, title, id)",
+}
+
+
+def upgrade(migrator: Migrator) -> None:
+    """Индексы keyset-пагинации"""
+    # SQLite строит индекс одной транзакцией; по одному индексу на транзакцию,
+    # чтобы писатели ждали не дольше построения самого большого из них
+    for name, columns in INDEXES.items():
+        with migrator.transaction() as cursor:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {columns}")
+
+
+migration = Migration(2, "page_indexes", upgrade)
@@ -0,0 +1,27 @@
+from backend.migrations.base import Migration, Migrator
+
+
+def upgrade(migrator: Migrator) -> None:
+    """Версия строки задачи и счётчик версий таблицы для ETag"""
+    with migrator.transaction() as cursor:
+        # ADD COLUMN с константой по умолчанию меняет только схему, строки не переписываются
+        if not migrator.column_exists("tasks", "version"):
+            cursor.execute("ALTER TABLE tasks ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS table_versions (
+                name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO table_versions (name, version) VALUES ('tasks', 0)")
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS tasks_version_after_{event.lower()}
+                AFTER {event} ON tasks
+                BEGIN
+                    UPDATE table_versions SET version = version + 1 WHERE name = 'tasks';
+                END
+            ''')
+
+
+migration = Migration(3, "task_versions", upgrade)
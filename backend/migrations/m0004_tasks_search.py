@@ -0,0 +1,86 @@
+from backend.migrations.base import Migration, Migrator
+
+# Веса bm25 для колонок tasks_fts: совпадение в заголовке важнее, чем в описании
+FTS_WEIGHTS = (2.0, 1.0)
+
+BACKFILL = "tasks_fts"
+
+# Пока идёт заполнение, триггеры трогают индекс только для строк, которые в нём
+# уже есть: id не больше позиции заполнения или новее его границы. Остальные
+# строки заполнение прочитает позже уже с актуальными значениями.
+_INDEXED = '''
+    ({id} <= (SELECT position FROM schema_backfills WHERE name = 'tasks_fts')
+     OR {id} > (SELECT end_id FROM schema_backfills WHERE name = 'tasks_fts'))
+'''
+
+
+def _create_triggers(cursor, guarded: bool) -> None:
+    old = f"WHEN {_INDEXED.format(id='old.id')}" if guarded else ""
+    new = f"WHEN {_INDEXED.format(id='new.id')}" if guarded else ""
+    cursor.execute(f'''
+        CREATE TRIGGER tasks_fts_after_insert AFTER INSERT ON tasks {new}
+        BEGIN
+            INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER tasks_fts_after_delete AFTER DELETE ON tasks {old}
+        BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END
+    ''')
+    # Смена только приоритета индекс не трогает
+    cursor.execute(f'''
+        CREATE TRIGGER tasks_fts_after_update AFTER UPDATE OF title, description ON tasks {old}
+        BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+        END
+    ''')
+
+
+def _drop_triggers(cursor) -> None:
+    for event in ("insert", "delete", "update"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS tasks_fts_after_{event}")
+
+
+def upgrade(migrator: Migrator) -> None:
+    """Полнотекстовый индекс FTS5 по title и description"""
+    if migrator.table_exists("tasks_fts") and not migrator.backfill_pending(BACKFILL):
+        return
+
+    with migrator.transaction() as cursor:
+        # external content: индекс хранит только токены, сами строки читаются из tasks
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+                title, description,
+                content='tasks', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='2 3 4'
+            )
+        ''')
+        end = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM tasks").fetchone()[0]
+        migrator.start_backfill(cursor, BACKFILL, end)
+        _drop_triggers(cursor)
+        _create_triggers(cursor, guarded=True)
+
+    migrator.backfill(
+        BACKFILL,
+        "tasks",
+        "INSERT INTO tasks_fts (rowid, title, description) "
+        "SELECT id, title, description FROM tasks WHERE id > :lo AND id <= :hi"
+    )
+
+    with migrator.transaction() as cursor:
+        _drop_triggers(cursor)
+        _create_triggers(cursor, guarded=False)
+        migrator.finish_backfill(cursor, BACKFILL)
+        cursor.execute(
+            "INSERT INTO tasks_fts (tasks_fts, rank) VALUES ('rank', ?)",
+            (f"bm25({', '.join(map(str, FTS_WEIGHTS))})",)
+        )
+
+
+migration = Migration(4, "tasks_search", upgrade)
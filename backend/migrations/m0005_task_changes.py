@@ -0,0 +1,41 @@
+from backend.migrations.base import Migration, Migrator
+
+# Событие на каждую вставку, изменение и удаление задачи: (операция, строка, из которой взять поля)
+_EVENTS = {
+    "insert": ("created", "new"),
+    "update": ("updated", "new"),
+    "delete": ("deleted", "old"),
+}
+
+
+def upgrade(migrator: Migrator) -> None:
+    """Журнал изменений задач для потока /api/v1/tasks/changes"""
+    with migrator.transaction() as cursor:
+        # AUTOINCREMENT: seq не переиспользуется и после очистки старых событий,
+        # поэтому курсор клиента всегда указывает на одно и то же место журнала
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS task_changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                op TEXT NOT NULL,
+                task_id INTEGER NOT NULL,
+                version INTEGER NOT NULL,
+                title TEXT,
+                description TEXT,
+                priority TEXT
+            )
+        ''')
+        # Триггеры пишут событие в той же транзакции, что и саму задачу: журнал не
+        # расходится с таблицей при любом пути записи (одиночной, пачкой, group commit)
+        for event, (op, row) in _EVENTS.items():
+            fields = "NULL, NULL, NULL" if op == "deleted" else f"{row}.title, {row}.description, {row}.priority"
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS tasks_changes_after_{event}
+                AFTER {event.upper()} ON tasks
+                BEGIN
+                    INSERT INTO task_changes (op, task_id, version, title, description, priority)
+                    VALUES ('{op}', {row}.id, {row}.version, {fields});
+                END
+            ''')
+
+
+migration = Migration(5, "task_changes", upgrade)
@@ -0,0 +1,44 @@
+from backend.migrations.base import Migration, Migrator
+
+
+def upgrade(migrator: Migrator) -> None:
+    """Счётчики задач по приоритету для /api/v1/tasks/stats"""
+    with migrator.transaction() as cursor:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS task_stats (
+                priority TEXT PRIMARY KEY,
+                count INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS tasks_stats_after_insert AFTER INSERT ON tasks
+            BEGIN
+                INSERT INTO task_stats (priority, count) VALUES (new.priority, 1)
+                ON CONFLICT (priority) DO UPDATE SET count = count + 1;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS tasks_stats_after_delete AFTER DELETE ON tasks
+            BEGIN
+                UPDATE task_stats SET count = count - 1 WHERE priority = old.priority;
+            END
+        ''')
+        # Смена заголовка или описания счётчики не трогает
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS tasks_stats_after_update AFTER UPDATE OF priority ON tasks
+            WHEN old.priority IS NOT new.priority
+            BEGIN
+                UPDATE task_stats SET count = count - 1 WHERE priority = old.priority;
+                INSERT INTO task_stats (priority, count) VALUES (new.priority, 1)
+                ON CONFLICT (priority) DO UPDATE SET count = count + 1;
+            END
+        ''')
+        # Начальные значения считаются в той же транзакции, что и триггеры: записей между
+        # подсчётом и триггерами нет. GROUP BY идёт по индексу (priority, id) без чтения строк
+        cursor.execute("DELETE FROM task_stats")
+        cursor.execute(
+            "INSERT INTO task_stats (priority, count) SELECT priority, COUNT(*) FROM tasks GROUP BY priority"
+        )
+
+
+migration = Migration(6, "task_stats", upgrade)
@@ -0,0 +1,27 @@
+from backend.migrations.base import Migration, Migrator
+
+
+def upgrade(migrator: Migrator) -> None:
+    """Сохранённые ответы на запросы с Idempotency-Key"""
+    with migrator.transaction() as cursor:
+        # status NULL — запрос с этим ключом ещё выполняется
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS idempotency_keys (
+                key TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                status INTEGER,
+                body BLOB,
+                headers TEXT,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON idempotency_keys (expires_at)'
+        )
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created_at ON idempotency_keys (created_at)'
+        )
+
+
+migration = Migration(7, "idempotency_keys", upgrade)
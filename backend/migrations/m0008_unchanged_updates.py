@@ -0,0 +1,26 @@
+from backend.migrations.base import Migration, Migrator
+
+
+def upgrade(migrator: Migrator) -> None:
+    """Обновление без изменений (версия строки та же) не двигает версию таблицы и журнал изменений"""
+    with migrator.transaction() as cursor:
+        cursor.execute("DROP TRIGGER IF EXISTS tasks_version_after_update")
+        cursor.execute('''
+            CREATE TRIGGER tasks_version_after_update
+            AFTER UPDATE ON tasks WHEN new.version IS NOT old.version
+            BEGIN
+                UPDATE table_versions SET version = version + 1 WHERE name = 'tasks';
+            END
+        ''')
+        cursor.execute("DROP TRIGGER IF EXISTS tasks_changes_after_update")
+        cursor.execute('''
+            CREATE TRIGGER tasks_changes_after_update
+            AFTER UPDATE ON tasks WHEN new.version IS NOT old.version
+            BEGIN
+                INSERT INTO task_changes (op, task_id, version, title, description, priority)
+                VALUES ('updated', new.id, new.version, new.title, new.description, new.priority);
+            END
+        ''')
+
+
+migration = Migration(8, "unchanged_updates", upgrade)
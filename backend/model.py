@@ -1,3 +1,5 @@
+from typing import Dict, List, Optional
+
 from pydantic import BaseModel, Field
 
 from enum import StrEnum
@@ -9,6 +11,32 @@ class PriorityModel(StrEnum):
     HIGH = "high"        
 
 
+class TaskSortModel(StrEnum):
+    ID = "id"
+    ID_DESC = "-id"
+    TITLE = "title"
+    TITLE_DESC = "-title"
+
+
+class SearchSortModel(StrEnum):
+    RELEVANCE = "relevance"
+    ID = "id"
+
+
+class QuerySortModel(StrEnum):
+    TOTAL_TIME = "total_time"
+    MAX_TIME = "max_time"
+    MEAN_TIME = "mean_time"
+    CALLS = "calls"
+    SLOW_CALLS = "slow_calls"
+    ROWS = "rows"
+
+
+class ExportFormatModel(StrEnum):
+    NDJSON = "ndjson"
+    JSON = "json"
+
+
 class TaskModel(BaseModel):
     title: str = Field(min_length=1, max_length=30)
     description: str = Field(min_length=1, max_length=50)
@@ -18,4 +46,49 @@ class TaskResponse(TaskModel):
     id: int
     
 class TaskRequest(TaskModel):
-    pass
\ No newline at end of file
+    pass
+
+
+class TaskStatsResponse(BaseModel):
+    total: int
+    by_priority: Dict[PriorityModel, int]
+
+
+class TaskPatchModel(BaseModel):
+    id: int
+    title: Optional[str] = Field(None, min_length=1, max_length=30)
+    description: Optional[str] = Field(None, min_length=1, max_length=50)
+    priority: Optional[PriorityModel] = None
+
+
+class BulkModeModel(StrEnum):
+    ATOMIC = "atomic"
+    PARTIAL = "partial"
+
+
+class BulkItemStatusModel(StrEnum):
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    NOT_FOUND = "not_found"
+    INVALID = "invalid"
+    SKIPPED = "skipped"
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    status: BulkItemStatusModel
+    detail: Optional[str] = None
+
+
+class BulkResponse(BaseModel):
+    mode: BulkModeModel
+    applied: bool
+    succeeded: int
+    failed: int
+    items: List[BulkItemResult]
+
+
+class ProfilingModel(BaseModel):
+    sample_rate: float = Field(ge=0, le=1)
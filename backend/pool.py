@@ -0,0 +1,164 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Tuple
+
+import pysqlite3 as sqlite3
+
+from backend.metrics import DB_POOL_WAIT
+
+
+class PoolClosedError(RuntimeError):
+    """Пул закрыт, новые соединения не выдаются"""
+
+
+class PoolTimeoutError(TimeoutError):
+    """Не удалось дождаться свободного соединения"""
+
+
+class ConnectionPool:
+    """
+    Ограниченный потокобезопасный пул соединений SQLite.
+
+    Рабочий поток держит одно соединение на время вызова и возвращает его
+    в пул. Свободные соединения выдаются в порядке LIFO, чтобы активные
+    потоки работали с уже прогретым кэшем страниц. При max_size=0 пул
+    отключён: каждое обращение открывает и закрывает своё соединение.
+    """
+
+    def __init__(
+            self,
+            factory: Callable[[], sqlite3.Connection],
+            max_size: int = 40,
+            timeout: float = 30.0,
+            health_check_interval: float = 30.0
+            ):
+        if max_size < 0:
+            raise ValueError("max_size cannot be negative")
+        self._factory = factory
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._idle: Deque[Tuple[sqlite3.Connection, float]] = deque()
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def acquire(self) -> sqlite3.Connection:
+        """Взять соединение из пула, при необходимости дождавшись свободного"""
+        started = time.perf_counter()
+        try:
+            return self._acquire()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - started)
+
+    def _acquire(self) -> sqlite3.Connection:
+        if self.max_size == 0:
+            if self._closed:
+                raise PoolClosedError("Connection pool is closed")
+            return self._factory()
+
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolClosedError("Connection pool is closed")
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    return self._create()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(
+                        f"No free connection after {self.timeout} s (max_size={self.max_size})"
+                    )
+                self._cond.wait(remaining)
+
+        if time.monotonic() - last_used >= self.health_check_interval and not self._is_healthy(conn):
+            self._close_quietly(conn)
+            return self._create()
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Вернуть соединение в пул"""
+        healthy = True
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            healthy = False
+
+        if self.max_size == 0:
+            self._close_quietly(conn)
+            return
+
+        with self._cond:
+            if healthy and not self._closed:
+                self._idle.append((conn, time.monotonic()))
+                conn = None
+            else:
+                self._size -= 1
+            self._cond.notify()
+        if conn is not None:
+            self._close_quietly(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Контекстный менеджер: взять соединение и гарантированно вернуть его"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self) -> None:
+        """Закрыть пул: свободные соединения закрываются сразу, занятые — при возврате"""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def stats(self) -> Dict[str, Any]:
+        """Текущее состояние пула"""
+        with self._cond:
+            return {
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+            }
+
+    def _create(self) -> sqlite3.Connection:
+        try:
+            return self._factory()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    @staticmethod
+    def _is_healthy(conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn: sqlite3.Connection) -> None:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
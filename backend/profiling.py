@@ -0,0 +1,244 @@
+"""
+Выборочное профилирование запросов статистическим профилировщиком.
+
+Профилируется доля PROFILE_SAMPLE_RATE запросов (по умолчанию 0 — выключено;
+меняется на лету через PUT /admin/profiling) и любой запрос с заголовком
+X-Profile: 1 и верным X-Admin-Token. Пока такой запрос обрабатывается, фоновый
+поток раз в PROFILE_INTERVAL_MS миллисекунд (по умолчанию 1) снимает стеки
+потоков, которые сейчас работают на него: event loop — только когда выполняется
+корутина этого запроса, поток db_executor — только внутри вызова, отправленного
+этим запросом. Если запрос ни в одном потоке не выполняется (ждёт поток
+исполнителя, соединение, блокировку), записывается отсчёт <waiting>.
+
+Стеки дописываются в PROFILE_DIR (по умолчанию profiles) в файл на маршрут,
+например GET_api_v1_tasks_{task_id}.collapsed, в формате collapsed stacks
+(«кадр;кадр;кадр число»), который читают flamegraph.pl, speedscope и inferno.
+В выключенном состоянии цена запроса — сравнение sample_rate и проход по списку
+заголовков в поисках X-Profile без копирования, а на вызов db_executor — одно
+чтение contextvar. Файлы профилей пишутся в пуле потоков, а не в event loop.
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 0.001
+DEFAULT_DIRECTORY = "profiles"
+PROFILE_HEADER = b"x-profile"
+ADMIN_TOKEN_HEADER = b"x-admin-token"
+WAITING = "<waiting>"
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9_{}.-]+")
+
+
+class ProfileSession:
+    """Профиль одного запроса: потоки, которые сейчас на него работают, и собранные стеки"""
+
+    def __init__(self, loop_thread: int, anchor: FrameType):
+        # Поток -> кадр, выше которого стек запросу не принадлежит
+        self.anchors: Dict[int, FrameType] = {loop_thread: anchor}
+        self.loop_thread = loop_thread
+        self.samples: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def enter(self, anchor: FrameType) -> None:
+        """Текущий поток начал работать на запрос (вызов в db_executor)"""
+        with self._lock:
+            self.anchors[threading.get_ident()] = anchor
+
+    def exit(self) -> None:
+        with self._lock:
+            self.anchors.pop(threading.get_ident(), None)
+
+    def sample(self, frames: Dict[int, FrameType]) -> None:
+        """Записать стеки потоков запроса из снимка sys._current_frames()"""
+        with self._lock:
+            anchors = list(self.anchors.items())
+        recorded = False
+        for thread, anchor in anchors:
+            frame = frames.get(thread)
+            stack = _stack(frame, anchor) if frame is not None else None
+            if stack is None:
+                continue
+            root = "event-loop" if thread == self.loop_thread else "db-executor"
+            self.samples[root + ";" + ";".join(stack) if stack else root] += 1
+            recorded = True
+        if not recorded:
+            self.samples[WAITING] += 1
+
+
+def _label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _stack(frame: FrameType, anchor: FrameType) -> Optional[List[str]]:
+    """Кадры от anchor (не включая) до листа; None, если anchor в стеке нет — поток занят не запросом"""
+    labels = []
+    while frame is not None:
+        if frame is anchor:
+            labels.reverse()
+            return labels
+        labels.append(_label(frame))
+        frame = frame.f_back
+    return None
+
+
+# Профиль запроса, в контексте которого выполняется код; db_executor переносит его в свои потоки
+current_session: contextvars.ContextVar[Optional[ProfileSession]] = contextvars.ContextVar(
+    "profile_session", default=None
+)
+
+
+class SamplingProfiler:
+    """
+    Фоновый поток, который снимает стеки активных сессий раз в interval секунд
+    и спит на событии, пока сессий нет.
+    """
+
+    def __init__(
+            self,
+            sample_rate: float = 0.0,
+            interval: float = DEFAULT_INTERVAL,
+            directory: str = DEFAULT_DIRECTORY
+            ):
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.directory = Path(directory)
+        self.profiled = 0
+        self._sessions: List[ProfileSession] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def settings(self) -> Dict[str, Any]:
+        return {
+            "sample_rate": self.sample_rate,
+            "interval_ms": self.interval * 1000,
+            "directory": str(self.directory),
+            "profiled": self.profiled,
+        }
+
+    def start(self, anchor: FrameType) -> ProfileSession:
+        """Начать сессию запроса, корутина которого выполняется в кадре anchor"""
+        session = ProfileSession(threading.get_ident(), anchor)
+        with self._lock:
+            self._sessions.append(session)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return session
+
+    def stop(self, session: ProfileSession, name: str) -> None:
+        """Завершить сессию и дописать её стеки в файл маршрута name"""
+        self.finish(session)
+        self.save(session, name)
+
+    def finish(self, session: ProfileSession) -> None:
+        """Перестать снимать стеки сессии"""
+        with self._lock:
+            self._sessions.remove(session)
+            self.profiled += 1
+
+    def save(self, session: ProfileSession, name: str) -> None:
+        """Дописать стеки завершённой сессии в файл маршрута name (блокирующий вызов)"""
+        if not session.samples:
+            return
+        lines = "".join(f"{name};{stack} {count}\n" for stack, count in session.samples.items())
+        path = self.directory / (_UNSAFE.sub("_", name).strip("_") + ".collapsed")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(path, "a", encoding="utf-8") as output:
+                output.write(lines)
+        except OSError:
+            logger.exception("Failed to write profile %s", path)
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while True:
+            with self._lock:
+                sessions = list(self._sessions)
+                if not sessions:
+                    self._wake.clear()
+            if not sessions:
+                self._wake.wait()
+                continue
+            frames = sys._current_frames()
+            frames.pop(own, None)
+            for session in sessions:
+                session.sample(frames)
+            del frames
+            time.sleep(self.interval)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI-middleware: профилирует долю profiler.sample_rate запросов и запросы
+    с X-Profile: 1, если authorize() принимает их X-Admin-Token (без authorize —
+    только долю sample_rate).
+    """
+
+    def __init__(
+            self,
+            app,
+            profiler: SamplingProfiler,
+            authorize: Optional[Callable[[Optional[str]], bool]] = None
+            ):
+        self.app = app
+        self.profiler = profiler
+        self.authorize = authorize
+
+    def _requested(self, scope) -> bool:
+        if self.authorize is None or not _has_header(scope, PROFILE_HEADER, b"1"):
+            return False
+        token = next((value for name, value in scope["headers"] if name == ADMIN_TOKEN_HEADER), None)
+        return self.authorize(token.decode("latin-1") if token is not None else None)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (
+            (self.profiler.sample_rate > 0 and random.random() < self.profiler.sample_rate)
+            or self._requested(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        session = self.profiler.start(sys._getframe())
+        token = current_session.set(session)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_session.reset(token)
+            self.profiler.finish(session)
+            route = getattr(scope.get("route"), "path", "<unmatched>")
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.profiler.save, session, f"{scope['method']} {route}"
+            )
+
+
+def _has_header(scope, name: bytes, value: bytes) -> bool:
+    """Есть ли в запросе заголовок name со значением value (без копирования заголовков)"""
+    for header, header_value in scope["headers"]:
+        if header == name:
+            return header_value == value
+    return False
+
+
+def profiler_from_env() -> SamplingProfiler:
+    """Профилировщик по настройкам окружения (см. описание модуля)"""
+    return SamplingProfiler(
+        float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+        float(os.getenv("PROFILE_INTERVAL_MS", DEFAULT_INTERVAL * 1000)) / 1000,
+        os.getenv("PROFILE_DIR", DEFAULT_DIRECTORY)
+    )
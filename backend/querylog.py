@@ -0,0 +1,134 @@
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import pysqlite3 as sqlite3
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXPLAIN_INTERVAL = 60.0
+MAX_PARAMS_REPR = 200
+
+_WHITESPACE = re.compile(r"\s+")
+# Строка плана без индекса: "SCAN tasks" или "SCAN t" (в отличие от "SCAN tasks USING INDEX ...")
+_FULL_SCAN = re.compile(r"^SCAN \w+$")
+
+
+def normalize_sql(query: str) -> str:
+    """Текст запроса в одну строку: ключ статистики"""
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+def _params_repr(params: Any) -> str:
+    text = repr(params)
+    return text if len(text) <= MAX_PARAMS_REPR else text[:MAX_PARAMS_REPR] + "..."
+
+
+class QueryLog:
+    """
+    Журнал медленных запросов и статистика запросов по суммарному времени.
+
+    Для каждого текста запроса копятся число вызовов, суммарное и максимальное
+    время и число строк. Запрос дольше threshold секунд пишется в лог с
+    параметрами и планом EXPLAIN QUERY PLAN. План снимается выборочно: не чаще
+    раза в explain_interval секунд на текст запроса, в остальных случаях
+    в лог идёт последний снятый план.
+    """
+
+    def __init__(self, threshold: float, explain_interval: float = DEFAULT_EXPLAIN_INTERVAL):
+        self.threshold = threshold
+        self.explain_interval = explain_interval
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(
+            self,
+            conn: sqlite3.Connection,
+            query: str,
+            params: Any,
+            elapsed: float,
+            rows: int
+            ) -> None:
+        """Учесть выполненный запрос; медленный — записать в лог с планом"""
+        sql = normalize_sql(query)
+        with self._lock:
+            stats = self._stats.get(sql)
+            if stats is None:
+                stats = self._stats[sql] = {
+                    "sql": sql, "calls": 0, "total_time": 0.0, "max_time": 0.0, "rows": 0,
+                    "slow_calls": 0, "plan": None, "full_scan": False, "explained_at": None,
+                }
+            stats["calls"] += 1
+            stats["total_time"] += elapsed
+            stats["max_time"] = max(stats["max_time"], elapsed)
+            stats["rows"] += rows
+            if elapsed < self.threshold:
+                return
+            stats["slow_calls"] += 1
+            now = time.monotonic()
+            explain = stats["explained_at"] is None or now - stats["explained_at"] >= self.explain_interval
+            if explain:
+                stats["explained_at"] = now
+
+        if explain:
+            plan = self.explain(conn, query, params)
+            with self._lock:
+                stats["plan"] = plan
+                stats["full_scan"] = any(_FULL_SCAN.match(line.strip()) for line in plan)
+        logger.warning(
+            "Slow query %.1f ms, %d rows%s: %s; params=%s\n%s",
+            elapsed * 1000, rows, " (full scan)" if stats["full_scan"] else "",
+            sql, _params_repr(params), "\n".join(stats["plan"] or ["<no plan>"])
+        )
+
+    @staticmethod
+    def explain(conn: sqlite3.Connection, query: str, params: Any) -> List[str]:
+        """План запроса деревом, по строке на узел; при ошибке — текст ошибки"""
+        try:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+        except sqlite3.Error as e:
+            return [f"<EXPLAIN failed: {e}>"]
+        depth: Dict[int, int] = {0: -1}
+        plan = []
+        for node_id, parent, _, detail in rows:
+            depth[node_id] = depth.get(parent, -1) + 1
+            plan.append("  " * depth[node_id] + detail)
+        return plan
+
+    def top(self, limit: int = 20, sort: str = "total_time") -> List[Dict[str, Any]]:
+        """Запросы с наибольшим значением поля sort (total_time, max_time, mean_time, calls, slow_calls, rows)"""
+        with self._lock:
+            stats = [
+                {key: value for key, value in item.items() if key != "explained_at"}
+                for item in self._stats.values()
+            ]
+        for item in stats:
+            item["mean_time"] = item["total_time"] / item["calls"]
+        return sorted(stats, key=lambda item: item[sort], reverse=True)[:limit]
+
+    def reset(self) -> None:
+        """Сбросить накопленную статистику"""
+        with self._lock:
+            self._stats.clear()
+
+
+def query_log_from_env(threshold_ms: Optional[float] = None) -> Optional[QueryLog]:
+    """
+    Журнал по настройкам окружения: DB_SLOW_QUERY_MS (не задан — выключен)
+    и DB_SLOW_QUERY_EXPLAIN_INTERVAL, с.
+    """
+    if threshold_ms is None:
+        value = os.getenv("DB_SLOW_QUERY_MS", "")
+        if not value:
+            return None
+        threshold_ms = float(value)
+    if threshold_ms < 0:
+        return None
+    return QueryLog(
+        threshold_ms / 1000,
+        float(os.getenv("DB_SLOW_QUERY_EXPLAIN_INTERVAL", DEFAULT_EXPLAIN_INTERVAL))
+    )
+
@@ -0,0 +1,94 @@
+"""
+Production-запуск API: uvicorn с несколькими процессами-воркерами.
+
+Запуск из корня репозитория:
+    python -m backend.server [--workers N] [--host 0.0.0.0] [--port 8000]
+
+Настройки окружения: WEB_WORKERS (по умолчанию — число ядер), HOST, PORT;
+хранилище выбирает DATABASE_URL (см. backend/storage).
+Каждый воркер открывает свой пул соединений в lifespan; миграции выполняет
+первый стартовавший воркер под файловой блокировкой, остальные ждут её и
+находят схему готовой. SQLite сам упорядочивает записи разных процессов,
+поэтому DB_STORAGE_PROFILE=wal здесь особенно важен: читатели не ждут писателей.
+
+То же приложение можно запустить под gunicorn:
+    gunicorn backend.app:app -k uvicorn.workers.UvicornWorker -w 4 -b 0.0.0.0:8000
+"""
+import argparse
+import copy
+import logging
+import logging.config
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from uvicorn.config import LOGGING_CONFIG
+
+from backend.storage import storage_from_url
+
+logger = logging.getLogger(__name__)
+
+
+def default_workers() -> int:
+    return int(os.getenv("WEB_WORKERS", os.cpu_count() or 1))
+
+
+def log_config(level: str) -> Dict[str, Any]:
+    """
+    Настройки логирования uvicorn с логгерами приложения (backend.*). uvicorn применяет
+    их в каждом воркере и при reload: basicConfig родителя до порождённых процессов не доходит
+    """
+    config = copy.deepcopy(LOGGING_CONFIG)
+    config["formatters"]["app"] = {
+        "()": "uvicorn.logging.DefaultFormatter",
+        "fmt": "%(levelprefix)s %(name)s: %(message)s",
+    }
+    config["handlers"]["app"] = {"formatter": "app", "class": "logging.StreamHandler", "stream": "ext://sys.stderr"}
+    config["loggers"]["backend"] = {"handlers": ["app"], "level": level.upper(), "propagate": False}
+    return config
+
+
+def check_settings(workers: int) -> None:
+    """Предупредить о настройках, которые ведут себя иначе при нескольких процессах"""
+    if workers > 1 and int(os.getenv("TASK_CACHE_SIZE", "0")) > 0:
+        logger.warning(
+            "TASK_CACHE_SIZE is set with %d workers: each worker has its own cache, so a task changed "
+            "through one worker may be served stale by another for up to TASK_CACHE_TTL seconds",
+            workers
+        )
+    if workers > 1 and os.getenv("DATABASE_URL", "").startswith("memory:"):
+        logger.warning(
+            "DATABASE_URL=memory:// with %d workers: each worker keeps its own tasks in memory, "
+            "so clients will see different data depending on the worker that serves them",
+            workers
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+    logging_config = log_config(args.log_level)
+    logging.config.dictConfig(logging_config)
+
+    check_settings(args.workers)
+    # Схема готовится до запуска воркеров: они стартуют уже без миграций
+    storage_from_url().close()
+    uvicorn.run(
+        "backend.app:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+        log_config=logging_config,
+        proxy_headers=True,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+from typing import Any, Dict, Iterator, List, Optional, Protocol, Sequence, Set, Tuple
+
+from backend.querylog import QueryLog
+
+
+class TaskStorage(Protocol):
+    """
+    Хранилище задач, с которым работают TaskService и app: SQLite (PureDatabase),
+    память процесса (MemoryDatabase) и PostgreSQL (PostgresDatabase).
+
+    Строки задач — словари с ключами id, title, description, priority; точечное
+    чтение и обновление добавляют version. Версия строки растёт при каждом
+    изменении, версия таблицы — при каждой вставке, изменении и удалении (ETag).
+    Каждая запись добавляет событие в журнал изменений с монотонным seq
+    (колонки CHANGE_COLUMNS, op — created, updated или deleted) и обновляет
+    счётчики задач по приоритету.
+
+    Ключи идемпотентности хранятся записями с колонками IDEMPOTENCY_COLUMNS;
+    status None — запрос с ключом ещё выполняется, ответа нет.
+    """
+
+    # Журнал медленных запросов; None — у движка его нет или он выключен
+    query_log: Optional[QueryLog]
+
+    def close(self) -> None: ...
+
+    def pool_stats(self) -> Dict[str, Dict[str, Any]]: ...
+
+    def storage_settings(self) -> Dict[str, Any]: ...
+
+    def sql_insert_task(self, title: str, description: str, priority: str) -> int: ...
+
+    def sql_insert_tasks(self, rows: Sequence[Tuple[str, str, str]]) -> List[int]: ...
+
+    def sql_update_tasks(
+            self,
+            rows: Sequence[Tuple[int, Optional[str], Optional[str], Optional[str]]],
+            atomic: bool = True
+            ) -> Set[int]: ...
+
+    def sql_delete_tasks(self, task_ids: Sequence[int], atomic: bool = True) -> Set[int]: ...
+
+    def sql_select_all_tasks(self) -> List[Dict[str, Any]]: ...
+
+    def sql_select_tasks_page(
+            self,
+            limit: int,
+            after: Optional[Sequence[Any]] = None,
+            priority: Optional[str] = None,
+            sort: str = "id",
+            descending: bool = False
+            ) -> List[Dict[str, Any]]: ...
+
+    def iter_tasks(self, batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]: ...
+
+    def sql_search_tasks(
+            self,
+            text: str,
+            limit: int,
+            ranked: bool = True,
+            after_id: Optional[int] = None,
+            after_rank: Optional[float] = None
+            ) -> List[Dict[str, Any]]: ...
+
+    def sql_select_task_by_id(self, task_id: int) -> Optional[Dict[str, Any]]: ...
+
+    def sql_select_task_version(self, task_id: int) -> Optional[int]: ...
+
+    def sql_select_tasks_version(self) -> int: ...
+
+    def sql_update_task(
+            self,
+            task_id: int,
+            title: str,
+            description: str,
+            priority: str,
+            expected_versions: Optional[Sequence[int]] = None
+            ) -> Optional[Dict[str, Any]]: ...
+
+    def sql_delete_task(self, task_id: int, expected_versions: Optional[Sequence[int]] = None) -> bool: ...
+
+    def sql_select_changes(self, after: int, limit: int) -> List[Dict[str, Any]]: ...
+
+    def sql_select_change_bounds(self) -> Tuple[int, int]: ...
+
+    def sql_prune_changes(self, keep: int) -> int: ...
+
+    def sql_select_task_stats(self) -> Dict[str, int]: ...
+
+    def sql_reconcile_task_stats(self, fix: bool = True) -> Dict[str, Tuple[int, int]]: ...
+
+    def sql_reserve_idempotency_key(
+            self,
+            key: str,
+            fingerprint: str,
+            now: float,
+            expires_at: float
+            ) -> Optional[Dict[str, Any]]: ...
+
+    def sql_complete_idempotency_key(
+            self,
+            key: str,
+            status: int,
+            body: bytes,
+            headers: str,
+            expires_at: float
+            ) -> None: ...
+
+    def sql_delete_idempotency_key(self, key: str) -> None: ...
+
+    def sql_prune_idempotency_keys(self, now: float, keep: int) -> int: ...
@@ -0,0 +1,413 @@
+import bisect
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from backend.database import (
+    CHANGE_COLUMNS, IDEMPOTENCY_COLUMNS, SORT_KEYS, search_tokens, stats_drift, validate_task_rows
+)
+from backend.metrics import timed_query
+from backend.querylog import QueryLog
+
+# Строка задачи: (id, title, description, priority, version); кортеж не меняется,
+# запись заменяет его целиком
+Row = Tuple[int, str, str, str, int]
+# Событие журнала изменений: (seq, op, task_id, version, title, description, priority)
+Change = Tuple[int, str, int, int, Optional[str], Optional[str], Optional[str]]
+
+_ID, _TITLE, _DESCRIPTION, _PRIORITY, _VERSION = range(5)
+_SORT_INDEXES = {"id": _ID, "title": _TITLE}
+
+# Вес слова из title относительно description в ранжировании поиска (как bm25(tasks_fts, 2.0, 1.0))
+_TITLE_WEIGHT = 2
+_WORD = re.compile(r"\w+")
+_CHANGE_KEYS = CHANGE_COLUMNS.split(", ")
+_IDEMPOTENCY_KEYS = IDEMPOTENCY_COLUMNS.split(", ")
+
+
+def _task(row: Row) -> Dict[str, Any]:
+    return {"id": row[_ID], "title": row[_TITLE], "description": row[_DESCRIPTION], "priority": row[_PRIORITY]}
+
+
+def _versioned_task(row: Row) -> Dict[str, Any]:
+    return {**_task(row), "version": row[_VERSION]}
+
+
+def _change(change: Change) -> Dict[str, Any]:
+    return dict(zip(_CHANGE_KEYS, change))
+
+
+def _normalize(word: str) -> str:
+    """Слово без регистра и диакритики, как в токенизаторе unicode61 remove_diacritics 2"""
+    decomposed = unicodedata.normalize("NFKD", word.casefold())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def _words(text: str) -> List[str]:
+    return [_normalize(word) for word in _WORD.findall(text)]
+
+
+class MemoryDatabase:
+    """
+    Хранилище задач в памяти процесса для эфемерных окружений и тестов: данные живут,
+    пока жив процесс, и у каждого воркера свои.
+
+    Строки — неизменяемые кортежи в dict по возрастанию ID (новые ID только растут,
+    порядок вставки сохраняется). Читатели не берут блокировок: точечное чтение —
+    один dict.get, выборки идут по снимку list(values()), который под GIL копируется
+    целиком. Записи выстраиваются на одной блокировке, чтобы проверка версии,
+    замена строки, версия таблицы, счётчики и событие журнала изменений менялись
+    одним шагом.
+    """
+
+    def __init__(self):
+        self.query_log: Optional[QueryLog] = None
+        self._rows: Dict[int, Row] = {}
+        self._last_id = 0
+        self._version = 0
+        self._changes: List[Change] = []
+        self._last_seq = 0
+        # Число задач по приоритету
+        self._stats: Counter[str] = Counter()
+        # Ключ идемпотентности -> запись (колонки IDEMPOTENCY_COLUMNS и created_at) в порядке создания
+        self._idempotency_keys: Dict[str, Dict[str, Any]] = {}
+        self._write_lock = threading.Lock()
+
+    def close(self) -> None:
+        """Освободить данные"""
+        with self._write_lock:
+            self._rows = {}
+            self._changes = []
+            self._stats = Counter()
+            self._idempotency_keys = {}
+
+    def pool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Пулов соединений нет"""
+        return {}
+
+    def storage_settings(self) -> Dict[str, Any]:
+        """Движок и число задач"""
+        return {"engine": "memory", "tasks": len(self._rows)}
+
+    def _snapshot(self) -> List[Row]:
+        return list(self._rows.values())
+
+    def _insert(self, title: str, description: str, priority: str) -> int:
+        self._last_id += 1
+        self._put("created", (self._last_id, title, description if description else "", priority, 1))
+        return self._last_id
+
+    def _put(self, op: str, row: Row) -> None:
+        """Записать строку и событие о ней; вызывается под блокировкой записи"""
+        previous = self._rows.get(row[_ID])
+        if previous is not None:
+            self._stats[previous[_PRIORITY]] -= 1
+        self._stats[row[_PRIORITY]] += 1
+        self._rows[row[_ID]] = row
+        self._version += 1
+        self._log(op, row, row[_TITLE], row[_DESCRIPTION], row[_PRIORITY])
+
+    def _remove(self, task_id: int) -> None:
+        row = self._rows.pop(task_id)
+        self._stats[row[_PRIORITY]] -= 1
+        self._version += 1
+        self._log("deleted", row, None, None, None)
+
+    def _log(self, op: str, row: Row, *fields: Optional[str]) -> None:
+        self._last_seq += 1
+        self._changes.append((self._last_seq, op, row[_ID], row[_VERSION], *fields))
+
+    def _matches(self, row: Row, expected_versions: Optional[Sequence[int]]) -> bool:
+        return expected_versions is None or row[_VERSION] in expected_versions
+
+    @timed_query("insert_task")
+    def sql_insert_task(self, title: str, description: str, priority: str) -> int:
+        """Вставить задачу, вернуть её ID"""
+        with self._write_lock:
+            return self._insert(title, description, priority)
+
+    @timed_query("insert_tasks")
+    def sql_insert_tasks(self, rows: Sequence[Tuple[str, str, str]]) -> List[int]:
+        """Вставить пачку задач, вернуть ID в порядке rows"""
+        if not rows:
+            return []
+        validate_task_rows(rows)
+        with self._write_lock:
+            return [self._insert(title, description, priority) for title, description, priority in rows]
+
+    @timed_query("update_tasks")
+    def sql_update_tasks(
+            self,
+            rows: Sequence[Tuple[int, Optional[str], Optional[str], Optional[str]]],
+            atomic: bool = True
+            ) -> Set[int]:
+        """
+        Частично обновить пачку задач (id, title, description, priority); None оставляет
+        поле без изменений. Вернуть множество найденных ID.
+        В режиме atomic при отсутствии хотя бы одного ID ничего не меняется.
+        """
+        if not rows:
+            return set()
+        with self._write_lock:
+            existing = {row[0] for row in rows if row[0] in self._rows}
+            if atomic and len(existing) < len({row[0] for row in rows}):
+                return existing
+            for task_id, title, description, priority in rows:
+                current = self._rows.get(task_id)
+                if current is None:
+                    continue
+                row = (
+                    task_id,
+                    current[_TITLE] if title is None else title,
+                    current[_DESCRIPTION] if description is None else description,
+                    current[_PRIORITY] if priority is None else priority,
+                    current[_VERSION] + 1,
+                )
+                if row[:_VERSION] != current[:_VERSION]:
+                    self._put("updated", row)
+        return existing
+
+    @timed_query("delete_tasks")
+    def sql_delete_tasks(self, task_ids: Sequence[int], atomic: bool = True) -> Set[int]:
+        """
+        Удалить пачку задач, вернуть множество найденных ID.
+        В режиме atomic при отсутствии хотя бы одного ID ничего не удаляется.
+        """
+        if not task_ids:
+            return set()
+        with self._write_lock:
+            existing = {task_id for task_id in task_ids if task_id in self._rows}
+            if atomic and len(existing) < len(set(task_ids)):
+                return existing
+            for task_id in sorted(existing):
+                self._remove(task_id)
+        return existing
+
+    @timed_query("select_all_tasks")
+    def sql_select_all_tasks(self) -> List[Dict[str, Any]]:
+        """Выбрать все задачи"""
+        return [_task(row) for row in self._snapshot()]
+
+    @timed_query("select_tasks_page")
+    def sql_select_tasks_page(
+            self,
+            limit: int,
+            after: Optional[Sequence[Any]] = None,
+            priority: Optional[str] = None,
+            sort: str = "id",
+            descending: bool = False
+            ) -> List[Dict[str, Any]]:
+        """Выбрать страницу задач после ключа after (keyset-пагинация)"""
+        if after is not None and len(after) != len(SORT_KEYS[sort]):
+            raise ValueError("Invalid cursor")
+        rows = self._snapshot()
+        if priority is not None:
+            rows = [row for row in rows if row[_PRIORITY] == priority]
+        if sort == "id":
+            # Снимок уже упорядочен по ID: ключ страницы находится бинарным поиском
+            keys = [row[_ID] for row in rows]
+            if descending:
+                end = len(rows) if after is None else bisect.bisect_left(keys, after[0])
+                return [_task(row) for row in reversed(rows[max(end - limit, 0):end])]
+            start = 0 if after is None else bisect.bisect_right(keys, after[0])
+            return [_task(row) for row in rows[start:start + limit]]
+        index = _SORT_INDEXES[sort]
+        rows.sort(key=lambda row: (row[index], row[_ID]), reverse=descending)
+        if after is not None:
+            key = tuple(after)
+            rows = [
+                row for row in rows
+                if ((row[index], row[_ID]) < key if descending else (row[index], row[_ID]) > key)
+            ]
+        return [_task(row) for row in rows[:limit]]
+
+    def iter_tasks(self, batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """Потоково выбрать все задачи пачками по batch_size строк из одного снимка"""
+        rows = self._snapshot()
+        for start in range(0, len(rows), batch_size):
+            yield [_task(row) for row in rows[start:start + batch_size]]
+
+    @timed_query("search_tasks")
+    def sql_search_tasks(
+            self,
+            text: str,
+            limit: int,
+            ranked: bool = True,
+            after_id: Optional[int] = None,
+            after_rank: Optional[float] = None
+            ) -> List[Dict[str, Any]]:
+        """
+        Найти задачи, в title или description которых есть все слова из text;
+        последнее слово ищется как префикс. ranked — лучшие совпадения первыми
+        (rank — число совпадений со знаком минус, совпадения в title весят вдвое
+        больше; строки с ключом rank, страницы после (after_rank, after_id)), иначе
+        по возрастанию ID (страницы после after_id).
+        """
+        *words, prefix = [_normalize(word) for word in search_tokens(text)]
+        found: List[Tuple[int, Row]] = []
+        for row in self._snapshot():
+            if not ranked and after_id is not None and row[_ID] <= after_id:
+                continue
+            title, description = _words(row[_TITLE]), _words(row[_DESCRIPTION])
+            document = title + description
+            if all(word in document for word in words) and any(word.startswith(prefix) for word in document):
+                found.append((-self._score(title, description, words, prefix), row))
+        if not ranked:
+            return [_task(row) for _, row in found[:limit]]
+        if after_id is not None:
+            found = [item for item in found if (item[0], item[1][_ID]) > (after_rank, after_id)]
+        found.sort(key=lambda item: (item[0], item[1][_ID]))
+        return [{**_task(row), "rank": rank} for rank, row in found[:limit]]
+
+    @staticmethod
+    def _score(title: List[str], description: List[str], words: List[str], prefix: str) -> int:
+        def hits(document: List[str]) -> int:
+            return sum(word in words or word.startswith(prefix) for word in document)
+        return _TITLE_WEIGHT * hits(title) + hits(description)
+
+    @timed_query("select_task_by_id")
+    def sql_select_task_by_id(self, task_id: int) -> Optional[Dict[str, Any]]:
+        """Выбрать задачу по ID вместе с её версией"""
+        row = self._rows.get(task_id)
+        return _versioned_task(row) if row else None
+
+    @timed_query("select_task_version")
+    def sql_select_task_version(self, task_id: int) -> Optional[int]:
+        """Версия задачи или None, если задачи нет"""
+        row = self._rows.get(task_id)
+        return row[_VERSION] if row else None
+
+    @timed_query("select_tasks_version")
+    def sql_select_tasks_version(self) -> int:
+        """Версия таблицы задач: растёт при каждой вставке, изменении и удалении"""
+        return self._version
+
+    @timed_query("update_task")
+    def sql_update_task(
+            self,
+            task_id: int,
+            title: str,
+            description: str,
+            priority: str,
+            expected_versions: Optional[Sequence[int]] = None
+            ) -> Optional[Dict[str, Any]]:
+        """
+        Обновить задачу, вернуть обновлённую строку с новой версией или None, если задачи нет.
+        С expected_versions строка меняется, только если её версия входит в этот набор.
+        Если в задаче уже эти значения, она не пишется и версия остаётся прежней.
+        """
+        with self._write_lock:
+            current = self._rows.get(task_id)
+            if current is None or not self._matches(current, expected_versions):
+                return None
+            row = (task_id, title, description if description else "", priority, current[_VERSION] + 1)
+            if row[:_VERSION] == current[:_VERSION]:
+                return _versioned_task(current)
+            self._put("updated", row)
+        return _versioned_task(row)
+
+    @timed_query("delete_task")
+    def sql_delete_task(self, task_id: int, expected_versions: Optional[Sequence[int]] = None) -> bool:
+        """Удалить задачу, вернуть False, если задачи нет или её версия не входит в expected_versions"""
+        with self._write_lock:
+            current = self._rows.get(task_id)
+            if current is None or not self._matches(current, expected_versions):
+                return False
+            self._remove(task_id)
+        return True
+
+    @timed_query("select_changes")
+    def sql_select_changes(self, after: int, limit: int) -> List[Dict[str, Any]]:
+        """События журнала изменений с seq больше after по возрастанию seq"""
+        changes = self._changes
+        start = bisect.bisect_right(changes, after, key=lambda change: change[0])
+        return [_change(change) for change in changes[start:start + limit]]
+
+    @timed_query("select_change_bounds")
+    def sql_select_change_bounds(self) -> Tuple[int, int]:
+        """seq самого старого и самого нового события в журнале; (0, 0), если журнал пуст"""
+        changes = self._changes
+        return (changes[0][0], changes[-1][0]) if changes else (0, 0)
+
+    @timed_query("prune_changes")
+    def sql_prune_changes(self, keep: int) -> int:
+        """Оставить в журнале изменений keep последних событий, вернуть число удалённых"""
+        with self._write_lock:
+            pruned = max(len(self._changes) - keep, 0)
+            # Новый список вместо удаления из старого: читатель дочитывает свой снимок
+            self._changes = self._changes[pruned:]
+        return pruned
+
+    @timed_query("select_task_stats")
+    def sql_select_task_stats(self) -> Dict[str, int]:
+        """Число задач по приоритету из счётчиков, которые ведёт каждая запись"""
+        return dict(self._stats)
+
+    @timed_query("reconcile_task_stats")
+    def sql_reconcile_task_stats(self, fix: bool = True) -> Dict[str, Tuple[int, int]]:
+        """
+        Пересчитать задачи по приоритету и сравнить со счётчиками, вернуть расхождения.
+        С fix счётчики заменяются пересчитанными.
+        """
+        with self._write_lock:
+            actual = Counter(row[_PRIORITY] for row in self._rows.values())
+            drift = stats_drift(self._stats, actual)
+            if drift and fix:
+                self._stats = actual
+        return drift
+
+    @timed_query("reserve_idempotency_key")
+    def sql_reserve_idempotency_key(
+            self,
+            key: str,
+            fingerprint: str,
+            now: float,
+            expires_at: float
+            ) -> Optional[Dict[str, Any]]:
+        """
+        Занять ключ идемпотентности до expires_at. Вернуть None, если ключ свободен
+        (или его срок истёк) и теперь занят этим запросом, иначе — его запись.
+        """
+        with self._write_lock:
+            record = self._idempotency_keys.get(key)
+            if record is not None and record["expires_at"] > now:
+                return {name: record[name] for name in _IDEMPOTENCY_KEYS}
+            # Удаление перед вставкой переносит ключ в конец: порядок словаря — порядок создания
+            self._idempotency_keys.pop(key, None)
+            self._idempotency_keys[key] = {
+                "key": key, "fingerprint": fingerprint, "status": None, "body": None, "headers": None,
+                "created_at": now, "expires_at": expires_at,
+            }
+        return None
+
+    @timed_query("complete_idempotency_key")
+    def sql_complete_idempotency_key(
+            self,
+            key: str,
+            status: int,
+            body: bytes,
+            headers: str,
+            expires_at: float
+            ) -> None:
+        """Сохранить ответ на запрос, занявший ключ"""
+        with self._write_lock:
+            record = self._idempotency_keys.get(key)
+            if record is not None:
+                record.update(status=status, body=body, headers=headers, expires_at=expires_at)
+
+    @timed_query("delete_idempotency_key")
+    def sql_delete_idempotency_key(self, key: str) -> None:
+        """Освободить ключ: запрос не удался, повтор выполнится заново"""
+        with self._write_lock:
+            self._idempotency_keys.pop(key, None)
+
+    @timed_query("prune_idempotency_keys")
+    def sql_prune_idempotency_keys(self, now: float, keep: int) -> int:
+        """Удалить истёкшие ключи и все, кроме keep самых новых; вернуть число удалённых"""
+        with self._write_lock:
+            records = self._idempotency_keys
+            live = {key: record for key, record in records.items() if record["expires_at"] > now}
+            self._idempotency_keys = dict(list(live.items())[max(len(live) - keep, 0):])
+            return len(records) - len(self._idempotency_keys)
@@ -1,11 +1,105 @@
-from typing import List, Optional
-from backend.database import PureDatabase
-from backend.model import PriorityModel, TaskRequest, TaskResponse
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from backend.batcher import WriteBatcher, batcher_from_env
+from backend.cache import LRUCache, Snapshot
+from backend.cursor import decode_cursor, encode_cursor
+from backend.database import SORT_KEYS
+from backend.model import (
+    BulkItemResult, BulkItemStatusModel, BulkModeModel, BulkResponse, ExportFormatModel,
+    PriorityModel, SearchSortModel, TaskModel, TaskPatchModel, TaskRequest, TaskResponse, TaskSortModel,
+    TaskStatsResponse
+)
+from backend.storage import TaskStorage, storage_from_url
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+EXPORT_BATCH_SIZE = 1000
+MAX_BULK_SIZE = 10_000
+CHANGES_BATCH_SIZE = 500
+DEFAULT_CACHE_TTL = 60.0
+
+_PRIORITY_VALUES = frozenset(priority.value for priority in PriorityModel)
+_TASK_LIST_ADAPTER = TypeAdapter(List[TaskModel])
+_RESPONSE_LIST_ADAPTER = TypeAdapter(List[TaskResponse])
+_PATCH_LIST_ADAPTER = TypeAdapter(List[TaskPatchModel])
+_SUCCEEDED = {BulkItemStatusModel.CREATED, BulkItemStatusModel.UPDATED, BulkItemStatusModel.DELETED}
+_FAILED = {BulkItemStatusModel.NOT_FOUND, BulkItemStatusModel.INVALID}
+
+# Запись кэша: задача и её версия (для ETag)
+VersionedTask = Tuple[TaskResponse, int]
+
+
+class VersionConflictError(ValueError):
+    """Версия задачи не совпала с ожидаемой (If-Match)"""
+
+
+def cache_from_env() -> Optional[LRUCache[VersionedTask]]:
+    """
+    Кэш задач по настройкам окружения: TASK_CACHE_SIZE (0 — выключен) и TASK_CACHE_TTL.
+    """
+    max_entries = int(os.getenv("TASK_CACHE_SIZE", "0"))
+    if max_entries <= 0:
+        return None
+    return LRUCache(max_entries, float(os.getenv("TASK_CACHE_TTL", DEFAULT_CACHE_TTL)))
+
 
 class TaskService:
-    def __init__(self):
-        self.db = PureDatabase()
-    
+    def __init__(
+            self,
+            db: Optional[TaskStorage] = None,
+            cache: Optional[LRUCache[VersionedTask]] = None,
+            batcher: Optional[WriteBatcher] = None
+            ):
+        self._db = db
+        self.cache = cache if cache is not None else cache_from_env()
+        self.batcher = batcher
+        self._open_lock = threading.Lock()
+        self._change_listeners: List[Callable[[], None]] = []
+        if db is not None and batcher is None:
+            self.batcher = batcher_from_env(db)
+
+    @property
+    def db(self) -> TaskStorage:
+        """
+        Хранилище задач; если его не передали в конструктор, оно открывается при первом обращении.
+        """
+        if self._db is None:
+            self.open()
+        return self._db
+
+    def open(self) -> None:
+        """
+        Открыть хранилище из DATABASE_URL, если оно ещё не открыто: пул соединений,
+        миграции, group commit. Вызывается из lifespan каждого воркера, чтобы импорт
+        модуля не трогал БД.
+        """
+        with self._open_lock:
+            if self._db is None:
+                self._db = storage_from_url()
+                if self.batcher is None:
+                    self.batcher = batcher_from_env(self._db)
+
+    @property
+    def _writer(self):
+        """Куда идут одиночные записи: в group commit, если он включён, иначе прямо в БД"""
+        db = self.db
+        return self.batcher if self.batcher is not None else db
+
+    def close(self) -> None:
+        """
+        Освободить ресурсы хранилища; следующий open() (новый lifespan в том же процессе)
+        откроет их заново.
+        """
+        if self.batcher is not None:
+            self.batcher.close()
+            self.batcher = None
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
     def create(
             self, 
             title: str, 
@@ -18,80 +112,474 @@ class TaskService:
         if title is None or (isinstance(title, str) and len(title) == 0):
             raise ValueError("Title cannot be empty")
         
-        task_id = self.db.sql_insert_task(title, description, priority.value)
+        # id ещё неизвестен, поэтому отметка по всему кэшу
+        snapshot = self.cache.snapshot() if self.cache is not None else None
+        task_id = self._writer.sql_insert_task(title, description, priority.value)
         
-        return TaskResponse(
+        task = TaskResponse(
             id=task_id,
             title=title,
             description=description,
             priority=priority
         )
+        self._write_through(task_id, (task, 1), snapshot)
+        return task
     
+    def create_many(
+            self,
+            items: List[Dict[str, Any]],
+            mode: BulkModeModel = BulkModeModel.ATOMIC
+            ) -> BulkResponse:
+        """
+        Создать пачку задач: валидация всей пачки разом и одна транзакция executemany.
+        """
+        tasks, results = self._validate_batch(_TASK_LIST_ADAPTER, TaskModel, items)
+        if results and mode == BulkModeModel.ATOMIC:
+            return self._skip_rest(mode, results, {index: None for index in tasks})
+
+        task_ids = self.db.sql_insert_tasks(
+            [(task.title, task.description, task.priority.value) for task in tasks.values()]
+        )
+        for index, task_id in zip(tasks, task_ids):
+            results[index] = BulkItemResult(index=index, id=task_id, status=BulkItemStatusModel.CREATED)
+        self._notify_change()
+        return self._bulk_response(mode, True, results)
+
+    def update_many(
+            self,
+            items: List[Dict[str, Any]],
+            mode: BulkModeModel = BulkModeModel.ATOMIC
+            ) -> BulkResponse:
+        """
+        Частично обновить пачку задач одной транзакцией.
+        """
+        patches, results = self._validate_batch(_PATCH_LIST_ADAPTER, TaskPatchModel, items)
+        if results and mode == BulkModeModel.ATOMIC:
+            return self._skip_rest(mode, results, {index: patch.id for index, patch in patches.items()})
+
+        existing = self.db.sql_update_tasks(
+            [
+                (patch.id, patch.title, patch.description, patch.priority.value if patch.priority else None)
+                for patch in patches.values()
+            ],
+            atomic=mode == BulkModeModel.ATOMIC
+        )
+        self._invalidate(existing)
+        task_ids = {index: patch.id for index, patch in patches.items()}
+        return self._write_results(mode, results, task_ids, existing, BulkItemStatusModel.UPDATED)
+
+    def delete_many(
+            self,
+            task_ids: List[int],
+            mode: BulkModeModel = BulkModeModel.ATOMIC
+            ) -> BulkResponse:
+        """
+        Удалить пачку задач одной транзакцией.
+        """
+        self._check_batch_size(task_ids)
+        existing = self.db.sql_delete_tasks(task_ids, atomic=mode == BulkModeModel.ATOMIC)
+        self._invalidate(existing)
+        return self._write_results(mode, {}, dict(enumerate(task_ids)), existing, BulkItemStatusModel.DELETED)
+
+    def _invalidate(self, task_ids: Iterable[int]) -> None:
+        if self.cache is not None and task_ids:
+            self.cache.invalidate_many(task_ids)
+        self._notify_change()
+
+    def _write_through(self, task_id: int, value: VersionedTask, snapshot: Optional[Snapshot]) -> None:
+        """
+        Положить в кэш задачу, записанную после snapshot. Если с snapshot задачу
+        могли изменить или удалить другие записи, запись кэша сбрасывается.
+        """
+        if self.cache is not None:
+            self.cache.write_through(task_id, value, snapshot)
+        self._notify_change()
+
+    def add_change_listener(self, listener: Callable[[], None]) -> None:
+        """
+        Вызывать listener после каждой записи через сервис (в потоке, который писал).
+        Сами события читаются из журнала изменений через changes().
+        """
+        if listener not in self._change_listeners:
+            self._change_listeners.append(listener)
+
+    def _notify_change(self) -> None:
+        for listener in self._change_listeners:
+            listener()
+
+    def changes(self, after: int, limit: int = CHANGES_BATCH_SIZE) -> List[Dict[str, Any]]:
+        """
+        События журнала изменений с seq больше after: seq, op (created, updated, deleted),
+        id и version задачи и её поля после записи; у удалённой задачи task — None.
+        """
+        return [
+            {
+                "seq": row["seq"],
+                "op": row["op"],
+                "id": row["task_id"],
+                "version": row["version"],
+                "task": None if row["op"] == "deleted" else {
+                    "id": row["task_id"],
+                    "title": row["title"],
+                    "description": row["description"],
+                    "priority": row["priority"],
+                },
+            }
+            for row in self.db.sql_select_changes(after, limit)
+        ]
+
+    def change_bounds(self) -> Tuple[int, int]:
+        """
+        seq самого старого и самого нового события журнала изменений; (0, 0) для пустого.
+        """
+        return self.db.sql_select_change_bounds()
+
+    def prune_changes(self, keep: int) -> int:
+        """
+        Оставить в журнале изменений keep последних событий.
+        """
+        return self.db.sql_prune_changes(keep)
+
+    @staticmethod
+    def _check_batch_size(items: List[Any]) -> None:
+        if len(items) > MAX_BULK_SIZE:
+            raise ValueError(f"Batch size {len(items)} exceeds the limit of {MAX_BULK_SIZE}")
+
+    def _validate_batch(
+            self,
+            adapter: TypeAdapter,
+            model: type,
+            items: List[Dict[str, Any]]
+            ) -> Tuple[Dict[int, BaseModel], Dict[int, BulkItemResult]]:
+        """
+        Провалидировать пачку одним вызовом; при ошибках вернуть валидные элементы
+        и результаты INVALID для остальных.
+        """
+        self._check_batch_size(items)
+        try:
+            return dict(enumerate(adapter.validate_python(items))), {}
+        except ValidationError as e:
+            errors: Dict[int, str] = {}
+            for error in e.errors():
+                index, *field = error["loc"]
+                errors.setdefault(index, f"{'.'.join(map(str, field)) or 'item'}: {error['msg']}")
+        valid = {
+            index: model.model_validate(item)
+            for index, item in enumerate(items)
+            if index not in errors
+        }
+        invalid = {
+            index: BulkItemResult(index=index, status=BulkItemStatusModel.INVALID, detail=detail)
+            for index, detail in errors.items()
+        }
+        return valid, invalid
+
+    def _write_results(
+            self,
+            mode: BulkModeModel,
+            results: Dict[int, BulkItemResult],
+            task_ids: Dict[int, int],
+            existing: set,
+            status: BulkItemStatusModel
+            ) -> BulkResponse:
+        applied = mode == BulkModeModel.PARTIAL or existing.issuperset(task_ids.values())
+        for index, task_id in task_ids.items():
+            if task_id not in existing:
+                results[index] = BulkItemResult(
+                    index=index,
+                    id=task_id,
+                    status=BulkItemStatusModel.NOT_FOUND,
+                    detail=f"Task with id {task_id} not found"
+                )
+            else:
+                results[index] = BulkItemResult(
+                    index=index,
+                    id=task_id,
+                    status=status if applied else BulkItemStatusModel.SKIPPED
+                )
+        return self._bulk_response(mode, applied, results)
+
+    def _skip_rest(
+            self,
+            mode: BulkModeModel,
+            results: Dict[int, BulkItemResult],
+            skipped: Dict[int, Optional[int]]
+            ) -> BulkResponse:
+        for index, task_id in skipped.items():
+            results[index] = BulkItemResult(index=index, id=task_id, status=BulkItemStatusModel.SKIPPED)
+        return self._bulk_response(mode, False, results)
+
+    @staticmethod
+    def _bulk_response(
+            mode: BulkModeModel,
+            applied: bool,
+            results: Dict[int, BulkItemResult]
+            ) -> BulkResponse:
+        items = [results[index] for index in sorted(results)]
+        return BulkResponse(
+            mode=mode,
+            applied=applied,
+            succeeded=sum(item.status in _SUCCEEDED for item in items),
+            failed=sum(item.status in _FAILED for item in items),
+            items=items
+        )
+
     def get_all(self) -> List[TaskResponse]:
         """
         Получить все задачи.
         """
-        tasks_dict = self.db.sql_select_all_tasks()
+        return self._to_responses(self.db.sql_select_all_tasks())
+    
+    def export(
+            self,
+            export_format: ExportFormatModel = ExportFormatModel.NDJSON,
+            batch_size: int = EXPORT_BATCH_SIZE
+            ) -> Iterator[bytes]:
+        """
+        Выгрузить все задачи потоком байтов: по одному чанку на пачку строк из БД.
+        Строки с невалидным приоритетом пропускаются, как и в get_all.
+        """
+        ndjson = export_format == ExportFormatModel.NDJSON
+        if not ndjson:
+            yield b"["
+        separator = ""
+        for rows in self.db.iter_tasks(batch_size):
+            lines = [
+                json.dumps(row, ensure_ascii=False)
+                for row in rows
+                if row.get("priority") in _PRIORITY_VALUES
+            ]
+            if not lines:
+                continue
+            if ndjson:
+                yield ("\n".join(lines) + "\n").encode()
+            else:
+                yield (separator + ",".join(lines)).encode()
+                separator = ","
+        if not ndjson:
+            yield b"]"
+
+    def get_page(
+            self,
+            limit: int = DEFAULT_PAGE_SIZE,
+            cursor: Optional[str] = None,
+            after_id: Optional[int] = None,
+            priority: Optional[PriorityModel] = None,
+            sort: TaskSortModel = TaskSortModel.ID
+            ) -> Tuple[List[TaskResponse], Optional[str]]:
+        """
+        Получить страницу задач и курсор следующей страницы (None, если это последняя).
+        """
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"Limit must be between 1 and {MAX_PAGE_SIZE}")
+        if cursor is not None and after_id is not None:
+            raise ValueError("Use either cursor or after_id, not both")
+
+        sort = TaskSortModel(sort)
+        descending = sort.value.startswith("-")
+        column = sort.value.lstrip("-")
+
+        after = None
+        if cursor is not None:
+            cursor_sort, after = decode_cursor(cursor)
+            if cursor_sort != sort.value:
+                raise ValueError(f"Cursor was issued for sort '{cursor_sort}', not '{sort.value}'")
+        elif after_id is not None:
+            after = self._sort_key_of(after_id, column)
+
+        rows = self.db.sql_select_tasks_page(
+            limit + 1,
+            after=after,
+            priority=priority.value if priority else None,
+            sort=column,
+            descending=descending
+        )
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(sort.value, [rows[-1][key] for key in SORT_KEYS[column]])
+        return self._to_responses(rows), next_cursor
+
+    def search(
+            self,
+            query: str,
+            limit: int = DEFAULT_PAGE_SIZE,
+            cursor: Optional[str] = None,
+            sort: SearchSortModel = SearchSortModel.RELEVANCE
+            ) -> Tuple[List[TaskResponse], Optional[str]]:
+        """
+        Полнотекстовый поиск по title и description: страница результатов и курсор следующей.
+        """
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"Limit must be between 1 and {MAX_PAGE_SIZE}")
+        sort = SearchSortModel(sort)
+        ranked = sort == SearchSortModel.RELEVANCE
+
+        # Обе сортировки листаются по ключу последней записи: (rank, id) или id
+        after_rank, after_id = None, None
+        if cursor is not None:
+            cursor_sort, key = decode_cursor(cursor)
+            if cursor_sort != f"search:{sort.value}" or len(key) != (2 if ranked else 1) \
+                    or not isinstance(key[-1], int) or (ranked and isinstance(key[0], str)):
+                raise ValueError("Invalid cursor")
+            after_rank, after_id = key if ranked else (None, key[0])
+
+        rows = self.db.sql_search_tasks(query, limit + 1, ranked=ranked, after_id=after_id, after_rank=after_rank)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_key = [rows[-1]["rank"], rows[-1]["id"]] if ranked else [rows[-1]["id"]]
+            next_cursor = encode_cursor(f"search:{sort.value}", next_key)
+        return self._to_responses(rows), next_cursor
+
+    def _sort_key_of(self, task_id: int, column: str) -> List[Any]:
+        """
+        Ключ сортировки задачи для after_id.
+        """
+        if column == "id":
+            return [task_id]
+        task = self.db.sql_select_task_by_id(task_id)
+        if not task:
+            raise ValueError(f"Task with id {task_id} not found")
+        return [task[key] for key in SORT_KEYS[column]]
+
+    @staticmethod
+    def _to_responses(rows: List[Dict[str, Any]]) -> List[TaskResponse]:
+        """
+        Собрать TaskResponse для пачки строк одной валидацией в pydantic-core.
+        Если в пачке есть невалидные строки, они пропускаются поштучно.
+        """
+        try:
+            return _RESPONSE_LIST_ADAPTER.validate_python(rows)
+        except ValidationError:
+            pass
         tasks = []
-        for task in tasks_dict:
+        for row in rows:
             try:
-                task['priority'] = PriorityModel(task['priority'])
-                tasks.append(TaskResponse(**task))
-            except (ValueError, KeyError):
+                tasks.append(TaskResponse.model_validate(row))
+            except ValidationError:
                 continue
         return tasks
-    
+
     def get(self, task_id: int) -> Optional[TaskResponse]:
         """
-        Получить задачу по ID.
+        Получить задачу по ID (через кэш, если он включён).
+        """
+        return self.get_versioned(task_id)[0]
+
+    def get_versioned(self, task_id: int) -> VersionedTask:
         """
+        Получить задачу по ID вместе с её версией (через кэш, если он включён).
+        """
+        if self.cache is not None:
+            cached = self.cache.get(task_id)
+            if cached is not None:
+                return cached
+            snapshot = self.cache.snapshot(task_id)
+
         task_dict = self.db.sql_select_task_by_id(task_id)
         if not task_dict:
             raise ValueError(f"Task with id {task_id} not found")
-        
+        version = task_dict["version"]
+
         try:
-            task_dict['priority'] = PriorityModel(task_dict['priority'])
-            return TaskResponse(**task_dict)
-        except (ValueError, KeyError):
+            task = TaskResponse.model_validate(task_dict)
+        except ValidationError:
             raise ValueError(f"Invalid priority '{task_dict.get('priority')}' for task {task_id}")
-    
+
+        if self.cache is not None:
+            self.cache.set(task_id, (task, version), snapshot)
+        return task, version
+
+    def get_version(self, task_id: int) -> Optional[int]:
+        """
+        Версия задачи без чтения самой задачи; None, если задачи нет.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(task_id)
+            if cached is not None:
+                return cached[1]
+        return self.db.sql_select_task_version(task_id)
+
+    def stats(self) -> TaskStatsResponse:
+        """
+        Число задач всего и по приоритетам из счётчиков, без чтения самих задач.
+        """
+        counts = self.db.sql_select_task_stats()
+        by_priority = {priority: counts.get(priority.value, 0) for priority in PriorityModel}
+        return TaskStatsResponse(total=sum(by_priority.values()), by_priority=by_priority)
+
+    def reconcile_stats(self, fix: bool = True) -> Dict[str, Tuple[int, int]]:
+        """
+        Сверить счётчики задач с пересчётом по таблице, вернуть расхождения
+        {priority: (в счётчике, на самом деле)}; с fix — исправить счётчики.
+        """
+        return self.db.sql_reconcile_task_stats(fix)
+
+    def list_version(self) -> int:
+        """
+        Версия таблицы задач: меняется при любой записи.
+        """
+        return self.db.sql_select_tasks_version()
+
     def update(
             self, 
             task_id: int, 
             update_data: TaskRequest
             ) -> TaskResponse:
         """
-        Обновить задачу.
+        Обновить задачу одним оператором UPDATE ... RETURNING.
         """
+        return self.update_versioned(task_id, update_data)[0]
 
-        existing = self.get(task_id)
-        if not existing:
-            raise ValueError(f"Task with id {task_id} not found") 
-        
-        
-        success = self.db.sql_update_task(
+    def update_versioned(
+            self,
+            task_id: int,
+            update_data: TaskRequest,
+            expected_versions: Optional[List[int]] = None
+            ) -> VersionedTask:
+        """
+        Обновить задачу и вернуть её новую версию. С expected_versions
+        обновление условное: при другой версии задачи — VersionConflictError.
+        """
+        snapshot = self.cache.snapshot(task_id) if self.cache is not None else None
+        row = self._writer.sql_update_task(
             task_id, 
             update_data.title,          
             update_data.description,      
-            update_data.priority.value   
+            update_data.priority.value,
+            expected_versions=expected_versions
         )
-        if not success:
-            raise ValueError(f"Failed to update task with id {task_id}")
-        
-        updated_task = self.get(task_id)
-        if not updated_task:
-            raise ValueError(f"Task with id {task_id} not found after update")
-        
-        return updated_task
+        if row is None:
+            self._invalidate((task_id,))
+            self._raise_write_failed(task_id, expected_versions)
+
+        version = row["version"]
+        updated_task = TaskResponse.model_validate(row)
+        self._write_through(task_id, (updated_task, version), snapshot)
+        return updated_task, version
     
-    def delete(self, task_id: int) -> bool:
+    def delete(self, task_id: int, expected_versions: Optional[List[int]] = None) -> bool:
         """
-        Удалить задачу.
+        Удалить задачу одним оператором DELETE ... RETURNING.
+        С expected_versions удаление условное, как в update_versioned.
         """
-        existing = self.get(task_id)
-        if not existing:
-            raise ValueError(f"Task with id {task_id} not found") 
-        return self.db.sql_delete_task(task_id)
+        deleted = self._writer.sql_delete_task(task_id, expected_versions=expected_versions)
+        self._invalidate((task_id,))
+        if not deleted:
+            self._raise_write_failed(task_id, expected_versions)
+        return deleted
 
+    def _raise_write_failed(self, task_id: int, expected_versions: Optional[List[int]]) -> None:
+        """
+        Условная запись не нашла строку: задачи нет или у неё другая версия.
+        """
+        if expected_versions is not None:
+            current = self.db.sql_select_task_version(task_id)
+            if current is not None:
+                raise VersionConflictError(
+                    f"Task with id {task_id} has version {current}, expected one of {expected_versions}"
+                )
+        raise ValueError(f"Task with id {task_id} not found")
 
 task_service = TaskService()
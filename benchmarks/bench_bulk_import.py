@@ -0,0 +1,67 @@
+"""
+Бенчмарк импорта: N вызовов POST /api/v1/tasks против одного POST /api/v1/tasks/bulk.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_bulk_import --tasks 2000
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from backend.app import app
+from backend.database import PureDatabase
+from backend.task import TaskService
+
+
+def make_items(count: int):
+    return [
+        {"title": f"Задача {i}", "description": "Импорт", "priority": ("low", "medium", "high")[i % 3]}
+        for i in range(count)
+    ]
+
+
+def import_one_by_one(client: TestClient, items) -> float:
+    started = time.perf_counter()
+    for item in items:
+        client.post("/api/v1/tasks", json=item).raise_for_status()
+    return time.perf_counter() - started
+
+
+def import_bulk(client: TestClient, items, batch_size: int) -> float:
+    started = time.perf_counter()
+    for offset in range(0, len(items), batch_size):
+        client.post("/api/v1/tasks/bulk", json=items[offset:offset + batch_size]).raise_for_status()
+    return time.perf_counter() - started
+
+
+def run(db_path: str, importer, *args) -> float:
+    db = PureDatabase(db_path)
+    try:
+        with patch("backend.app.task_service", TaskService(db=db)):
+            return importer(TestClient(app), *args)
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    items = make_items(args.tasks)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        single = run(str(Path(tmp) / "single.db"), import_one_by_one, items)
+        bulk = run(str(Path(tmp) / "bulk.db"), import_bulk, items, args.batch_size)
+
+    print(f"POST /tasks x{args.tasks}: {args.tasks / single:10.1f} tasks/s")
+    print(f"POST /tasks/bulk:       {args.tasks / bulk:10.1f} tasks/s")
+    print(f"speedup:                {single / bulk:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Бенчмарк сжатия ответа со списком задач: байты на проводе и CPU на ответ
+для gzip и brotli на разных уровнях и размерах списка.
+
+Уровни по умолчанию CompressionMiddleware (gzip 6, brotli 5) выбраны по этой
+таблице: дальше размер почти не падает, а время растёт кратно. Ответы меньше
+COMPRESSION_MIN_SIZE middleware не сжимает вовсе.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_compression --tasks 1 --tasks 10 --tasks 100 --tasks 1000 --tasks 10000
+    python -m benchmarks.bench_compression --json benchmarks/results/compression.json
+
+brotli — необязательная зависимость (pip install brotli); без неё замеряется только gzip.
+"""
+import argparse
+import gzip
+import random
+import time
+from typing import Any, Callable, Dict, List
+
+from pydantic_core import to_json
+
+from backend.compression import brotli
+from backend.task import TaskService
+from benchmarks.common import PRIORITIES, environment, write_results
+
+DEFAULT_TASKS = (1, 10, 100, 1000, 10_000)
+
+WORDS = [
+    "позвонить", "купить", "написать", "отправить", "проверить", "починить", "оплатить",
+    "отчёт", "письмо", "счёт", "продукты", "маме", "врачу", "машину", "договор", "релиз",
+    "сервер", "встречу", "презентацию", "билеты", "квартиру", "налог", "ремонт", "проект",
+]
+
+
+def make_payload(count: int, seed: int) -> bytes:
+    """Тело GET /api/v1/tasks из count задач со случайными заголовками и описаниями"""
+    rnd = random.Random(seed)
+    rows = [
+        {
+            "id": i,
+            "title": " ".join(rnd.sample(WORDS, 3)).capitalize(),
+            "description": " ".join(rnd.choices(WORDS, k=rnd.randint(3, 12))),
+            "priority": PRIORITIES[i % 3],
+        }
+        for i in range(1, count + 1)
+    ]
+    return to_json(TaskService._to_responses(rows))
+
+
+def codecs() -> Dict[str, Callable[[bytes], bytes]]:
+    cases: Dict[str, Callable[[bytes], bytes]] = {}
+    for level in (1, 6, 9):
+        cases[f"gzip-{level}"] = lambda body, level=level: gzip.compress(body, compresslevel=level)
+    if brotli is not None:
+        for quality in (1, 5, 6, 11):
+            cases[f"br-{quality}"] = lambda body, quality=quality: brotli.compress(body, quality=quality)
+    return cases
+
+
+def cpu_per_call(fn: Callable[[], Any], min_time: float = 0.2) -> float:
+    """CPU процесса на один вызов, с: вызовы повторяются, пока не наберётся min_time"""
+    calls = 0
+    started = time.process_time()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.process_time() - started
+        if elapsed >= min_time:
+            return elapsed / calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, action="append", help=f"размеры списка, по умолчанию {DEFAULT_TASKS}")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="записать результаты в JSON-файл")
+    args = parser.parse_args()
+    if brotli is None:
+        print("brotli is not installed: only gzip is measured")
+
+    results: List[Dict[str, Any]] = []
+    for count in args.tasks or DEFAULT_TASKS:
+        body = make_payload(count, args.seed)
+        print(f"\n{count} tasks, {len(body)} bytes")
+        for name, compress in codecs().items():
+            size = len(compress(body))
+            cpu = cpu_per_call(lambda: compress(body))
+            print(f"  {name:<8} {size:>10} bytes  {len(body) / size:6.1f}x  {cpu * 1000:9.3f} ms CPU  "
+                  f"{len(body) / cpu / 2 ** 20:8.1f} MiB/s")
+            results.append({
+                "name": name, "tasks": count, "bytes": len(body), "compressed_bytes": size,
+                "ratio": round(len(body) / size, 2), "cpu_ms": round(cpu * 1000, 4),
+            })
+    if args.json:
+        write_results(args.json, environment(), results)
+
+
+if __name__ == "__main__":
+    main()
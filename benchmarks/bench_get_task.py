@@ -0,0 +1,75 @@
+"""
+Бенчмарк GET /api/v1/tasks/{id}: соединение на запрос против пула.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_get_task --requests 5000 --concurrency 32
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+
+from backend.app import app
+from backend.database import PureDatabase
+from backend.task import TaskService
+
+
+def seed(db: PureDatabase, rows: int) -> None:
+    for i in range(rows):
+        db.sql_insert_task(f"Задача {i}", "Описание", "medium")
+
+
+async def run_load(requests: int, concurrency: int, max_id: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        queue = iter(range(requests))
+
+        async def worker():
+            for _ in queue:
+                response = await client.get(f"/api/v1/tasks/{random.randint(1, max_id)}")
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - started
+
+
+def bench(db_path: str, pool_size: int, requests: int, concurrency: int, rows: int) -> float:
+    db = PureDatabase(db_path, pool_size=pool_size)
+    try:
+        with patch("backend.app.task_service", TaskService(db=db)):
+            elapsed = asyncio.run(run_load(requests, concurrency, rows))
+    finally:
+        db.close()
+    return requests / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--pool-size", type=int, default=40)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "bench.db")
+        seed_db = PureDatabase(db_path, pool_size=1)
+        seed(seed_db, args.rows)
+        seed_db.close()
+
+        before = bench(db_path, 0, args.requests, args.concurrency, args.rows)
+        after = bench(db_path, args.pool_size, args.requests, args.concurrency, args.rows)
+
+    print(f"connect-per-query: {before:10.1f} req/s")
+    print(f"pool (size={args.pool_size}):    {after:10.1f} req/s")
+    print(f"speedup:           {after / before:10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
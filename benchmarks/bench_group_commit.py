@@ -0,0 +1,69 @@
+"""
+Бенчмарк group commit: поток одиночных TaskService.create из N параллельных потоков
+(как из пула db_executor) с фиксацией на каждую запись и с WriteBatcher.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_group_commit --threads 40 --tasks 4000 --profile safe
+"""
+import argparse
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pysqlite3 as sqlite3
+
+from backend.batcher import WriteBatcher
+from backend.database import PureDatabase
+from backend.model import PriorityModel
+from backend.task import TaskService
+
+
+def run(db_path: str, profile: str, threads: int, tasks: int, delay_ms: float, max_batch: int) -> float:
+    """Подтверждённых записей в секунду; ошибки записи (database is locked) печатаются отдельно"""
+    db = PureDatabase(db_path, pool_size=threads, storage_profile=profile)
+    batcher = WriteBatcher(db, delay_ms / 1000, max_batch) if delay_ms >= 0 else None
+    service = TaskService(db=db, batcher=batcher)
+
+    def create(i: int) -> bool:
+        try:
+            service.create(f"Задача {i}", "Описание", PriorityModel.LOW)
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            acknowledged = sum(pool.map(create, range(tasks)))
+        elapsed = time.perf_counter() - started
+        if acknowledged < tasks:
+            print(f"  failed writes: {tasks - acknowledged}")
+        if batcher is not None:
+            print(f"  batches: {batcher.stats()}")
+        return acknowledged / elapsed
+    finally:
+        service.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=40)
+    parser.add_argument("--tasks", type=int, default=4000)
+    parser.add_argument("--profile", choices=["safe", "wal"], default="safe")
+    parser.add_argument("--delay-ms", type=float, default=2.0)
+    parser.add_argument("--max-batch", type=int, default=256)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        single = run(str(Path(tmp) / "single.db"), args.profile, args.threads, args.tasks, -1, 1)
+        print(f"commit per insert:  {single:10.1f} tasks/s")
+        grouped = run(
+            str(Path(tmp) / "grouped.db"), args.profile, args.threads, args.tasks, args.delay_ms, args.max_batch
+        )
+        print(f"group commit:       {grouped:10.1f} tasks/s")
+    print(f"speedup:            {grouped / single:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
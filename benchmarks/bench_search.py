@@ -0,0 +1,92 @@
+"""
+Бенчмарк полнотекстового поиска: PureDatabase.sql_search_tasks (FTS5) против
+фильтрации результата sql_select_all_tasks на стороне клиента.
+
+Сортировка relevance ранжирует все совпадения (время растёт с их числом),
+сортировка id отдаёт первые совпадения потоково.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_search --tasks 1000000
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from backend.database import PureDatabase
+
+WORDS = [
+    "позвонить", "купить", "написать", "отправить", "проверить", "починить", "оплатить",
+    "отчёт", "письмо", "счёт", "продукты", "маме", "врачу", "машину", "договор", "релиз",
+    "сервер", "встречу", "презентацию", "билеты", "квартиру", "налог", "ремонт", "проект",
+]
+RARE_WORDS = ["кракен", "зефир", "лабиринт", "обсерватория"]
+
+QUERIES = {
+    "rare word": "кракен",
+    "prefix": "обсерв",
+    "two words": "купить продукты",
+    "common word": "отчёт",
+}
+
+
+def fill(db: PureDatabase, count: int, seed: int, batch_size: int = 10_000) -> None:
+    rnd = random.Random(seed)
+    for offset in range(0, count, batch_size):
+        rows = []
+        for i in range(offset, min(offset + batch_size, count)):
+            words = rnd.sample(WORDS, 3)
+            if i % 10_000 == 0:
+                words.append(RARE_WORDS[(i // 10_000) % len(RARE_WORDS)])
+            rows.append((" ".join(words[:2])[:30], " ".join(words[2:])[:50], ("low", "medium", "high")[i % 3]))
+        db.sql_insert_tasks(rows)
+
+
+def measure(fn, repeat: int) -> float:
+    """Медиана времени вызова, мс"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def client_filter(db: PureDatabase, text: str, limit: int):
+    words = text.lower().split()
+    matches = [
+        task for task in db.sql_select_all_tasks()
+        if all(word in f"{task['title']} {task['description']}".lower() for word in words)
+    ]
+    return matches[:limit]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = PureDatabase(str(Path(tmp) / "search.db"), pool_size=1)
+        try:
+            started = time.perf_counter()
+            fill(db, args.tasks, args.seed)
+            print(f"filled {args.tasks} tasks in {time.perf_counter() - started:.1f} s")
+
+            for ranked in (True, False):
+                for name, text in QUERIES.items():
+                    fts = measure(lambda: db.sql_search_tasks(text, args.limit, ranked=ranked), args.repeat)
+                    print(f"FTS5 {'relevance' if ranked else 'id':9} {name:12} {text!r:20} {fts:8.3f} ms")
+            scan = measure(lambda: client_filter(db, QUERIES["rare word"], args.limit), 1)
+            print(f"client-side filter (rare word):         {scan:8.1f} ms")
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
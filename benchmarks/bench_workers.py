@@ -0,0 +1,95 @@
+"""
+Бенчмарк масштабирования по воркерам: backend.server с 1, 2, 4 ... процессами
+под одной и той же HTTP-нагрузкой (сценарии из benchmarks.suite).
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_workers --workers 1 --workers 2 --workers 4 --workload read_heavy
+
+Сервер стартует в отдельном процессе с БД во временном каталоге; клиент тоже
+занимает ядро, поэтому на машине с N ядрами имеет смысл мерить до N-1 воркеров.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.common import environment, write_results
+from benchmarks.suite import WORKLOADS, run_workload, server_ids
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/api/v1/tasks", params={"limit": 1}).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"Server at {url} did not start in {timeout} s")
+
+
+async def load(url: str, workload: str, concurrency: int, duration: float, seed: int) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        ids = await server_ids(client)
+        return await run_workload(client, workload, ids, concurrency, duration, seed)
+
+
+def bench(workers: int, workload: str, concurrency: int, duration: float, seed: int) -> Dict[str, Any]:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "backend.server", "--workers", str(workers),
+             "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+            cwd=tmp,
+            env={**os.environ, "PYTHONPATH": str(ROOT)},
+        )
+        try:
+            wait_ready(url)
+            return asyncio.run(load(url, workload, concurrency, duration, seed))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, action="append", help="можно несколько (1, 2, 4)")
+    parser.add_argument("--workload", choices=list(WORKLOADS), default="read_heavy")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="файл результатов в формате benchmarks.suite")
+    args = parser.parse_args()
+
+    results: List[Dict[str, Any]] = []
+    for workers in args.workers or [1, 2, 4]:
+        stats = bench(workers, args.workload, args.concurrency, args.duration, args.seed)
+        scaling = stats["ops_per_sec"] / results[0]["ops_per_sec"] if results else 1.0
+        print(f"workers={workers:<3} {stats['ops_per_sec']:>10.1f} req/s  p99 {stats['p99_us'] / 1000:>8.1f} ms  "
+              f"errors {stats['errors']}  scaling {scaling:.2f}x")
+        results.append({"name": f"workers.{args.workload}", "rows": None, "workers": workers, **stats})
+    if args.out:
+        write_results(args.out, {**environment(), "args": vars(args)}, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Общие части бенчмарков: заполнение БД, замер, перцентили и запись результатов в JSON.
+"""
+import json
+import os
+import platform
+import shutil
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import pysqlite3 as sqlite3
+
+from backend.database import PureDatabase
+
+SEED_BATCH = 10_000
+PRIORITIES = ("low", "medium", "high")
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def seed_database(path: str, rows: int) -> None:
+    """БД с rows задачами: ID 1..rows, приоритеты по кругу"""
+    db = PureDatabase(path, pool_size=1)
+    try:
+        for start in range(0, rows, SEED_BATCH):
+            db.sql_insert_tasks([
+                (f"Задача {i}", f"Описание задачи {i}", PRIORITIES[i % len(PRIORITIES)])
+                for i in range(start + 1, min(rows, start + SEED_BATCH) + 1)
+            ])
+    finally:
+        db.close()
+
+
+def seeded_copy(data_dir: Path, rows: int, name: str) -> str:
+    """
+    Рабочая копия заполненной БД на rows задач. Эталон создаётся один раз и
+    переиспользуется между запусками; сценарии с записью меняют только копию.
+    """
+    data_dir.mkdir(parents=True, exist_ok=True)
+    template = data_dir / f"seed-{rows}.db"
+    if not template.exists():
+        partial = data_dir / f"seed-{rows}.db.partial"
+        partial.unlink(missing_ok=True)
+        seed_database(str(partial), rows)
+        partial.rename(template)
+    copy = data_dir / f"{name}-{rows}.db"
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{copy}{suffix}").unlink(missing_ok=True)
+    shutil.copyfile(template, copy)
+    return str(copy)
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int = 0) -> Dict[str, Any]:
+    """Пропускная способность и перцентили задержки, мкс"""
+    return {
+        "ops": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "ops_per_sec": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_us": round(sum(latencies) / len(latencies) * 1e6, 1) if latencies else 0.0,
+        "p50_us": round(percentile(latencies, 0.5) * 1e6, 1) if latencies else 0.0,
+        "p95_us": round(percentile(latencies, 0.95) * 1e6, 1) if latencies else 0.0,
+        "p99_us": round(percentile(latencies, 0.99) * 1e6, 1) if latencies else 0.0,
+    }
+
+
+def measure(fn: Callable[[int], Any], iterations: int, duration: float, warmup: int = 10) -> Dict[str, Any]:
+    """Вызывать fn(i) до iterations раз, но не дольше duration секунд"""
+    for i in range(warmup):
+        fn(i)
+    latencies: List[float] = []
+    started = time.perf_counter()
+    deadline = started + duration
+    for i in range(iterations):
+        call_started = time.perf_counter()
+        fn(warmup + i)
+        finished = time.perf_counter()
+        latencies.append(finished - call_started)
+        if finished >= deadline:
+            break
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    """Окружение запуска: по нему понятно, какие результаты можно сравнивать"""
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def write_results(path: str, meta: Dict[str, Any], results: List[Dict[str, Any]]) -> None:
+    Path(path).write_text(json.dumps({"meta": meta, "results": results}, ensure_ascii=False, indent=2) + "\n")
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    return json.loads(Path(path).read_text())
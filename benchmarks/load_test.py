@@ -0,0 +1,65 @@
+"""
+Нагрузочный тест запущенного API: N одновременных клиентов, перцентили задержки.
+
+Запуск (сервер уже поднят, например `python -m uvicorn backend.app:app`):
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --concurrency 500 --duration 20
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import List
+
+import httpx
+
+from benchmarks.common import percentile
+
+
+async def client_loop(client: httpx.AsyncClient, ids: List[int], deadline: float,
+                      latencies: List[float], errors: List[int]) -> None:
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await client.get(f"/api/v1/tasks/{random.choice(ids)}")
+            if response.status_code != 200:
+                errors.append(response.status_code)
+        except httpx.HTTPError:
+            errors.append(0)
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(url: str, concurrency: int, duration: float, seed: int) -> None:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        ids = []
+        for i in range(seed):
+            response = await client.post("/api/v1/tasks", json={"title": f"Нагрузка {i}", "description": "load"})
+            ids.append(response.json()["id"])
+
+        latencies: List[float] = []
+        errors: List[int] = []
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(
+            client_loop(client, ids, deadline, latencies, errors) for _ in range(concurrency)
+        ))
+
+    print(f"clients:    {concurrency}")
+    print(f"requests:   {len(latencies)} ({len(latencies) / duration:.1f} req/s), errors: {len(errors)}")
+    print(f"mean:       {statistics.mean(latencies) * 1000:8.1f} ms")
+    for q in (0.5, 0.95, 0.99):
+        print(f"p{int(q * 100):<9} {percentile(latencies, q) * 1000:8.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=100, help="сколько задач создать перед замером")
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.concurrency, args.duration, args.seed))
+
+
+if __name__ == "__main__":
+    main()
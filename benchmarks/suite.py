@@ -0,0 +1,286 @@
+"""
+Воспроизводимый набор бенчмарков API задач с результатами в JSON.
+
+Слои:
+    db       PureDatabase: вставка, выборка по ID и страницей, обновление, удаление
+    service  TaskService: get, get_page, get_all
+    http     сценарии нагрузки read-heavy, write-heavy и mixed на backend.app:app —
+             в процессе (httpx.ASGITransport) или на запущенном uvicorn (--url)
+
+Запуск из корня репозитория:
+    python -m benchmarks.suite run --rows 10000 --rows 1000000
+    python -m benchmarks.suite run --layer http --url http://127.0.0.1:8000
+    python -m benchmarks.suite compare benchmarks/results/old.json benchmarks/results/new.json
+
+Заполненные БД кэшируются в --data-dir и переиспользуются между запусками.
+Случайные ID берутся из генератора с фиксированным --seed, поэтому два запуска
+на разных коммитах выполняют одну и ту же последовательность операций.
+compare печатает изменение пропускной способности по каждому сценарию и
+возвращает код 1, если какой-то сценарий стал медленнее порога --threshold.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from unittest.mock import patch
+
+import httpx
+
+from backend.database import PureDatabase
+from backend.task import TaskService
+from benchmarks.common import PRIORITIES, environment, load_results, measure, seeded_copy, summarize, write_results
+
+DEFAULT_DATA_DIR = Path(__file__).parent / ".data"
+DEFAULT_RESULTS_DIR = Path(__file__).parent / "results"
+LAYERS = ("db", "service", "http")
+
+Result = Dict[str, Any]
+
+
+def _result(name: str, rows: Optional[int], stats: Dict[str, Any], **params: Any) -> Result:
+    print(f"  {name:<32} rows={rows!s:<8} {stats['ops_per_sec']:>10.1f} ops/s  "
+          f"p50 {stats['p50_us']:>9.1f} us  p99 {stats['p99_us']:>9.1f} us  errors {stats['errors']}")
+    return {"name": name, "rows": rows, **params, **stats}
+
+
+# ========== db ==========
+def bench_db(data_dir: Path, rows: int, iterations: int, duration: float, seed: int) -> List[Result]:
+    rng = random.Random(seed)
+    db = PureDatabase(seeded_copy(data_dir, rows, "db"), pool_size=4)
+    ids = [rng.randint(1, rows) for _ in range(iterations + 100)]
+    scenarios: List[Tuple[str, Callable[[int], Any], int]] = [
+        ("db.select_task_by_id", lambda i: db.sql_select_task_by_id(ids[i]), iterations),
+        ("db.select_tasks_page", lambda i: db.sql_select_tasks_page(100, after=(ids[i],)), iterations),
+        ("db.select_tasks_page_priority",
+         lambda i: db.sql_select_tasks_page(100, after=(ids[i],), priority=PRIORITIES[i % 3]), iterations),
+        ("db.insert_task", lambda i: db.sql_insert_task(f"Новая {i}", "Описание", "low"), iterations),
+        ("db.update_task", lambda i: db.sql_update_task(ids[i], f"Изменена {i}", "Описание", "high"), iterations),
+        # Удаляются разные существующие строки: с конца исходного диапазона
+        ("db.delete_task", lambda i: db.sql_delete_task(rows - i), min(iterations, rows - 100)),
+    ]
+    try:
+        return [_result(name, rows, measure(fn, count, duration)) for name, fn, count in scenarios]
+    finally:
+        db.close()
+
+
+# ========== service ==========
+def bench_service(data_dir: Path, rows: int, iterations: int, duration: float, seed: int) -> List[Result]:
+    rng = random.Random(seed)
+    db = PureDatabase(seeded_copy(data_dir, rows, "service"), pool_size=4)
+    service = TaskService(db=db)
+    ids = [rng.randint(1, rows) for _ in range(iterations + 100)]
+    scenarios: List[Tuple[str, Callable[[int], Any], int, int]] = [
+        ("service.get", lambda i: service.get(ids[i]), iterations, 10),
+        ("service.get_page", lambda i: service.get_page(limit=100, after_id=ids[i]), iterations, 10),
+        # get_all читает всю таблицу: на 1M строк это секунды на вызов
+        ("service.get_all", lambda i: service.get_all(), max(1, iterations // 100), 1),
+    ]
+    try:
+        return [
+            _result(name, rows, measure(fn, count, duration, warmup=warmup))
+            for name, fn, count, warmup in scenarios
+        ]
+    finally:
+        service.close()
+
+
+# ========== http ==========
+Operation = Callable[[httpx.AsyncClient, random.Random, Dict[str, Any]], Awaitable[httpx.Response]]
+
+
+async def _get_task(client, rng, state):
+    return await client.get(f"/api/v1/tasks/{rng.choice(state['ids'])}")
+
+
+async def _get_page(client, rng, state):
+    return await client.get("/api/v1/tasks", params={"limit": 50, "after_id": rng.choice(state["ids"])})
+
+
+async def _create_task(client, rng, state):
+    response = await client.post(
+        "/api/v1/tasks", json={"title": "Нагрузка", "description": "load", "priority": rng.choice(PRIORITIES)}
+    )
+    if response.status_code == 200:
+        state["created"].append(response.json()["id"])
+    return response
+
+
+async def _update_task(client, rng, state):
+    return await client.put(
+        f"/api/v1/tasks/{rng.choice(state['ids'])}",
+        json={"title": "Изменена", "description": "load", "priority": rng.choice(PRIORITIES)}
+    )
+
+
+async def _delete_task(client, rng, state):
+    if not state["created"]:
+        return await _create_task(client, rng, state)
+    return await client.delete(f"/api/v1/tasks/{state['created'].pop()}")
+
+
+# Сценарий: доли операций в потоке запросов каждого клиента
+WORKLOADS: Dict[str, Sequence[Tuple[float, Operation]]] = {
+    "read_heavy": ((0.8, _get_task), (0.15, _get_page), (0.05, _create_task)),
+    "write_heavy": ((0.2, _get_task), (0.4, _create_task), (0.3, _update_task), (0.1, _delete_task)),
+    "mixed": ((0.5, _get_task), (0.2, _get_page), (0.2, _create_task), (0.1, _update_task)),
+}
+
+
+async def run_workload(
+        client: httpx.AsyncClient,
+        workload: str,
+        ids: List[int],
+        concurrency: int,
+        duration: float,
+        seed: int
+        ) -> Dict[str, Any]:
+    weights, operations = zip(*WORKLOADS[workload])
+    state: Dict[str, Any] = {"ids": ids, "created": []}
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client_loop(rng: random.Random) -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            operation = rng.choices(operations, weights)[0]
+            started = time.perf_counter()
+            try:
+                response = await operation(client, rng, state)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop(random.Random(seed + n)) for n in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+async def server_ids(client: httpx.AsyncClient) -> List[int]:
+    """ID задач на внешнем сервере; если их мало, создать пачку"""
+    response = await client.get("/api/v1/tasks", params={"limit": 1000})
+    response.raise_for_status()
+    ids = [task["id"] for task in response.json()]
+    if len(ids) < 100:
+        items = [{"title": f"Нагрузка {i}", "description": "load"} for i in range(1000)]
+        response = await client.post("/api/v1/tasks/bulk", json=items)
+        response.raise_for_status()
+        ids += [item["id"] for item in response.json()["items"]]
+    return ids
+
+
+def bench_http(
+        data_dir: Path,
+        rows: Optional[int],
+        url: Optional[str],
+        concurrency: int,
+        duration: float,
+        seed: int
+        ) -> List[Result]:
+    async def run_all(client: httpx.AsyncClient, ids: List[int]) -> List[Result]:
+        return [
+            _result(f"http.{workload}", rows,
+                    await run_workload(client, workload, ids, concurrency, duration, seed),
+                    concurrency=concurrency, target="url" if url else "in-process")
+            for workload in WORKLOADS
+        ]
+
+    async def against_url() -> List[Result]:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+            return await run_all(client, await server_ids(client))
+
+    async def in_process() -> List[Result]:
+        from backend.app import app
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            return await run_all(client, list(range(1, rows + 1)))
+
+    if url:
+        return asyncio.run(against_url())
+    service = TaskService(db=PureDatabase(seeded_copy(data_dir, rows, "http")))
+    try:
+        with patch("backend.app.task_service", service):
+            return asyncio.run(in_process())
+    finally:
+        service.close()
+
+
+def run(args: argparse.Namespace) -> int:
+    layers = args.layer or list(LAYERS)
+    data_dir = Path(args.data_dir)
+    results: List[Result] = []
+    for rows in args.rows or [10_000]:
+        print(f"rows={rows}")
+        if "db" in layers:
+            results += bench_db(data_dir, rows, args.iterations, args.duration, args.seed)
+        if "service" in layers:
+            results += bench_service(data_dir, rows, args.iterations, args.duration, args.seed)
+        if "http" in layers and not args.url:
+            results += bench_http(data_dir, rows, None, args.concurrency, args.http_duration, args.seed)
+    if "http" in layers and args.url:
+        results += bench_http(data_dir, None, args.url, args.concurrency, args.http_duration, args.seed)
+
+    meta = {**environment(), "args": {key: value for key, value in vars(args).items() if key != "func"}}
+    out = args.out or str(DEFAULT_RESULTS_DIR / f"{meta['commit'] or 'results'}.json")
+    Path(out).parent.mkdir(parents=True, exist_ok=True)
+    write_results(out, meta, results)
+    print(f"results: {out}")
+    return 0
+
+
+def compare(args: argparse.Namespace) -> int:
+    """Сравнить ops/s сценариев двух запусков; 1 — если есть регрессия больше порога"""
+    baseline, current = load_results(args.baseline), load_results(args.current)
+    print(f"baseline {baseline['meta'].get('commit')} -> current {current['meta'].get('commit')}")
+    old = {(result["name"], result["rows"]): result for result in baseline["results"]}
+    regressions = 0
+    for result in current["results"]:
+        before = old.get((result["name"], result["rows"]))
+        if before is None or not before["ops_per_sec"]:
+            continue
+        change = result["ops_per_sec"] / before["ops_per_sec"] - 1
+        mark = ""
+        if change < -args.threshold:
+            regressions += 1
+            mark = "  REGRESSION"
+        print(f"  {result['name']:<32} rows={result['rows']!s:<8} "
+              f"{before['ops_per_sec']:>10.1f} -> {result['ops_per_sec']:>10.1f} ops/s ({change:+.1%}){mark}")
+    return 1 if regressions else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="запустить бенчмарки")
+    run_parser.add_argument("--layer", action="append", choices=LAYERS, help="по умолчанию все")
+    run_parser.add_argument("--rows", type=int, action="append", help="размер БД, можно несколько (10000)")
+    run_parser.add_argument("--iterations", type=int, default=2000, help="операций на сценарий слоёв db/service")
+    run_parser.add_argument("--duration", type=float, default=5.0, help="предел времени сценария db/service, с")
+    run_parser.add_argument("--http-duration", type=float, default=10.0, help="длительность HTTP-сценария, с")
+    run_parser.add_argument("--concurrency", type=int, default=32, help="одновременных HTTP-клиентов")
+    run_parser.add_argument("--url", help="адрес запущенного сервера вместо приложения в процессе")
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--data-dir", default=str(DEFAULT_DATA_DIR))
+    run_parser.add_argument("--out", help="файл результатов (benchmarks/results/<commit>.json)")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser("compare", help="сравнить два файла результатов")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="допустимое падение ops/s (0.1 = 10%%)")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
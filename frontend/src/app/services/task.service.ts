@@ -1,9 +1,10 @@
 import { Injectable } from '@angular/core';
-import { HttpClient, HttpErrorResponse } from '@angular/common/http';
-import { Observable, throwError } from 'rxjs';
-import { catchError } from 'rxjs/operators';
+import { HttpClient, HttpErrorResponse, HttpParams } from '@angular/common/http';
+import { EMPTY, Observable, throwError } from 'rxjs';
+import { catchError, expand, map, reduce } from 'rxjs/operators';
 
 const API_BASE_URL = 'http://localhost:8000/api/v1/tasks';
+const PAGE_SIZE = 500;
 
 export interface Task {
   id?: number;
@@ -14,20 +15,42 @@ export interface Task {
   updated_at?: string;
 }
 
+interface TaskPage {
+  tasks: Task[];
+  nextCursor: string | null;
+}
+
 @Injectable({
   providedIn: 'root'
 })
 export class TaskService {
   constructor(private http: HttpClient) {}
 
-  // Получить все задачи
+  // Получить все задачи, проходя страницы по курсору из заголовка X-Next-Cursor
   getAllTasks(): Observable<Task[]> {
-    return this.http.get<Task[]>(API_BASE_URL)
+    return this.getTasksPage()
       .pipe(
+        expand(page => page.nextCursor ? this.getTasksPage(page.nextCursor) : EMPTY),
+        reduce((tasks: Task[], page: TaskPage) => tasks.concat(page.tasks), []),
         catchError(this.handleError)
       );
   }
 
+  // Получить одну страницу задач
+  private getTasksPage(cursor?: string): Observable<TaskPage> {
+    let params = new HttpParams().set('limit', PAGE_SIZE);
+    if (cursor) {
+      params = params.set('cursor', cursor);
+    }
+    return this.http.get<Task[]>(API_BASE_URL, { params, observe: 'response' })
+      .pipe(
+        map(response => ({
+          tasks: response.body ?? [],
+          nextCursor: response.headers.get('X-Next-Cursor')
+        }))
+      );
+  }
+
   // Получить задачу по ID
   getTaskById(id: number): Observable<Task> {
     return this.http.get<Task>(`${API_BASE_URL}/${id}`)
@@ -36,6 +59,15 @@ export class TaskService {
       );
   }
 
+  // Полнотекстовый поиск по заголовку и описанию, лучшие совпадения первыми
+  searchTasks(query: string, limit: number = 20): Observable<Task[]> {
+    const params = new HttpParams().set('q', query).set('limit', limit);
+    return this.http.get<Task[]>(`${API_BASE_URL}/search`, { params })
+      .pipe(
+        catchError(this.handleError)
+      );
+  }
+
   // Создать новую задачу
   createTask(task: Task): Observable<Task> {
     return this.http.post<Task>(API_BASE_URL, task)
@@ -15,11 +15,19 @@ def mock_database()->Mock:
 @pytest.fixture
 def task_service(mock_database) -> TaskService:
     """Фикстура для сервиса задач с подмененной БД"""
-    service = TaskService()
-    service.db = mock_database  
-    return service
+    return TaskService(db=mock_database)
 
 @pytest.fixture
 def mock_task_service():
     """Мок TaskService (для тестирования исключений)"""
-    return Mock(spec=TaskService)
\ No newline at end of file
+    mock_service = Mock(spec=TaskService)
+    mock_service.list_version.return_value = 1
+    mock_service.get_version.return_value = 1
+    return mock_service
+
+@pytest.fixture
+def database(tmp_path) -> PureDatabase:
+    """Фикстура настоящей SQLite базы во временном каталоге"""
+    db = PureDatabase(str(tmp_path / "tasks.db"), pool_size=4)
+    yield db
+    db.close()
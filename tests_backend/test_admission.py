@@ -0,0 +1,183 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.admission import (
+    READ, WRITE, AdmissionController, AdmissionMiddleware, ConcurrencyLimit, RateLimiter, admission_from_env
+)
+from backend.app import admission, register_admission_metrics
+from backend.metrics import ADMISSION_REJECTED, REGISTRY
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.unit
+class TestRateLimiter:
+
+    def test_burst_then_refill(self):
+        clock = FakeClock()
+        limiter = RateLimiter(rate=2, burst=3, clock=clock)
+
+        assert [limiter.acquire("a") for _ in range(3)] == [0, 0, 0]
+        assert limiter.acquire("a") == pytest.approx(0.5)
+
+        clock.now = 0.5
+        assert limiter.acquire("a") == 0
+        assert limiter.acquire("a") > 0
+
+    def test_clients_have_separate_buckets(self):
+        limiter = RateLimiter(rate=1, burst=1, clock=FakeClock())
+
+        assert limiter.acquire("a") == 0
+        assert limiter.acquire("a") > 0
+        assert limiter.acquire("b") == 0
+
+    def test_bucket_does_not_grow_past_burst(self):
+        clock = FakeClock()
+        limiter = RateLimiter(rate=10, burst=2, clock=clock)
+        limiter.acquire("a")
+
+        clock.now = 100
+        assert [limiter.acquire("a") for _ in range(2)] == [0, 0]
+        assert limiter.acquire("a") > 0
+
+    def test_least_recently_seen_client_is_evicted(self):
+        limiter = RateLimiter(rate=1, burst=1, max_clients=2, clock=FakeClock())
+        for client in ("a", "b", "a", "c"):
+            limiter.acquire(client)
+
+        assert limiter.clients() == 2
+        # Корзина b вытеснена и создаётся заново полной, c по-прежнему пуста
+        assert limiter.acquire("b") == 0
+        assert limiter.acquire("c") > 0
+
+
+@pytest.mark.unit
+class TestAdmissionFromEnv:
+
+    def test_defaults_cap_concurrency_without_rate_limits(self, monkeypatch):
+        for name in ("RATE_LIMIT_READS", "RATE_LIMIT_WRITES", "ADMISSION_MAX_READS", "ADMISSION_MAX_WRITES"):
+            monkeypatch.delenv(name, raising=False)
+
+        controller = admission_from_env()
+
+        assert controller.rate_limits == {}
+        assert set(controller.concurrency) == {READ, WRITE}
+
+    def test_separate_budgets(self, monkeypatch):
+        monkeypatch.setenv("RATE_LIMIT_WRITES", "5")
+        monkeypatch.setenv("RATE_LIMIT_WRITE_BURST", "20")
+        monkeypatch.setenv("ADMISSION_MAX_READS", "0")
+        monkeypatch.setenv("ADMISSION_MAX_WRITES", "4")
+
+        controller = admission_from_env()
+
+        assert set(controller.rate_limits) == {WRITE}
+        assert (controller.rate_limits[WRITE].rate, controller.rate_limits[WRITE].burst) == (5, 20)
+        assert set(controller.concurrency) == {WRITE}
+        assert controller.concurrency[WRITE].limit == 4
+
+
+@pytest.mark.api_unit
+class TestAdmissionMiddleware:
+
+    @staticmethod
+    def make_client(controller: AdmissionController) -> TestClient:
+        app = FastAPI()
+        app.add_middleware(AdmissionMiddleware, controller=controller)
+
+        @app.get("/api/v1/tasks")
+        async def read():
+            return []
+
+        @app.post("/api/v1/tasks")
+        async def write():
+            return {}
+
+        @app.get("/api/v1/tasks/changes")
+        async def changes():
+            return ""
+
+        @app.get("/api/v1/tasks/fail")
+        async def fail():
+            raise RuntimeError("boom")
+
+        @app.get("/metrics")
+        async def metrics():
+            return ""
+
+        return TestClient(app, raise_server_exceptions=False)
+
+    def test_rate_limited_with_retry_after(self):
+        controller = AdmissionController(rate_limits={WRITE: RateLimiter(rate=0.5, burst=1)})
+        client = self.make_client(controller)
+        rejected = ADMISSION_REJECTED.value((WRITE, "rate_limited"))
+
+        assert client.post("/api/v1/tasks").status_code == 200
+        response = client.post("/api/v1/tasks")
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "2"
+        assert ADMISSION_REJECTED.value((WRITE, "rate_limited")) == rejected + 1
+        # Бюджет записи не тратит бюджет чтения
+        assert client.get("/api/v1/tasks").status_code == 200
+
+    def test_client_header(self):
+        controller = AdmissionController(
+            rate_limits={READ: RateLimiter(rate=1, burst=1)}, client_header="X-Forwarded-For"
+        )
+        client = self.make_client(controller)
+
+        assert client.get("/api/v1/tasks", headers={"X-Forwarded-For": "10.0.0.1, 10.0.0.9"}).status_code == 200
+        assert client.get("/api/v1/tasks", headers={"X-Forwarded-For": "10.0.0.1"}).status_code == 429
+        assert client.get("/api/v1/tasks", headers={"X-Forwarded-For": "10.0.0.2"}).status_code == 200
+
+    def test_overloaded_sheds_with_503(self):
+        limit = ConcurrencyLimit(2)
+        client = self.make_client(AdmissionController(concurrency={READ: limit}))
+        rejected = ADMISSION_REJECTED.value((READ, "overloaded"))
+
+        limit.in_flight = 2
+        response = client.get("/api/v1/tasks")
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert ADMISSION_REJECTED.value((READ, "overloaded")) == rejected + 1
+        assert client.post("/api/v1/tasks").status_code == 200
+
+    def test_slot_is_released(self):
+        limit = ConcurrencyLimit(1)
+        client = self.make_client(AdmissionController(concurrency={READ: limit}))
+
+        assert client.get("/api/v1/tasks").status_code == 200
+        assert client.get("/api/v1/tasks/fail").status_code == 500
+        assert limit.in_flight == 0
+
+    def test_changes_stream_and_non_api_paths_skip_concurrency(self):
+        limit = ConcurrencyLimit(1)
+        client = self.make_client(AdmissionController(concurrency={READ: limit}))
+        limit.in_flight = 1
+
+        assert client.get("/api/v1/tasks/changes").status_code == 200
+        assert client.get("/metrics").status_code == 200
+
+    def test_metrics(self):
+        controller = AdmissionController(
+            rate_limits={READ: RateLimiter(rate=1)}, concurrency={WRITE: ConcurrencyLimit(8)}
+        )
+        controller.rate_limits[READ].acquire("a")
+        register_admission_metrics(controller)
+        try:
+            text = REGISTRY.render()
+        finally:
+            register_admission_metrics(admission)
+
+        assert 'admission_in_flight_limit{traffic="read"} 0' in text
+        assert 'admission_in_flight_limit{traffic="write"} 8' in text
+        assert 'rate_limit_clients{traffic="read"} 1' in text
@@ -6,8 +6,16 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from backend.model import TaskResponse, PriorityModel
+from backend.model import (
+    BulkItemResult, BulkItemStatusModel, BulkModeModel, BulkResponse, PriorityModel, SearchSortModel, TaskRequest,
+    TaskResponse, TaskStatsResponse
+)
 from backend.app import app
+from backend.cache import LRUCache
+from backend.storage import MemoryDatabase
+from backend.task import TaskService, VersionConflictError
+
+TASK = {'title': 'Задача', 'description': 'Описание', 'priority': 'low'}
 
 
 
@@ -94,22 +102,76 @@ class TestApi:
             }
         ]
         
-        mock_task_service.get_all.return_value = data
+        mock_task_service.get_page.return_value = (data, None)
         response = self.client.get("/api/v1/tasks")
     
         assert response.status_code == 200
-        assert mock_task_service.get_all.call_count == 1
+        assert mock_task_service.get_page.call_count == 1
         response_data = response.json()
         assert response_data == data
+        assert "X-Next-Cursor" not in response.headers
+
+    def test_api_get_tasks_page_with_next_cursor(self, mock_task_service):
+        data = [{
+            'id': 5,
+            'title': 'Позвонить маме',
+            'description': 'Поздравить с днем рождения',
+            'priority': 'high'
+        }]
+        mock_task_service.get_page.return_value = (data, 'abc')
+
+        response = self.client.get("/api/v1/tasks?limit=1&after_id=4&priority=high&sort=-id")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == data
+        assert response.headers["X-Next-Cursor"] == 'abc'
+        assert 'cursor=abc' in response.headers["Link"]
+        assert 'after_id' not in response.headers["Link"]
+        mock_task_service.get_page.assert_called_once_with(
+            limit=1,
+            cursor=None,
+            after_id=4,
+            priority=PriorityModel.HIGH,
+            sort='-id'
+        )
+
+    @pytest.mark.parametrize('query', ['limit=0', 'limit=1001', 'priority=urgent', 'sort=priority'])
+    def test_api_get_tasks_invalid_query(self, mock_task_service, query):
+        response = self.client.get(f"/api/v1/tasks?{query}")
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+        mock_task_service.get_page.assert_not_called()
+
+    def test_api_get_tasks_invalid_cursor(self, mock_task_service):
+        mock_task_service.get_page.side_effect = ValueError("Invalid cursor")
+
+        response = self.client.get("/api/v1/tasks?cursor=garbage")
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid cursor"
+
+    @pytest.mark.parametrize('export_format, media_type', [
+        ('ndjson', 'application/x-ndjson'),
+        ('json', 'application/json'),
+    ])
+    def test_api_export_tasks(self, mock_task_service, export_format, media_type):
+        mock_task_service.export.return_value = iter([b'chunk-1', b'chunk-2'])
+
+        response = self.client.get(f"/api/v1/tasks/export?format={export_format}")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == media_type
+        assert response.content == b'chunk-1chunk-2'
+        mock_task_service.export.assert_called_once_with(export_format)
 
     def test_get_task_value_error(self, mock_task_service):
-        mock_task_service.get.side_effect = ValueError("Invalid task ID format")
+        mock_task_service.get_versioned.side_effect = ValueError("Invalid task ID format")
         
         response = self.client.get("/api/v1/tasks/123")  
         
         assert response.status_code == 404
         assert "Invalid task ID format" in response.json()["detail"]
-        mock_task_service.get.assert_called_once_with(123)
+        mock_task_service.get_versioned.assert_called_once_with(123)
 
 
     def test_api_get_task_on_id(self, mock_task_service):
@@ -120,23 +182,23 @@ class TestApi:
             'priority': 'medium'
         }
         
-        mock_task_service.get.return_value = data
+        mock_task_service.get_versioned.return_value = (data, 3)
         
         response = self.client.get("/api/v1/tasks/1")
         
         assert response.status_code == status.HTTP_200_OK
-        assert mock_task_service.get.call_count == 1
+        assert mock_task_service.get_versioned.call_count == 1
         assert response.json() == data
 
     def test_api_get_task_on_invalid_id(self, mock_task_service):
         task_id = 999
-        mock_task_service.get.return_value = None
+        mock_task_service.get_versioned.return_value = None
         
         response = self.client.get(f"/api/v1/tasks/{task_id}")
         
         assert response.status_code == 404
         assert response.json()["detail"] == "Task not found"
-        mock_task_service.get.assert_called_once_with(999)
+        mock_task_service.get_versioned.assert_called_once_with(999)
 
 
     def test_api_update_task(self, mock_task_service):
@@ -149,7 +211,7 @@ class TestApi:
             'priority': 'medium'
         }
         
-        mock_task_service.update.return_value = updated_data
+        mock_task_service.update_versioned.return_value = (updated_data, 2)
         
         response = self.client.put(
             f"/api/v1/tasks/{task_id}",
@@ -162,12 +224,12 @@ class TestApi:
         
         assert response.status_code == status.HTTP_200_OK
         assert response.json() == updated_data 
-        mock_task_service.update.assert_called_once()
+        mock_task_service.update_versioned.assert_called_once()
 
 
     def test_api_update_task_with_invalid_id(self, mock_task_service):
         task_id = 999
-        mock_task_service.update.side_effect = ValueError(
+        mock_task_service.update_versioned.side_effect = ValueError(
             f"Task with id {task_id} not found")
         response = self.client.put(
             f"/api/v1/tasks/{task_id}",
@@ -177,7 +239,7 @@ class TestApi:
                 'priority': 'medium'
             }
         )
-        assert mock_task_service.update.call_count == 1
+        assert mock_task_service.update_versioned.call_count == 1
         assert response.status_code == status.HTTP_404_NOT_FOUND
         assert response.json()['detail'] == f"Task with id {task_id} not found"
 
@@ -192,12 +254,12 @@ class TestApi:
             }
         )
         
-        mock_task_service.update.assert_not_called() 
+        mock_task_service.update_versioned.assert_not_called() 
         assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
 
     def test_update_task_other_error(self, mock_task_service):
         task_id = 1
-        mock_task_service.update.side_effect = ValueError(
+        mock_task_service.update_versioned.side_effect = ValueError(
             "Cannot update completed task"
         )
         
@@ -209,7 +271,7 @@ class TestApi:
         
         assert response.status_code == 400
         assert "cannot update" in response.json()["detail"].lower()
-        mock_task_service.update.assert_called_once()
+        mock_task_service.update_versioned.assert_called_once()
  
     def test_api_delete_task(self, mock_task_service):
         task_id = 1
@@ -219,7 +281,7 @@ class TestApi:
         )
         assert response.status_code == status.HTTP_200_OK
         assert response.json() == {"message": "Task deleted successfully"}
-        mock_task_service.delete.assert_called_once_with(task_id)
+        mock_task_service.delete.assert_called_once_with(task_id, expected_versions=None)
 
     def test_api_delete_task_with_invalid_id(self, mock_task_service):
         task_id = 999
@@ -231,7 +293,7 @@ class TestApi:
         
         assert response.status_code == status.HTTP_404_NOT_FOUND
         assert response.json()['detail'] == f"Task with id {task_id} not found"
-        mock_task_service.delete.assert_called_once_with(task_id)
+        mock_task_service.delete.assert_called_once_with(task_id, expected_versions=None)
     
     
     def test_delete_task_other_error(self, mock_task_service):
@@ -244,6 +306,219 @@ class TestApi:
         
         assert response.status_code == 400
         assert "cannot delete" in response.json()["detail"].lower()
-        mock_task_service.delete.assert_called_once_with(1)
+        mock_task_service.delete.assert_called_once_with(1, expected_versions=None)
+
+    def test_api_create_tasks_bulk(self, mock_task_service):
+        mock_task_service.create_many.return_value = BulkResponse(
+            mode=BulkModeModel.PARTIAL, applied=True, succeeded=1, failed=0,
+            items=[BulkItemResult(index=0, id=1, status=BulkItemStatusModel.CREATED)]
+        )
+        items = [{"title": "Задача", "description": "Описание"}]
+
+        response = self.client.post("/api/v1/tasks/bulk?mode=partial", json=items)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["items"] == [{"index": 0, "id": 1, "status": "created", "detail": None}]
+        mock_task_service.create_many.assert_called_once_with(items, BulkModeModel.PARTIAL)
+
+    def test_api_bulk_not_applied_returns_conflict(self, mock_task_service):
+        mock_task_service.update_many.return_value = BulkResponse(
+            mode=BulkModeModel.ATOMIC, applied=False, succeeded=0, failed=1,
+            items=[BulkItemResult(index=0, id=999, status=BulkItemStatusModel.NOT_FOUND,
+                                  detail="Task with id 999 not found")]
+        )
+
+        response = self.client.patch("/api/v1/tasks/bulk", json=[{"id": 999, "title": "Новая"}])
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response.json()["applied"] is False
+        assert response.json()["items"][0]["status"] == "not_found"
+
+    def test_api_delete_tasks_bulk(self, mock_task_service):
+        mock_task_service.delete_many.return_value = BulkResponse(
+            mode=BulkModeModel.ATOMIC, applied=True, succeeded=2, failed=0,
+            items=[BulkItemResult(index=i, id=i + 1, status=BulkItemStatusModel.DELETED) for i in range(2)]
+        )
+
+        response = self.client.request("DELETE", "/api/v1/tasks/bulk", json=[1, 2])
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["succeeded"] == 2
+        mock_task_service.delete_many.assert_called_once_with([1, 2], BulkModeModel.ATOMIC)
+
+    def test_api_bulk_too_large(self, mock_task_service):
+        mock_task_service.delete_many.side_effect = ValueError("Batch size 10001 exceeds the limit of 10000")
+
+        response = self.client.request("DELETE", "/api/v1/tasks/bulk", json=list(range(10_001)))
+
+        assert response.status_code == 400
+        assert "exceeds the limit" in response.json()["detail"]
+
+    @pytest.mark.parametrize('trusted_reads', [True, False])
+    def test_api_read_response_modes(self, mock_task_service, trusted_reads):
+        task = TaskResponse(id=1, title='Задача', description='Описание', priority=PriorityModel.HIGH)
+        mock_task_service.get_page.return_value = ([task], 'next')
+
+        with patch('backend.app.TRUSTED_READS', trusted_reads):
+            response = self.client.get("/api/v1/tasks")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == "application/json"
+        assert response.headers["X-Next-Cursor"] == 'next'
+        assert response.json() == [{'id': 1, 'title': 'Задача', 'description': 'Описание', 'priority': 'high'}]
+
+    def test_api_get_tasks_not_modified(self, mock_task_service):
+        mock_task_service.list_version.return_value = 7
+
+        response = self.client.get("/api/v1/tasks", headers={"If-None-Match": '"tasks-v7"'})
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.headers["ETag"] == '"tasks-v7"'
+        assert response.content == b''
+        mock_task_service.get_page.assert_not_called()
+
+    def test_api_get_tasks_sets_etag(self, mock_task_service):
+        mock_task_service.list_version.return_value = 8
+        mock_task_service.get_page.return_value = ([], None)
+
+        response = self.client.get("/api/v1/tasks", headers={"If-None-Match": '"tasks-v7"'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["ETag"] == '"tasks-v8"'
+        assert response.headers["Cache-Control"] == "no-cache"
+
+    def test_api_get_stats(self, mock_task_service):
+        mock_task_service.list_version.return_value = 8
+        mock_task_service.stats.return_value = TaskStatsResponse(
+            total=3, by_priority={PriorityModel.LOW: 1, PriorityModel.MEDIUM: 0, PriorityModel.HIGH: 2}
+        )
+
+        response = self.client.get("/api/v1/tasks/stats")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["ETag"] == '"tasks-v8"'
+        assert response.json() == {'total': 3, 'by_priority': {'low': 1, 'medium': 0, 'high': 2}}
+
+    def test_api_get_stats_not_modified(self, mock_task_service):
+        mock_task_service.list_version.return_value = 7
+
+        response = self.client.get("/api/v1/tasks/stats", headers={"If-None-Match": '"tasks-v7"'})
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        mock_task_service.stats.assert_not_called()
+
+    def test_api_get_task_not_modified(self, mock_task_service):
+        mock_task_service.get_version.return_value = 3
+
+        response = self.client.get("/api/v1/tasks/1", headers={"If-None-Match": 'W/"task-1-v3"'})
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.headers["ETag"] == '"task-1-v3"'
+        mock_task_service.get_versioned.assert_not_called()
+
+    def test_api_get_task_sets_etag(self, mock_task_service):
+        task = TaskResponse(id=1, title='Задача', description='Описание', priority=PriorityModel.LOW)
+        mock_task_service.get_versioned.return_value = (task, 3)
+
+        response = self.client.get("/api/v1/tasks/1")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["ETag"] == '"task-1-v3"'
+        mock_task_service.get_version.assert_not_called()
+
+    @pytest.mark.parametrize('if_match, expected_versions', [
+        ('"task-1-v3"', [3]),
+        ('"task-2-v3", W/"task-1-v4"', []),
+        ('*', None),
+    ])
+    def test_api_update_task_if_match(self, mock_task_service, if_match, expected_versions):
+        task = TaskResponse(id=1, title='Задача', description='Описание', priority=PriorityModel.LOW)
+        mock_task_service.update_versioned.return_value = (task, 4)
+
+        response = self.client.put(
+            "/api/v1/tasks/1",
+            json={'title': 'Задача', 'description': 'Описание', 'priority': 'low'},
+            headers={"If-Match": if_match}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["ETag"] == '"task-1-v4"'
+        assert mock_task_service.update_versioned.call_args.kwargs['expected_versions'] == expected_versions
+
+    def test_api_delete_task_precondition_failed(self, mock_task_service):
+        mock_task_service.delete.side_effect = VersionConflictError("Task with id 1 has version 5, expected one of [4]")
+
+        response = self.client.delete("/api/v1/tasks/1", headers={"If-Match": '"task-1-v4"'})
+
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+        mock_task_service.delete.assert_called_once_with(1, expected_versions=[4])
+
+    def test_api_search_tasks(self, mock_task_service):
+        task = TaskResponse(id=3, title='Задача', description='Описание', priority=PriorityModel.LOW)
+        mock_task_service.search.return_value = ([task], 'next')
+
+        response = self.client.get("/api/v1/tasks/search", params={'q': 'зад', 'limit': 1, 'sort': 'id'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == [{'id': 3, 'title': 'Задача', 'description': 'Описание', 'priority': 'low'}]
+        assert response.headers["X-Next-Cursor"] == 'next'
+        mock_task_service.search.assert_called_once_with('зад', limit=1, cursor=None, sort=SearchSortModel.ID)
+        mock_task_service.get_versioned.assert_not_called()
+
+    def test_api_search_tasks_invalid_query(self, mock_task_service):
+        mock_task_service.search.side_effect = ValueError("Search query must contain at least one word")
+
+        response = self.client.get("/api/v1/tasks/search", params={'q': '***'})
+
+        assert response.status_code == 400
+        assert response.json()['detail'] == "Search query must contain at least one word"
+
+
+@pytest.mark.api_unit
+class TestCachedEtags:
+    """ETag и If-Match при включённом кэше, когда между коммитом записи и заполнением кэша прошла другая запись"""
+    client = TestClient(app)
+
+    @pytest.fixture
+    def db(self) -> MemoryDatabase:
+        return MemoryDatabase()
+
+    @pytest.fixture(autouse=True)
+    def service(self, db: MemoryDatabase) -> TaskService:
+        service = TaskService(db=db, cache=LRUCache(max_entries=100, ttl=60))
+        service.create('Старая', 'Описание', PriorityModel.LOW)
+        with patch('backend.app.task_service', service):
+            yield service
+        service.close()
+
+    def interleave(self, db: MemoryDatabase, write) -> None:
+        """Выполнить write сразу после коммита следующего sql_update_task"""
+        sql_update_task = db.sql_update_task
+
+        def update_then_write(*args, **kwargs):
+            row = sql_update_task(*args, **kwargs)
+            db.sql_update_task = sql_update_task
+            write()
+            return row
+
+        db.sql_update_task = update_then_write
+
+    def test_interleaved_update(self, db: MemoryDatabase, service: TaskService):
+        self.interleave(db, lambda: service.update(1, TaskRequest(title='Другая', description='Другое', priority='high')))
+
+        etag = self.client.put("/api/v1/tasks/1", json=TASK).headers["ETag"]
+
+        assert etag == '"task-1-v2"'
+        response = self.client.get("/api/v1/tasks/1", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] == '"task-1-v3"'
+        assert response.json()["title"] == 'Другая'
+        assert self.client.put("/api/v1/tasks/1", json=TASK, headers={"If-Match": etag}).status_code == 412
+
+    def test_interleaved_delete(self, db: MemoryDatabase, service: TaskService):
+        self.interleave(db, lambda: service.delete(1))
+
+        etag = self.client.put("/api/v1/tasks/1", json=TASK).headers["ETag"]
 
-    
\ No newline at end of file
+        assert self.client.get("/api/v1/tasks/1", headers={"If-None-Match": etag}).status_code == 404
+        assert self.client.put("/api/v1/tasks/1", json=TASK, headers={"If-Match": etag}).status_code == 404
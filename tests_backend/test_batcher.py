@@ -0,0 +1,102 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+import pysqlite3 as sqlite3
+import pytest
+
+from backend.batcher import WriteBatcher, WriteBatcherClosedError, batcher_from_env
+from backend.database import PureDatabase
+from backend.model import PriorityModel, TaskRequest
+from backend.task import TaskService
+
+
+@pytest.mark.db
+class TestWriteBatcher:
+
+    @pytest.fixture
+    def batcher(self, database: PureDatabase):
+        batcher = WriteBatcher(database, max_delay=0.05, max_batch=100)
+        yield batcher
+        batcher.close()
+
+    def test_concurrent_inserts_share_commits(self, database: PureDatabase, batcher: WriteBatcher):
+        with ThreadPoolExecutor(20) as pool:
+            task_ids = list(pool.map(lambda i: batcher.sql_insert_task(f'Задача {i}', 'Описание', 'low'), range(20)))
+
+        assert sorted(task_ids) == list(range(1, 21))
+        assert len(database.sql_select_all_tasks()) == 20
+        assert batcher.stats()['batches'] < 20
+
+    def test_failed_statement_does_not_affect_batch(self, database: PureDatabase, batcher: WriteBatcher):
+        results = {}
+
+        def insert(title):
+            try:
+                results[title] = batcher.sql_insert_task(title, 'Описание', 'low')
+            except sqlite3.IntegrityError as e:
+                results[title] = e
+
+        threads = [threading.Thread(target=insert, args=(title,)) for title in ('А', None, 'Б')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert isinstance(results[None], sqlite3.IntegrityError)
+        assert sorted(row['title'] for row in database.sql_select_all_tasks()) == ['А', 'Б']
+
+    def test_update_and_delete(self, database: PureDatabase, batcher: WriteBatcher):
+        task_id = batcher.sql_insert_task('Задача', 'Описание', 'low')
+
+        assert batcher.sql_update_task(task_id, 'Задача', 'Описание', 'high', expected_versions=[2]) is None
+        assert batcher.sql_update_task(task_id, 'Задача', 'Описание', 'high')['version'] == 2
+        assert batcher.sql_delete_task(task_id, expected_versions=[2]) is True
+        assert batcher.sql_delete_task(task_id) is False
+
+    def test_update_without_changes_keeps_version(self, database: PureDatabase, batcher: WriteBatcher):
+        task_id = batcher.sql_insert_task('Задача', 'Описание', 'low')
+        table_version = database.sql_select_tasks_version()
+
+        assert batcher.sql_update_task(task_id, 'Задача', 'Описание', 'low', expected_versions=[1])['version'] == 1
+        assert batcher.sql_update_task(task_id, 'Задача', 'Описание', 'low', expected_versions=[2]) is None
+        assert database.sql_select_tasks_version() == table_version
+        assert batcher.sql_update_task(task_id + 1, 'Задача', 'Описание', 'low') is None
+
+    def test_close_flushes_and_rejects_new_writes(self, database: PureDatabase):
+        batcher = WriteBatcher(database, max_delay=0.5, max_batch=100)
+        with ThreadPoolExecutor(1) as pool:
+            pending = pool.submit(batcher.sql_insert_task, 'Задача', 'Описание', 'low')
+            while batcher.stats()['queued'] == 0 and not pending.done():
+                pass
+            batcher.close()
+
+            assert pending.result(timeout=5) == 1
+        with pytest.raises(WriteBatcherClosedError):
+            batcher.sql_insert_task('Задача', 'Описание', 'low')
+
+    def test_batcher_from_env(self, database: PureDatabase, monkeypatch):
+        assert batcher_from_env(database) is None
+
+        monkeypatch.setenv("GROUP_COMMIT_MS", "5")
+        monkeypatch.setenv("GROUP_COMMIT_MAX", "64")
+        batcher = batcher_from_env(database)
+
+        assert (batcher.max_delay, batcher.max_batch) == (0.005, 64)
+        batcher.close()
+
+    def test_task_service_writes_through_batcher(self, mock_database: Mock):
+        batcher = Mock(spec=WriteBatcher)
+        batcher.sql_insert_task.return_value = 7
+        batcher.sql_update_task.return_value = {
+            'id': 7, 'title': 'Задача', 'description': 'Описание', 'priority': 'high', 'version': 2
+        }
+        service = TaskService(db=mock_database, batcher=batcher)
+
+        service.create('Задача', 'Описание', PriorityModel.LOW)
+        service.update(7, TaskRequest(title='Задача', description='Описание', priority='high'))
+        service.close()
+
+        mock_database.sql_insert_task.assert_not_called()
+        mock_database.sql_update_task.assert_not_called()
+        batcher.close.assert_called_once()
@@ -0,0 +1,231 @@
+import pytest
+from unittest.mock import Mock
+
+from backend.cache import LRUCache
+from backend.model import PriorityModel, TaskRequest, TaskResponse
+from backend.storage import MemoryDatabase
+from backend.task import TaskService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.unit
+class TestLRUCache:
+
+    def test_lru_eviction(self):
+        cache = LRUCache(max_entries=2, ttl=60)
+        cache.set(1, 'a')
+        cache.set(2, 'b')
+        cache.get(1)
+        cache.set(3, 'c')
+
+        assert cache.get(2) is None
+        assert cache.get(1) == 'a'
+        assert cache.get(3) == 'c'
+        assert cache.stats()['evictions'] == 1
+
+    def test_ttl_expiration(self):
+        clock = FakeClock()
+        cache = LRUCache(max_entries=10, ttl=5, clock=clock)
+        cache.set(1, 'a')
+
+        clock.now = 4.9
+        assert cache.get(1) == 'a'
+        clock.now = 5.0
+        assert cache.get(1) is None
+
+        stats = cache.stats()
+        assert (stats['hits'], stats['misses'], stats['expirations']) == (1, 1, 1)
+        assert stats['hit_ratio'] == 0.5
+
+    def test_set_after_invalidation_is_rejected(self):
+        cache = LRUCache(max_entries=10, ttl=60)
+        snapshot = cache.snapshot()
+        cache.invalidate(1)
+
+        assert cache.set(1, 'stale', snapshot) is False
+        assert cache.get(1) is None
+        assert cache.set(1, 'fresh', cache.snapshot()) is True
+
+    def test_invalidation_of_other_key_keeps_snapshot(self):
+        cache = LRUCache(max_entries=10, ttl=60, buckets=8)
+        snapshot = cache.snapshot(1)
+        cache.invalidate_many([2, 3])
+        cache.write_through(4, 'written', cache.snapshot(4))
+
+        assert cache.set(1, 'fresh', snapshot) is True
+        assert cache.get(1) == 'fresh'
+
+    def test_keyed_snapshot_is_rejected_after_same_key_invalidation(self):
+        cache = LRUCache(max_entries=10, ttl=60, buckets=8)
+        snapshot = cache.snapshot(1)
+        cache.invalidate_many([2, 1])
+
+        assert cache.set(1, 'stale', snapshot) is False
+        assert cache.get(1) is None
+
+    def test_clear_rejects_keyed_snapshots(self):
+        cache = LRUCache(max_entries=10, ttl=60, buckets=8)
+        snapshot = cache.snapshot(1)
+        cache.clear()
+
+        assert cache.set(1, 'stale', snapshot) is False
+
+    def test_keyless_snapshot_is_rejected_after_any_invalidation(self):
+        cache = LRUCache(max_entries=10, ttl=60)
+        snapshot = cache.snapshot()
+        cache.invalidate(2)
+
+        assert cache.write_through(1, 'maybe stale', snapshot) is False
+        assert cache.get(1) is None
+
+    def test_write_through(self):
+        cache = LRUCache(max_entries=10, ttl=60)
+        before_write = cache.snapshot()
+        reader = cache.snapshot()
+
+        assert cache.write_through(1, 'written', before_write) is True
+        assert cache.set(1, 'read before write', reader) is False
+        assert cache.get(1) == 'written'
+
+    def test_write_through_after_concurrent_invalidation(self):
+        cache = LRUCache(max_entries=10, ttl=60)
+        cache.set(1, 'old')
+        snapshot = cache.snapshot()
+        cache.invalidate(1)
+
+        assert cache.write_through(1, 'maybe stale', snapshot) is False
+        assert cache.get(1) is None
+
+
+@pytest.mark.unit
+class TestTaskServiceCache:
+
+    @pytest.fixture
+    def cached_service(self, mock_database: Mock) -> TaskService:
+        return TaskService(db=mock_database, cache=LRUCache(max_entries=100, ttl=60))
+
+    @pytest.fixture
+    def row(self):
+        return {'id': 1, 'title': 'Задача', 'description': 'Описание', 'priority': 'low', 'version': 1}
+
+    def test_get_hits_cache(self, cached_service: TaskService, mock_database: Mock, row):
+        mock_database.sql_select_task_by_id.side_effect = lambda task_id: dict(row)
+
+        first = cached_service.get(1)
+        second = cached_service.get(1)
+
+        assert first == second
+        assert mock_database.sql_select_task_by_id.call_count == 1
+        assert cached_service.cache.stats()['hits'] == 1
+
+    def test_write_of_other_task_keeps_read_cached(self, cached_service: TaskService, mock_database: Mock, row):
+        def select_while_other_task_deleted(task_id):
+            cached_service.cache.invalidate(task_id + 1)
+            return dict(row)
+
+        mock_database.sql_select_task_by_id.side_effect = select_while_other_task_deleted
+        cached_service.get(1)
+
+        assert cached_service.cache.get(1) is not None
+
+    def test_create_populates_cache(self, cached_service: TaskService, mock_database: Mock):
+        mock_database.sql_insert_task.return_value = 5
+
+        created = cached_service.create('Задача', 'Описание', PriorityModel.HIGH)
+
+        assert cached_service.get(5) == created
+        mock_database.sql_select_task_by_id.assert_not_called()
+
+    def test_update_invalidates_entry(self, cached_service: TaskService, mock_database: Mock, row):
+        mock_database.sql_select_task_by_id.return_value = dict(row)
+        mock_database.sql_update_task.return_value = {**row, 'title': 'Новая', 'version': 2}
+        cached_service.get(1)
+
+        result = cached_service.update(1, TaskRequest(title='Новая', description='Описание', priority='low'))
+
+        assert result.title == 'Новая'
+        assert cached_service.get(1).title == 'Новая'
+        assert cached_service.get_version(1) == 2
+        assert mock_database.sql_select_task_by_id.call_count == 1
+        mock_database.sql_select_task_version.assert_not_called()
+
+    def test_failed_update_invalidates_entry(self, cached_service: TaskService, mock_database: Mock, row):
+        mock_database.sql_select_task_by_id.return_value = dict(row)
+        mock_database.sql_update_task.return_value = None
+        cached_service.get(1)
+
+        with pytest.raises(ValueError):
+            cached_service.update(1, TaskRequest(title='Новая', description='Описание', priority='low'))
+
+        assert cached_service.cache.get(1) is None
+
+    def test_delete_invalidates_entry(self, cached_service: TaskService, mock_database: Mock, row):
+        mock_database.sql_select_task_by_id.side_effect = [dict(row), None]
+        mock_database.sql_delete_task.return_value = True
+        cached_service.get(1)
+
+        cached_service.delete(1)
+
+        with pytest.raises(ValueError):
+            cached_service.get(1)
+
+    @pytest.mark.parametrize("interleaved", ["delete", "update"])
+    def test_write_interleaved_before_cache_fill(self, interleaved):
+        """Запись другого потока между коммитом update и заполнением кэша не оставляет в кэше старую версию"""
+        db = MemoryDatabase()
+        service = TaskService(db=db, cache=LRUCache(max_entries=100, ttl=60))
+        task = service.create('Задача', 'Описание', PriorityModel.LOW)
+        sql_update_task = db.sql_update_task
+        request = TaskRequest(title='Новая', description='Описание', priority='low')
+
+        def update_then_interleave(*args, **kwargs):
+            row = sql_update_task(*args, **kwargs)
+            db.sql_update_task = sql_update_task
+            if interleaved == "delete":
+                service.delete(task.id)
+            else:
+                service.update(task.id, TaskRequest(title='Другая', description='Другое', priority='high'))
+            return row
+
+        db.sql_update_task = update_then_interleave
+        updated, version = service.update_versioned(task.id, request)
+
+        assert version == 2
+        if interleaved == "delete":
+            assert service.get_version(task.id) is None
+            with pytest.raises(ValueError):
+                service.get(task.id)
+        else:
+            assert service.get_versioned(task.id) == (
+                TaskResponse(id=task.id, title='Другая', description='Другое', priority=PriorityModel.HIGH), 3
+            )
+        service.close()
+
+    def test_bulk_delete_invalidates_existing_ids(self, cached_service: TaskService, mock_database: Mock):
+        cached_service.cache.set(1, (TaskResponse(id=1, title='Задача', description='Описание'), 1))
+        cached_service.cache.set(2, (TaskResponse(id=2, title='Задача', description='Описание'), 1))
+        mock_database.sql_delete_tasks.return_value = {1}
+
+        cached_service.delete_many([1, 3])
+
+        assert cached_service.cache.get(1) is None
+        assert cached_service.cache.get(2) is not None
+
+    def test_cache_disabled_by_default(self, task_service: TaskService):
+        assert task_service.cache is None
+
+    def test_cache_from_env(self, mock_database: Mock, monkeypatch):
+        monkeypatch.setenv("TASK_CACHE_SIZE", "10")
+        monkeypatch.setenv("TASK_CACHE_TTL", "2.5")
+
+        service = TaskService(db=mock_database)
+
+        assert service.cache.max_entries == 10
+        assert service.cache.ttl == 2.5
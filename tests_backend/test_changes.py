@@ -0,0 +1,158 @@
+import asyncio
+import json
+from typing import AsyncIterator, List
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import changes
+from backend.app import app
+from backend.changes import KEEPALIVE, ChangeFeed
+from backend.model import PriorityModel, TaskRequest
+from backend.storage import MemoryDatabase
+from backend.task import TaskService
+
+
+async def take(frames: AsyncIterator[str], count: int) -> List[str]:
+    """Следующие count кадров SSE без keepalive"""
+    taken = []
+    while len(taken) < count:
+        frame = await asyncio.wait_for(frames.__anext__(), timeout=5)
+        if frame != KEEPALIVE:
+            taken.append(frame)
+    return taken
+
+
+def parse(frame: str) -> dict:
+    fields = dict(line.split(": ", 1) for line in frame.strip().split("\n"))
+    return {"id": int(fields["id"]), "event": fields["event"], "data": json.loads(fields["data"])}
+
+
+@pytest.mark.unit
+class TestChangeFeed:
+
+    @pytest.fixture
+    def service(self) -> TaskService:
+        service = TaskService(db=MemoryDatabase())
+        yield service
+        service.close()
+
+    def test_live_events(self, service: TaskService):
+        feed = ChangeFeed(service, poll_interval=10)
+        service.add_change_listener(feed.notify)
+
+        async def scenario():
+            frames = feed.subscribe()
+            first = asyncio.ensure_future(take(frames, 1))
+            await asyncio.sleep(0.05)
+            task = service.create("Задача", "Описание", PriorityModel.LOW)
+            service.update(task.id, TaskRequest(title="Новая", description="Описание", priority=PriorityModel.HIGH))
+            service.delete(task.id)
+            events = [parse(frame) for frame in await first + await take(frames, 2)]
+            await frames.aclose()
+            return task, events
+
+        # Опрос раз в 10 секунд: события приходят сразу только потому, что запись будит опросчик
+        task, events = asyncio.run(scenario())
+
+        assert [(event["event"], event["data"]["version"]) for event in events] == [
+            ("created", 1), ("updated", 2), ("deleted", 2)
+        ]
+        assert [event["id"] for event in events] == [1, 2, 3]
+        assert events[1]["data"]["task"] == {
+            "id": task.id, "title": "Новая", "description": "Описание", "priority": "high"
+        }
+        assert events[2]["data"]["task"] is None
+
+    def test_resume_after_cursor(self, service: TaskService):
+        for i in range(3):
+            service.create(f"Задача {i}", "Описание")
+        feed = ChangeFeed(service)
+
+        async def scenario():
+            frames = feed.subscribe(after=1)
+            events = [parse(frame) for frame in await take(frames, 2)]
+            await frames.aclose()
+            return events
+
+        assert [event["id"] for event in asyncio.run(scenario())] == [2, 3]
+
+    def test_reset_when_cursor_was_pruned(self, service: TaskService):
+        for i in range(5):
+            service.create(f"Задача {i}", "Описание")
+        service.prune_changes(keep=2)
+        feed = ChangeFeed(service)
+
+        async def scenario():
+            frames = feed.subscribe(after=1)
+            events = [parse(frame) for frame in await take(frames, 1)]
+            await frames.aclose()
+            return events
+
+        reset, = asyncio.run(scenario())
+        assert (reset["event"], reset["id"], reset["data"]) == ("reset", 5, {"seq": 5})
+
+    def test_slow_subscriber_catches_up_from_log(self, service: TaskService, monkeypatch):
+        monkeypatch.setattr(changes, "SUBSCRIBER_QUEUE_SIZE", 2)
+        feed = ChangeFeed(service, poll_interval=0.01)
+
+        async def scenario():
+            frames = feed.subscribe()
+            waiting = asyncio.ensure_future(take(frames, 1))
+            await asyncio.sleep(0.05)
+            for i in range(10):
+                service.create(f"Задача {i}", "Описание")
+            await asyncio.sleep(0.1)
+            events = [parse(frame) for frame in await waiting + await take(frames, 9)]
+            await frames.aclose()
+            return events
+
+        assert [event["id"] for event in asyncio.run(scenario())] == list(range(1, 11))
+
+    def test_keepalive_when_idle(self, service: TaskService):
+        feed = ChangeFeed(service, heartbeat=0.01)
+
+        async def scenario():
+            frames = feed.subscribe()
+            frame = await asyncio.wait_for(frames.__anext__(), timeout=5)
+            await frames.aclose()
+            return frame
+
+        assert asyncio.run(scenario()) == KEEPALIVE
+
+
+@pytest.mark.api_unit
+class TestChangesEndpoint:
+    client = TestClient(app)
+
+    @pytest.fixture
+    def feed(self):
+        frames = ["id: 7\nevent: created\ndata: {}\n\n"]
+
+        async def subscribe(after=None):
+            feed.after = after
+            for frame in frames:
+                yield frame
+
+        with patch("backend.app.change_feed") as feed:
+            feed.subscribe = subscribe
+            yield feed
+
+    def test_stream(self, feed):
+        response = self.client.get("/api/v1/tasks/changes?after=3")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert response.text == "id: 7\nevent: created\ndata: {}\n\n"
+        assert feed.after == 3
+
+    def test_last_event_id_wins(self, feed):
+        self.client.get("/api/v1/tasks/changes?after=3", headers={"Last-Event-ID": "5"})
+
+        assert feed.after == 5
+
+    def test_invalid_last_event_id(self, feed):
+        response = self.client.get("/api/v1/tasks/changes", headers={"Last-Event-ID": "abc"})
+
+        assert response.status_code == 400
@@ -0,0 +1,240 @@
+import gzip
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from backend.app import app
+from backend.cache_control import NO_STORE, REVALIDATE, CacheControlMiddleware, revalidate_after
+from backend.compression import CompressionMiddleware, negotiate
+from backend.etag import etag_matches, if_match_versions, with_coding
+from backend.model import PriorityModel, TaskResponse
+
+BODY = ("[" + ",".join('{"title":"Задача","description":"Описание","priority":"low"}' for _ in range(50)) + "]").encode()
+
+
+def make_app(**options) -> FastAPI:
+    test_app = FastAPI()
+    test_app.add_middleware(CompressionMiddleware, **options)
+
+    @test_app.get("/large")
+    async def large():
+        return Response(BODY, media_type="application/json")
+
+    @test_app.get("/small")
+    async def small():
+        return Response(b"[]", media_type="application/json")
+
+    @test_app.get("/events")
+    async def events():
+        async def frames():
+            yield BODY
+            yield BODY
+        return StreamingResponse(frames(), media_type="text/event-stream")
+
+    return test_app
+
+
+@pytest.mark.unit
+class TestNegotiate:
+
+    @pytest.mark.parametrize("accept_encoding, expected", [
+        ("gzip, deflate, br", "br"),
+        ("gzip", "gzip"),
+        ("br;q=0.5, gzip", "gzip"),
+        ("br;q=0, gzip;q=0", None),
+        ("*", "br"),
+        ("identity", None),
+        ("", None),
+    ])
+    def test_negotiate(self, accept_encoding, expected):
+        assert negotiate(accept_encoding, ("br", "gzip")) == expected
+
+    def test_server_preference_breaks_ties(self):
+        assert negotiate("br, gzip", ("gzip", "br")) == "gzip"
+
+    def test_unsupported_encoding_is_rejected(self):
+        with pytest.raises(ValueError):
+            CompressionMiddleware(FastAPI(), encodings=("zstd",))
+
+
+@pytest.mark.unit
+class TestRepresentationEtags:
+
+    def test_with_coding(self):
+        assert with_coding('"task-1-v2"', "gzip") == '"task-1-v2-gzip"'
+        assert with_coding('W/"task-1-v2"', "gzip") == 'W/"task-1-v2"'
+
+    def test_coded_etag_matches_data_version(self):
+        assert etag_matches('"tasks-v7-br"', '"tasks-v7"')
+        assert not etag_matches('"tasks-v6-gzip"', '"tasks-v7"')
+        assert if_match_versions('"task-1-v2-gzip", "task-1-v3"', 1) == [2, 3]
+
+
+@pytest.mark.api_unit
+class TestCompressionMiddleware:
+
+    def test_gzip_above_threshold(self):
+        client = TestClient(make_app(encodings=("gzip",), minimum_size=100))
+
+        response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Vary"] == "Accept-Encoding"
+        assert int(response.headers["Content-Length"]) < len(BODY)
+        assert response.content == BODY
+
+    def test_small_response_is_not_compressed(self):
+        client = TestClient(make_app(encodings=("gzip",), minimum_size=100))
+
+        response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+
+        assert "Content-Encoding" not in response.headers
+        assert response.content == b"[]"
+
+    def test_client_without_accept_encoding(self):
+        client = TestClient(make_app(encodings=("gzip",), minimum_size=100))
+
+        response = client.get("/large", headers={"Accept-Encoding": "identity"})
+
+        assert "Content-Encoding" not in response.headers
+        assert response.content == BODY
+
+    def test_event_stream_is_not_compressed(self):
+        client = TestClient(make_app(encodings=("gzip",), minimum_size=100))
+
+        response = client.get("/events", headers={"Accept-Encoding": "gzip"})
+
+        assert "Content-Encoding" not in response.headers
+        assert response.content == BODY + BODY
+
+    def test_disabled(self):
+        client = TestClient(make_app(encodings=(), minimum_size=100))
+
+        response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+        assert "Content-Encoding" not in response.headers
+
+    def test_gzip_level(self):
+        fast = TestClient(make_app(encodings=("gzip",), minimum_size=100, gzip_level=1))
+
+        response = fast.get("/large", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert int(response.headers["Content-Length"]) == len(gzip.compress(BODY, compresslevel=1))
+
+    def test_brotli(self):
+        pytest.importorskip("brotli")
+        client = TestClient(make_app(minimum_size=100))
+
+        response = client.get("/large", headers={"Accept-Encoding": "gzip, br"})
+
+        assert response.headers["Content-Encoding"] == "br"
+        assert int(response.headers["Content-Length"]) < len(BODY)
+        assert response.content == BODY
+
+
+@pytest.mark.api_unit
+class TestCacheControl:
+
+    @staticmethod
+    def make_client(policies) -> TestClient:
+        test_app = FastAPI()
+        test_app.add_middleware(CacheControlMiddleware, policies=policies)
+
+        @test_app.get("/items/{item_id}")
+        async def read(item_id: int):
+            return {}
+
+        @test_app.put("/items/{item_id}")
+        async def write(item_id: int):
+            return {}
+
+        @test_app.get("/own")
+        async def own():
+            return Response(b"", headers={"Cache-Control": "max-age=60"})
+
+        @test_app.get("/docs-like")
+        async def unlisted():
+            return {}
+
+        return TestClient(test_app)
+
+    def test_policy_by_route_template(self):
+        client = self.make_client({"/items/{item_id}": REVALIDATE, "/own": NO_STORE})
+
+        assert client.get("/items/1").headers["Cache-Control"] == "no-cache"
+        assert client.put("/items/1").headers["Cache-Control"] == "no-store"
+        assert client.get("/own").headers["Cache-Control"] == "max-age=60"
+        assert "Cache-Control" not in client.get("/docs-like").headers
+        assert "Cache-Control" not in client.get("/missing").headers
+
+    def test_revalidate_after(self):
+        assert revalidate_after(0) == "no-cache"
+        assert revalidate_after(30) == "private, max-age=30"
+
+
+@pytest.mark.api_unit
+class TestAppCachingHeaders:
+    client = TestClient(app)
+
+    @pytest.fixture(autouse=True)
+    def setup_mock_service(self, mock_task_service):
+        with patch('backend.app.task_service', mock_task_service):
+            yield
+
+    def test_task_list_is_compressed(self, mock_task_service):
+        tasks = [
+            TaskResponse(id=i, title='Задача', description='Описание', priority=PriorityModel.LOW)
+            for i in range(1, 101)
+        ]
+        mock_task_service.get_page.return_value = (tasks, None)
+
+        response = self.client.get("/api/v1/tasks", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Cache-Control"] == "no-cache"
+        assert response.headers["ETag"] == '"tasks-v1-gzip"'
+        assert len(response.json()) == 100
+
+    def test_identity_and_gzip_etags_differ(self, mock_task_service):
+        tasks = [
+            TaskResponse(id=i, title='Задача', description='Описание', priority=PriorityModel.LOW)
+            for i in range(1, 101)
+        ]
+        mock_task_service.get_page.return_value = (tasks, None)
+
+        plain = self.client.get("/api/v1/tasks", headers={"Accept-Encoding": "identity"})
+        compressed = self.client.get("/api/v1/tasks", headers={"Accept-Encoding": "gzip"})
+
+        assert plain.headers["ETag"] == '"tasks-v1"'
+        assert compressed.headers["ETag"] == '"tasks-v1-gzip"'
+
+    def test_not_modified_confirms_coded_etag(self, mock_task_service):
+        headers = {"Accept-Encoding": "gzip", "If-None-Match": '"tasks-v1-gzip"'}
+
+        response = self.client.get("/api/v1/tasks", headers=headers)
+
+        assert response.status_code == 304
+        assert response.headers["ETag"] == '"tasks-v1-gzip"'
+        mock_task_service.get_page.assert_not_called()
+
+    def test_not_modified_keeps_policy(self, mock_task_service):
+        mock_task_service.list_version.return_value = 7
+
+        response = self.client.get("/api/v1/tasks/stats", headers={"If-None-Match": '"tasks-v7"'})
+
+        assert response.status_code == 304
+        assert response.headers["Cache-Control"] == "no-cache"
+
+    def test_write_is_not_stored(self, mock_task_service):
+        mock_task_service.delete.return_value = True
+
+        response = self.client.delete("/api/v1/tasks/1")
+
+        assert response.headers["Cache-Control"] == "no-store"
+
+    def test_metrics_are_not_stored(self):
+        assert self.client.get("/metrics").headers["Cache-Control"] == "no-store"
@@ -0,0 +1,379 @@
+import threading
+
+import pysqlite3 as sqlite3
+import pytest
+
+from backend.database import PureDatabase, insert_task_statement, update_task_statement
+from backend.pool import ConnectionPool, PoolClosedError, PoolTimeoutError
+
+
+@pytest.mark.db
+class TestConnectionPool:
+
+    def test_pool_reuses_connection(self, tmp_path):
+        pool = ConnectionPool(lambda: sqlite3.connect(str(tmp_path / "pool.db")), max_size=2)
+
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+
+        assert first is second
+        assert pool.stats() == {"max_size": 2, "size": 1, "idle": 1, "in_use": 0}
+        pool.close()
+
+    def test_pool_is_bounded(self, tmp_path):
+        pool = ConnectionPool(lambda: sqlite3.connect(str(tmp_path / "pool.db")), max_size=1, timeout=0.05)
+
+        conn = pool.acquire()
+        with pytest.raises(PoolTimeoutError):
+            pool.acquire()
+
+        pool.release(conn)
+        assert pool.acquire() is conn
+        pool.close()
+
+    def test_pool_waiter_gets_released_connection(self, tmp_path):
+        pool = ConnectionPool(
+            lambda: sqlite3.connect(str(tmp_path / "pool.db"), check_same_thread=False),
+            max_size=1
+        )
+        conn = pool.acquire()
+        acquired = []
+
+        worker = threading.Thread(target=lambda: acquired.append(pool.acquire()))
+        worker.start()
+        pool.release(conn)
+        worker.join(timeout=5)
+
+        assert acquired == [conn]
+        pool.close()
+
+    def test_pool_replaces_broken_connection(self, tmp_path):
+        pool = ConnectionPool(
+            lambda: sqlite3.connect(str(tmp_path / "pool.db")),
+            max_size=1,
+            health_check_interval=0
+        )
+        conn = pool.acquire()
+        pool.release(conn)
+        conn.close()
+
+        fresh = pool.acquire()
+
+        assert fresh is not conn
+        assert fresh.execute("SELECT 1").fetchone() == (1,)
+        pool.close()
+
+    def test_closed_pool_rejects_acquire(self, tmp_path):
+        pool = ConnectionPool(lambda: sqlite3.connect(str(tmp_path / "pool.db")), max_size=1)
+        pool.close()
+
+        with pytest.raises(PoolClosedError):
+            pool.acquire()
+
+    def test_disabled_pool_opens_connection_per_call(self, tmp_path):
+        pool = ConnectionPool(lambda: sqlite3.connect(str(tmp_path / "pool.db")), max_size=0)
+
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+
+        assert first is not second
+
+
+@pytest.mark.db
+class TestPureDatabase:
+
+    def test_crud_roundtrip(self, database: PureDatabase):
+        task_id = database.sql_insert_task('Задача', 'Задача на день', 'low')
+
+        assert database.sql_select_task_by_id(task_id) == {
+            'id': task_id,
+            'title': 'Задача',
+            'description': 'Задача на день',
+            'priority': 'low',
+            'version': 1
+        }
+        assert database.sql_update_task(task_id, 'Задача', 'Новое описание', 'high') == {
+            'id': task_id,
+            'title': 'Задача',
+            'description': 'Новое описание',
+            'priority': 'high',
+            'version': 2
+        }
+        assert database.sql_select_all_tasks()[0]['priority'] == 'high'
+        assert database.sql_delete_task(task_id) is True
+        assert database.sql_select_task_by_id(task_id) is None
+
+    def test_write_missing_task(self, database: PureDatabase):
+        assert database.sql_update_task(999, 'Задача', 'Описание', 'low') is None
+        assert database.sql_delete_task(999) is False
+
+    def test_single_writes_do_not_leave_open_transaction(self, database: PureDatabase):
+        task_id = database.sql_insert_task('Задача', 'Описание', 'low')
+        database.sql_update_task(task_id, 'Задача', 'Описание', 'high')
+
+        with database._pool.connection() as conn:
+            assert conn.in_transaction is False
+
+    def test_failed_write_is_rolled_back(self, database: PureDatabase):
+        with pytest.raises(sqlite3.IntegrityError):
+            database.sql_insert_task(None, 'Описание', 'low')
+
+        assert database.sql_select_all_tasks() == []
+        assert database.sql_insert_task('Задача', 'Описание', 'low') > 0
+
+    def test_wal_profile_applied_to_pooled_connections(self, database: PureDatabase):
+        settings = database.storage_settings()
+
+        assert settings['profile'] == 'wal'
+        assert settings['journal_mode'] == 'wal'
+        assert settings['synchronous'] == 'NORMAL'
+        assert settings['temp_store'] == 'MEMORY'
+        assert settings['busy_timeout'] == 5000
+
+    def test_reader_not_blocked_by_open_write_transaction(self, database: PureDatabase):
+        database.sql_insert_task('Задача', 'Описание', 'low')
+
+        with database._transaction() as cursor:
+            cursor.execute("UPDATE tasks SET priority = 'high'")
+            assert database.sql_select_all_tasks()[0]['priority'] == 'low'
+
+        assert database.sql_select_all_tasks()[0]['priority'] == 'high'
+
+    def test_reads_use_read_only_connections(self, database: PureDatabase):
+        with database._pool.connection() as conn:
+            assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute("INSERT INTO tasks (title, description) VALUES ('Задача', 'Описание')")
+
+        assert database.pool_stats()['write']['max_size'] == 1
+        assert database.storage_settings()['split_reads'] is True
+
+    def test_concurrent_writes_share_one_writer(self, database: PureDatabase):
+        threads = [
+            threading.Thread(target=database.sql_insert_task, args=(f'Задача {i}', 'Описание', 'low'))
+            for i in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(database.sql_select_all_tasks()) == 20
+        assert database.pool_stats()['write']['size'] == 1
+
+    def test_iter_tasks_reads_one_snapshot(self, database: PureDatabase):
+        database.sql_insert_tasks([(f'Задача {i}', 'Описание', 'low') for i in range(6)])
+
+        batches = database.iter_tasks(batch_size=2)
+        first = next(batches)
+        database.sql_delete_task(5)
+        database.sql_insert_task('Новая', 'Описание', 'low')
+        rest = [row['id'] for batch in batches for row in batch]
+
+        assert [row['id'] for row in first] + rest == [1, 2, 3, 4, 5, 6]
+
+    def test_split_reads_disabled_from_env(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("DB_SPLIT_READS", "0")
+        db = PureDatabase(str(tmp_path / "tasks.db"), pool_size=2)
+
+        assert db._pool is db._write_pool
+        assert db.sql_insert_task('Задача', 'Описание', 'low') == 1
+        db.close()
+
+    def test_memory_database_uses_one_connection(self):
+        db = PureDatabase(":memory:", pool_size=4)
+        threads = [
+            threading.Thread(target=db.sql_insert_task, args=(f'Задача {i}', 'Описание', 'low'))
+            for i in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(db.sql_select_all_tasks()) == 8
+        assert db.pool_stats()['write']['max_size'] == 1
+        db.close()
+
+    def test_storage_profile_from_env(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("DB_STORAGE_PROFILE", "safe")
+        db = PureDatabase(str(tmp_path / "safe.db"), pool_size=1)
+
+        assert db.storage_settings()['journal_mode'] == 'delete'
+        assert db.storage_settings()['synchronous'] == 'FULL'
+        db.close()
+
+    def test_unknown_storage_profile(self, tmp_path):
+        with pytest.raises(ValueError) as expect:
+            PureDatabase(str(tmp_path / "tasks.db"), storage_profile='turbo')
+
+        assert "Unknown storage profile 'turbo'" in str(expect.value)
+
+    @pytest.mark.parametrize('sort, descending, expected', [
+        ('id', False, [2, 4, 6]),
+        ('id', True, [6, 4, 2]),
+        ('title', False, [6, 4, 2]),
+    ])
+    def test_select_tasks_page_keyset(self, database: PureDatabase, sort, descending, expected):
+        for i in range(1, 7):
+            database.sql_insert_task(f'Задача {10 - i}', 'Описание', 'high' if i % 2 == 0 else 'low')
+
+        first = database.sql_select_tasks_page(2, priority='high', sort=sort, descending=descending)
+        after = [first[-1][key] for key in ('title', 'id')] if sort == 'title' else [first[-1]['id']]
+        second = database.sql_select_tasks_page(2, after=after, priority='high', sort=sort, descending=descending)
+
+        assert [row['id'] for row in first + second] == expected
+
+    @pytest.mark.parametrize('query', [
+        "SELECT * FROM tasks WHERE priority = 'low' AND id > 10 ORDER BY id LIMIT 5",
+        "SELECT * FROM tasks WHERE priority = 'low' ORDER BY title DESC, id DESC LIMIT 5",
+        "SELECT * FROM tasks WHERE (title, id) > ('a', 1) ORDER BY title, id LIMIT 5",
+    ])
+    def test_page_queries_use_index(self, database: PureDatabase, query):
+        with database._pool.connection() as conn:
+            plan = " ".join(row['detail'] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}"))
+
+        assert "USING INDEX" in plan
+        assert "TEMP B-TREE" not in plan
+
+    def test_iter_tasks_in_batches(self, database: PureDatabase):
+        for i in range(5):
+            database.sql_insert_task(f'Задача {i}', 'Описание', 'low')
+
+        batches = list(database.iter_tasks(batch_size=2))
+
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        assert [row['id'] for batch in batches for row in batch] == [1, 2, 3, 4, 5]
+        assert database._pool.stats()['in_use'] == 0
+
+    def test_bulk_insert_returns_sequential_ids(self, database: PureDatabase):
+        database.sql_insert_task('Первая', 'Описание', 'low')
+        database.sql_delete_task(1)
+
+        task_ids = database.sql_insert_tasks([('А', 'Описание', 'low'), ('Б', 'Описание', 'high')])
+
+        assert task_ids == [2, 3]
+        assert [row['title'] for row in database.sql_select_all_tasks()] == ['А', 'Б']
+
+    def test_bulk_update_atomic_rolls_back_on_missing_id(self, database: PureDatabase):
+        task_id = database.sql_insert_task('Задача', 'Описание', 'low')
+
+        existing = database.sql_update_tasks([(task_id, None, None, 'high'), (999, 'Х', None, None)], atomic=True)
+
+        assert existing == {task_id}
+        assert database.sql_select_task_by_id(task_id)['priority'] == 'low'
+
+    def test_bulk_update_partial_keeps_unset_fields(self, database: PureDatabase):
+        task_id = database.sql_insert_task('Задача', 'Описание', 'low')
+
+        database.sql_update_tasks([(task_id, None, None, 'high'), (999, 'Х', None, None)], atomic=False)
+
+        assert database.sql_select_task_by_id(task_id) == {
+            'id': task_id, 'title': 'Задача', 'description': 'Описание', 'priority': 'high', 'version': 2
+        }
+
+    def test_bulk_delete(self, database: PureDatabase):
+        ids = database.sql_insert_tasks([('А', 'Описание', 'low'), ('Б', 'Описание', 'low')])
+
+        assert database.sql_delete_tasks(ids + [999], atomic=True) == set(ids)
+        assert len(database.sql_select_all_tasks()) == 2
+        assert database.sql_delete_tasks(ids + [999], atomic=False) == set(ids)
+        assert database.sql_select_all_tasks() == []
+
+    def test_table_version_changes_on_every_write(self, database: PureDatabase):
+        versions = [database.sql_select_tasks_version()]
+        task_id = database.sql_insert_task('Задача', 'Описание', 'low')
+        versions.append(database.sql_select_tasks_version())
+        database.sql_update_tasks([(task_id, None, None, 'high')])
+        versions.append(database.sql_select_tasks_version())
+        database.sql_delete_task(task_id)
+        versions.append(database.sql_select_tasks_version())
+
+        assert versions == sorted(set(versions))
+        assert database.sql_select_tasks_version() == versions[-1]
+
+    def test_conditional_write_checks_version(self, database: PureDatabase):
+        task_id = database.sql_insert_task('Задача', 'Описание', 'low')
+
+        assert database.sql_update_task(task_id, 'Задача', 'Описание', 'high', expected_versions=[2]) is None
+        assert database.sql_update_task(task_id, 'Задача', 'Описание', 'high', expected_versions=[1])['version'] == 2
+        assert database.sql_delete_task(task_id, expected_versions=[1]) is False
+        assert database.sql_select_task_version(task_id) == 2
+        assert database.sql_delete_task(task_id, expected_versions=[2]) is True
+        assert database.sql_select_task_version(task_id) is None
+
+    def test_version_column_added_to_existing_table(self, tmp_path):
+        path = str(tmp_path / "old.db")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE tasks (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, "
+                     "description TEXT NOT NULL, priority TEXT NOT NULL DEFAULT 'medium')")
+        conn.execute("INSERT INTO tasks (title, description, priority) VALUES ('Задача', 'Описание', 'low')")
+        conn.commit()
+        conn.close()
+
+        db = PureDatabase(path, pool_size=1)
+
+        assert db.sql_select_task_version(1) == 1
+        db.close()
+
+    def test_search_index_follows_writes(self, database: PureDatabase):
+        first = database.sql_insert_task('Позвонить маме', 'Поздравить с днём рождения', 'low')
+        second = database.sql_insert_tasks([('Купить продукты', 'Молоко для мамы', 'high')])[0]
+
+        assert [row['id'] for row in database.sql_search_tasks('ПОЗВОН', 10)] == [first]
+        assert {row['id'] for row in database.sql_search_tasks('мам', 10)} == {first, second}
+
+        database.sql_update_task(first, 'Написать отчёт', 'Квартальный', 'low')
+        database.sql_delete_task(second)
+
+        assert database.sql_search_tasks('мам', 10) == []
+        assert database.sql_search_tasks('отчёт квартал', 10, ranked=False) == [
+            {'id': first, 'title': 'Написать отчёт', 'description': 'Квартальный', 'priority': 'low'}
+        ]
+
+    def test_search_ranks_title_matches_first(self, database: PureDatabase):
+        in_description = database.sql_insert_task('Задача', 'Подготовить релиз', 'low')
+        in_title = database.sql_insert_task('Релиз', 'Задача', 'low')
+
+        ranked = database.sql_search_tasks('релиз', 10)
+        by_id = database.sql_search_tasks('релиз', 10, ranked=False)
+
+        assert [row['id'] for row in ranked] == [in_title, in_description]
+        assert [row['id'] for row in by_id] == [in_description, in_title]
+        assert database.sql_search_tasks('релиз', 10, ranked=False, after_id=in_description) == [by_id[1]]
+
+    def test_search_requires_words(self, database: PureDatabase):
+        with pytest.raises(ValueError) as expect:
+            database.sql_search_tasks('"*" -', 10)
+
+        assert str(expect.value) == "Search query must contain at least one word"
+
+    def test_search_index_built_for_existing_rows(self, tmp_path):
+        path = str(tmp_path / "old.db")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE tasks (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, "
+                     "description TEXT NOT NULL, priority TEXT NOT NULL DEFAULT 'medium')")
+        conn.execute("INSERT INTO tasks (title, description, priority) VALUES ('Задача', 'Описание', 'low')")
+        conn.commit()
+        conn.close()
+
+        db = PureDatabase(path, pool_size=1)
+
+        assert [row['id'] for row in db.sql_search_tasks('описание', 10)] == [1]
+        db.close()
+
+    def test_write_batch_isolates_failed_statement(self, database: PureDatabase):
+        results = database.sql_write_batch([
+            insert_task_statement('А', 'Описание', 'low'),
+            insert_task_statement(None, 'Описание', 'low'),
+            update_task_statement(1, 'А', 'Описание', 'high'),
+        ])
+
+        assert results[0] == [{'id': 1}]
+        assert isinstance(results[1], sqlite3.IntegrityError)
+        assert results[2][0]['priority'] == 'high'
+        assert [row['id'] for row in database.sql_select_all_tasks()] == [1]
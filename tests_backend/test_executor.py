@@ -0,0 +1,59 @@
+import asyncio
+import threading
+
+import pytest
+
+from backend.executor import DatabaseExecutor
+
+
+@pytest.mark.unit
+class TestDatabaseExecutor:
+
+    def test_run_uses_dedicated_threads(self):
+        executor = DatabaseExecutor(max_workers=2)
+
+        thread_name = asyncio.run(executor.run(lambda: threading.current_thread().name))
+
+        assert thread_name.startswith("db-executor")
+        executor.shutdown()
+
+    def test_run_propagates_exceptions(self):
+        executor = DatabaseExecutor(max_workers=1)
+
+        def fail(message):
+            raise ValueError(message)
+
+        with pytest.raises(ValueError, match="boom"):
+            asyncio.run(executor.run(fail, "boom"))
+        executor.shutdown()
+
+    def test_iterate_closes_generator_on_early_exit(self):
+        executor = DatabaseExecutor(max_workers=1)
+        closed = []
+
+        def numbers():
+            try:
+                yield from range(10)
+            finally:
+                closed.append(True)
+
+        async def take_two():
+            result = []
+            stream = executor.iterate(numbers())
+            async for number in stream:
+                result.append(number)
+                if len(result) == 2:
+                    break
+            await stream.aclose()
+            return result
+
+        assert asyncio.run(take_two()) == [0, 1]
+        assert closed == [True]
+        executor.shutdown()
+
+    def test_executor_restarts_after_shutdown(self):
+        executor = DatabaseExecutor(max_workers=1)
+        executor.shutdown()
+
+        assert asyncio.run(executor.run(sum, [1, 2, 3])) == 6
+        executor.shutdown()
@@ -0,0 +1,165 @@
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app import app
+from backend.idempotency import (
+    IdempotencyKeyInProgressError, IdempotencyKeyReusedError, IdempotencyStore, StoredResponse, request_fingerprint
+)
+from backend.model import PriorityModel, TaskModel, TaskResponse
+from backend.storage import MemoryDatabase
+from backend.task import TaskService
+
+TASK = {"title": "Задача", "description": "Описание", "priority": "low"}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def store(clock) -> IdempotencyStore:
+    service = TaskService(db=MemoryDatabase())
+    yield IdempotencyStore(service, ttl=100, pending_ttl=10, cache_size=10, max_keys=2, clock=clock)
+    service.close()
+
+
+@pytest.mark.unit
+class TestIdempotencyStore:
+
+    def test_replay_after_complete(self, store: IdempotencyStore):
+        response = StoredResponse(200, b'{"id":1}', {"ETag": '"task-1-v1"'})
+
+        assert store.begin("k", "fp") is None
+        store.complete("k", "fp", response)
+
+        assert store.begin("k", "fp") == response
+
+    def test_replay_from_storage_without_cache(self, store: IdempotencyStore):
+        store.begin("k", "fp")
+        store.complete("k", "fp", StoredResponse(200, b'{"id":1}', {}))
+        store.cache.clear()
+
+        assert store.begin("k", "fp") == StoredResponse(200, b'{"id":1}', {})
+        assert store.cache.get("k") is not None
+
+    def test_in_progress_and_reused(self, store: IdempotencyStore):
+        store.begin("k", "fp")
+
+        with pytest.raises(IdempotencyKeyInProgressError):
+            store.begin("k", "fp")
+        with pytest.raises(IdempotencyKeyReusedError):
+            store.begin("k", "other")
+
+        store.complete("k", "fp", StoredResponse(200, b"{}", {}))
+        with pytest.raises(IdempotencyKeyReusedError):
+            store.begin("k", "other")
+
+    def test_abort_releases_key(self, store: IdempotencyStore):
+        store.begin("k", "fp")
+        store.abort("k")
+
+        assert store.begin("k", "fp") is None
+
+    def test_pending_key_expires(self, store: IdempotencyStore, clock: FakeClock):
+        store.begin("k", "fp")
+        clock.now += 10
+
+        assert store.begin("k", "fp") is None
+
+    def test_stored_response_expires(self, store: IdempotencyStore, clock: FakeClock):
+        store.begin("k", "fp")
+        store.complete("k", "fp", StoredResponse(200, b"{}", {}))
+        clock.now += 100
+
+        assert store.begin("k", "fp") is None
+
+    def test_prune_keeps_max_keys(self, store: IdempotencyStore, clock: FakeClock):
+        for key in ("a", "b", "c"):
+            clock.now += 1
+            store.begin(key, "fp")
+
+        assert store.prune() == 1
+        assert store.begin("a", "fp") is None
+
+
+@pytest.mark.api_unit
+class TestIdempotentEndpoints:
+    client = TestClient(app)
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mock_task_service, store):
+        created = TaskResponse(id=1, title="Задача", description="Описание", priority=PriorityModel.LOW)
+        mock_task_service.create.return_value = created
+        mock_task_service.update_versioned.return_value = (created, 2)
+        with patch('backend.app.task_service', mock_task_service), patch('backend.app.idempotency', store):
+            yield
+
+    def test_create_is_replayed(self, mock_task_service):
+        headers = {"Idempotency-Key": "create-1"}
+
+        first = self.client.post("/api/v1/tasks", json=TASK, headers=headers)
+        second = self.client.post("/api/v1/tasks", json=TASK, headers=headers)
+
+        assert first.status_code == second.status_code == 200
+        assert first.json() == second.json() == {"id": 1, **TASK}
+        assert "Idempotent-Replayed" not in first.headers
+        assert second.headers["Idempotent-Replayed"] == "true"
+        mock_task_service.create.assert_called_once()
+
+    def test_update_replays_etag(self, mock_task_service):
+        headers = {"Idempotency-Key": "update-1"}
+
+        first = self.client.put("/api/v1/tasks/1", json=TASK, headers=headers)
+        second = self.client.put("/api/v1/tasks/1", json=TASK, headers=headers)
+
+        assert first.headers["ETag"] == second.headers["ETag"] == '"task-1-v2"'
+        assert second.headers["Idempotent-Replayed"] == "true"
+        mock_task_service.update_versioned.assert_called_once()
+
+    def test_without_key_every_request_writes(self, mock_task_service):
+        self.client.post("/api/v1/tasks", json=TASK)
+        response = self.client.put("/api/v1/tasks/1", json=TASK)
+
+        assert response.headers["ETag"] == '"task-1-v2"'
+        assert mock_task_service.create.call_count == 1
+        assert mock_task_service.update_versioned.call_count == 1
+
+    def test_key_reused_for_different_request(self):
+        headers = {"Idempotency-Key": "k"}
+        self.client.post("/api/v1/tasks", json=TASK, headers=headers)
+
+        assert self.client.post("/api/v1/tasks", json={**TASK, "title": "Другая"}, headers=headers).status_code == 422
+        assert self.client.put("/api/v1/tasks/1", json=TASK, headers=headers).status_code == 422
+
+    def test_in_progress(self, store):
+        store.begin("k", request_fingerprint("POST", "/api/v1/tasks", TaskModel(**TASK)))
+
+        response = self.client.post("/api/v1/tasks", json=TASK, headers={"Idempotency-Key": "k"})
+
+        assert response.status_code == 409
+        assert response.headers["Retry-After"] == "1"
+
+    def test_failure_is_not_stored(self, mock_task_service):
+        mock_task_service.update_versioned.side_effect = ValueError("Task 1 not found")
+        headers = {"Idempotency-Key": "k"}
+
+        assert self.client.put("/api/v1/tasks/1", json=TASK, headers=headers).status_code == 404
+        mock_task_service.update_versioned.side_effect = None
+        assert self.client.put("/api/v1/tasks/1", json=TASK, headers=headers).status_code == 200
+        assert mock_task_service.update_versioned.call_count == 2
+
+    def test_key_length(self):
+        response = self.client.post("/api/v1/tasks", json=TASK, headers={"Idempotency-Key": "x" * 256})
+
+        assert response.status_code == 400
@@ -0,0 +1,113 @@
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app import app, register_service_metrics
+from backend.database import PureDatabase
+from backend.metrics import (
+    DB_POOL_WAIT, DB_QUERY_DURATION, DB_QUERY_ROWS, HTTP_REQUEST_DURATION, Histogram, MetricsRegistry
+)
+from backend.model import PriorityModel, TaskResponse
+from backend.task import TaskService
+
+
+@pytest.mark.unit
+class TestMetricsRegistry:
+
+    def test_render_counter_and_gauge(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("requests_total", "Запросы", ("method",))
+        gauge = registry.gauge("in_progress", "В обработке")
+
+        counter.inc(labels=("GET",))
+        counter.inc(2, labels=("GET",))
+        gauge.inc()
+        gauge.dec()
+
+        text = registry.render()
+        assert "# TYPE requests_total counter" in text
+        assert 'requests_total{method="GET"} 3' in text
+        assert "in_progress 0" in text
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("latency_seconds", "Задержка", ("route",), buckets=(0.1, 1.0))
+
+        for value in (0.05, 0.5, 0.5, 5.0):
+            histogram.observe(value, ("/a",))
+
+        lines = histogram.render()
+        assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{route="/a",le="1.0"} 3' in lines
+        assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+        assert 'latency_seconds_count{route="/a"} 4' in lines
+        assert histogram.sum(("/a",)) == pytest.approx(6.05)
+
+    def test_label_values_are_escaped(self):
+        registry = MetricsRegistry()
+        registry.counter("errors_total", "Ошибки", ("message",)).inc(labels=('say "hi"\n',))
+
+        assert 'errors_total{message="say \\"hi\\"\\n"} 1' in registry.render()
+
+    def test_wrong_label_count_raises(self):
+        counter = MetricsRegistry().counter("requests_total", "Запросы", ("method",))
+
+        with pytest.raises(ValueError):
+            counter.inc()
+
+    def test_function_metric_is_read_on_render(self):
+        registry = MetricsRegistry()
+        state = {"idle": 1}
+        registry.function("pool_idle", "Свободные соединения", lambda: state["idle"])
+
+        state["idle"] = 5
+
+        assert "pool_idle 5" in registry.render()
+
+
+@pytest.mark.db
+class TestQueryMetrics:
+
+    def test_queries_are_timed_with_row_count(self, database: PureDatabase):
+        labels = ("select_tasks_page",)
+        count, rows, waits = DB_QUERY_DURATION.count(labels), DB_QUERY_ROWS.value(labels), DB_POOL_WAIT.count()
+        database.sql_insert_tasks([("Задача", "Описание", "low")] * 3)
+
+        database.sql_select_tasks_page(limit=2)
+
+        assert DB_QUERY_DURATION.count(labels) == count + 1
+        assert DB_QUERY_ROWS.value(labels) == rows + 2
+        assert DB_POOL_WAIT.count() >= waits + 2
+
+
+@pytest.mark.api_unit
+class TestMetricsEndpoint:
+    client = TestClient(app)
+
+    @pytest.fixture(autouse=True)
+    def setup_mock_service(self, mock_task_service):
+        with patch('backend.app.task_service', mock_task_service):
+            yield
+
+    def test_requests_are_labelled_by_route_template(self, mock_task_service, database: PureDatabase):
+        register_service_metrics(TaskService(db=database))
+        mock_task_service.get_versioned.return_value = (
+            TaskResponse(id=7, title="Задача", description="Описание", priority=PriorityModel.LOW), 1
+        )
+        labels = ("GET", "/api/v1/tasks/{task_id}", "200")
+        count = HTTP_REQUEST_DURATION.count(labels)
+
+        self.client.get("/api/v1/tasks/7")
+        response = self.client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert HTTP_REQUEST_DURATION.count(labels) == count + 1
+        assert 'http_request_duration_seconds_count{method="GET",route="/api/v1/tasks/{task_id}",status="200"}' \
+            in response.text
+        assert "db_pool_connections" in response.text
+
+    def test_unmatched_route(self):
+        self.client.get("/no/such/path")
+
+        assert HTTP_REQUEST_DURATION.count(("GET", "<unmatched>", "404")) >= 1
@@ -0,0 +1,194 @@
+import multiprocessing
+
+import pysqlite3 as sqlite3
+import pytest
+
+from backend import manage
+from backend.database import PureDatabase
+from backend.migrations import MIGRATIONS, Migration, Migrator
+from backend.migrations import base
+
+
+def legacy_database(path: str, rows: int) -> None:
+    """БД в том виде, в каком её создавал старый _create_table"""
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE tasks (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, "
+                 "description TEXT NOT NULL, priority TEXT NOT NULL DEFAULT 'medium')")
+    conn.executemany(
+        "INSERT INTO tasks (title, description, priority) VALUES (?, ?, 'low')",
+        [(f"Задача {i}", f"Описание {i}") for i in range(1, rows + 1)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def search_ids(conn: sqlite3.Connection, word: str):
+    return sorted(row[0] for row in conn.execute("SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH ?", (word,)))
+
+
+def check_fts(conn: sqlite3.Connection) -> None:
+    conn.execute("INSERT INTO tasks_fts (tasks_fts) VALUES ('integrity-check')")
+
+
+def open_database(path: str) -> None:
+    """Старт воркера: открыть БД (с миграциями) и записать задачу"""
+    db = PureDatabase(path, pool_size=1)
+    db.sql_insert_task("Задача", "Описание", "low")
+    db.close()
+
+
+@pytest.mark.db
+class TestMigrations:
+
+    @pytest.fixture
+    def conn(self, tmp_path):
+        conn = sqlite3.connect(str(tmp_path / "tasks.db"), isolation_level=None)
+        yield conn
+        conn.close()
+
+    def test_fresh_database_reaches_latest_version(self, tmp_path):
+        db = PureDatabase(str(tmp_path / "tasks.db"), pool_size=1)
+
+        with db._pool.connection() as conn:
+            assert Migrator(conn).version == MIGRATIONS[-1].version
+            assert Migrator(conn).pending(MIGRATIONS) == []
+        db.close()
+
+    def test_workers_migrate_fresh_database_once(self, tmp_path):
+        path = str(tmp_path / "tasks.db")
+        workers = [multiprocessing.Process(target=open_database, args=(path,)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=30)
+
+        assert [worker.exitcode for worker in workers] == [0, 0, 0, 0]
+        conn = sqlite3.connect(path)
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == MIGRATIONS[-1].version
+        assert conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0] == 4
+        conn.close()
+
+    def test_adopts_legacy_schema(self, tmp_path):
+        path = str(tmp_path / "tasks.db")
+        legacy_database(path, rows=5)
+
+        db = PureDatabase(path, pool_size=1)
+
+        assert db.sql_select_task_version(3) == 1
+        assert [row['id'] for row in db.sql_search_tasks('описание', 10, ranked=False)] == [1, 2, 3, 4, 5]
+        assert db.sql_select_task_stats() == {'low': 5}
+        db.close()
+
+    def test_migrate_up_to_target(self, conn):
+        applied = Migrator(conn).migrate(MIGRATIONS, target=2)
+
+        assert [migration.version for migration in applied] == [1, 2]
+        assert [migration.version for migration in Migrator(conn).pending(MIGRATIONS)] == [3, 4, 5, 6, 7, 8]
+        assert Migrator(conn).migrate(MIGRATIONS[:2]) == []
+
+    def test_rejects_unordered_migrations(self, conn):
+        migrations = [Migration(2, "b", lambda migrator: None), Migration(1, "a", lambda migrator: None)]
+
+        with pytest.raises(ValueError):
+            Migrator(conn).migrate(migrations)
+
+    def test_search_backfill_runs_in_batches(self, tmp_path, conn):
+        legacy_database(str(tmp_path / "tasks.db"), rows=10)
+        migrator = Migrator(conn, batch_size=3)
+        migrator.migrate(MIGRATIONS, target=3)
+
+        statements = []
+        conn.set_trace_callback(statements.append)
+        migrator.migrate(MIGRATIONS)
+
+        assert sum(statement.startswith("INSERT INTO tasks_fts (rowid") for statement in statements) == 4
+        assert search_ids(conn, "описание") == list(range(1, 11))
+        assert not migrator.backfill_pending("tasks_fts")
+        check_fts(conn)
+
+    def test_search_backfill_resumes_after_failure(self, tmp_path, conn, monkeypatch):
+        legacy_database(str(tmp_path / "tasks.db"), rows=10)
+        migrator = Migrator(conn, batch_size=3, pause=0.01)
+        migrator.migrate(MIGRATIONS, target=3)
+
+        def interrupt(_):
+            raise KeyboardInterrupt
+
+        monkeypatch.setattr(base.time, "sleep", interrupt)
+        with pytest.raises(KeyboardInterrupt):
+            migrator.migrate(MIGRATIONS)
+        assert migrator.version == 3
+        assert migrator.backfill_pending("tasks_fts")
+
+        monkeypatch.undo()
+        migrator.migrate(MIGRATIONS)
+
+        assert migrator.version == MIGRATIONS[-1].version
+        assert search_ids(conn, "описание") == list(range(1, 11))
+        check_fts(conn)
+
+    def test_search_backfill_with_concurrent_writes(self, tmp_path, conn, monkeypatch):
+        path = str(tmp_path / "tasks.db")
+        legacy_database(path, rows=10)
+        migrator = Migrator(conn, batch_size=3, pause=0.01)
+        migrator.migrate(MIGRATIONS, target=3)
+        writer = sqlite3.connect(path, isolation_level=None)
+        writes = iter([
+            # уже проиндексированная строка, ещё не проиндексированная и новая
+            "UPDATE tasks SET description = 'Изменено' WHERE id = 2",
+            "UPDATE tasks SET description = 'Изменено' WHERE id = 9",
+            "DELETE FROM tasks WHERE id = 8",
+            "INSERT INTO tasks (title, description) VALUES ('Новая', 'Описание 11')",
+        ])
+
+        def write_between_batches(_):
+            statement = next(writes, None)
+            if statement:
+                writer.execute(statement)
+
+        monkeypatch.setattr(base.time, "sleep", write_between_batches)
+        migrator.migrate(MIGRATIONS)
+        writer.close()
+
+        assert search_ids(conn, "описание") == [1, 3, 4, 5, 6, 7, 10, 11]
+        assert search_ids(conn, "изменено") == [2, 9]
+        check_fts(conn)
+
+    def test_cli_plan_and_dry_run_do_not_change_database(self, tmp_path, capsys):
+        path = str(tmp_path / "tasks.db")
+        legacy_database(path, rows=2)
+
+        assert manage.main(["plan", "--db", path]) == 0
+        assert manage.main(["dry-run", "--db", path]) == 0
+
+        output = capsys.readouterr().out
+        assert "0004 tasks_search" in output
+        assert "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts" in output
+        conn = sqlite3.connect(path)
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == 0
+        conn.close()
+
+    def test_cli_migrate(self, tmp_path, capsys):
+        path = str(tmp_path / "tasks.db")
+
+        assert manage.main(["migrate", "--db", path]) == 0
+
+        assert f"Schema version: {MIGRATIONS[-1].version}" in capsys.readouterr().out
+
+    def test_cli_reconcile_stats(self, tmp_path, capsys):
+        path = str(tmp_path / "tasks.db")
+        db = PureDatabase(path, pool_size=1)
+        db.sql_insert_tasks([("Задача", "Описание", "low")] * 3)
+        db.close()
+        conn = sqlite3.connect(path)
+        conn.execute("UPDATE task_stats SET count = 7 WHERE priority = 'low'")
+        conn.commit()
+        conn.close()
+
+        assert manage.main(["reconcile-stats", "--db", path, "--check"]) == 1
+        assert manage.main(["reconcile-stats", "--db", path]) == 0
+        assert manage.main(["reconcile-stats", "--url", f"sqlite:///{path}", "--check"]) == 0
+
+        output = capsys.readouterr().out
+        assert "low: counter 7, actual 3" in output
+        assert "Task stats are consistent" in output
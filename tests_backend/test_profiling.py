@@ -0,0 +1,164 @@
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.app import app, profiler
+from backend.profiling import WAITING, ProfileSession, ProfilingMiddleware, SamplingProfiler
+
+
+def busy(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def read_profile(directory, name: str) -> dict:
+    stacks = {}
+    for line in (directory / name).read_text(encoding="utf-8").splitlines():
+        stack, count = line.rsplit(" ", 1)
+        stacks[stack] = stacks.get(stack, 0) + int(count)
+    return stacks
+
+
+@pytest.mark.unit
+class TestProfileSession:
+
+    def test_stack_starts_below_anchor(self):
+        def inner():
+            return sys._getframe()
+
+        def outer():
+            return inner()
+
+        anchor = sys._getframe()
+        session = ProfileSession(threading.get_ident(), anchor)
+        session.sample({threading.get_ident(): outer()})
+
+        stack, = session.samples
+        assert stack.startswith("event-loop;")
+        assert [frame.split(" (")[0] for frame in stack.split(";")[1:]][-2:] == [
+            "TestProfileSession.test_stack_starts_below_anchor.<locals>.outer",
+            "TestProfileSession.test_stack_starts_below_anchor.<locals>.inner",
+        ]
+        assert "test_stack_starts_below_anchor (" not in stack
+
+    def test_thread_busy_with_other_work_is_waiting(self):
+        session = ProfileSession(threading.get_ident(), sys._getframe())
+
+        def elsewhere():
+            return sys._getframe()
+
+        frames = {}
+        thread = threading.Thread(target=lambda: frames.setdefault("frame", elsewhere()))
+        thread.start()
+        thread.join()
+        session.sample({threading.get_ident(): frames["frame"]})
+
+        assert session.samples == {WAITING: 1}
+
+
+@pytest.mark.unit
+class TestSamplingProfiler:
+
+    def test_writes_collapsed_stacks_per_route(self, tmp_path):
+        sampler = SamplingProfiler(interval=0.001, directory=str(tmp_path))
+
+        session = sampler.start(sys._getframe())
+        busy(0.05)
+        sampler.stop(session, "GET /api/v1/tasks/{task_id}")
+
+        stacks = read_profile(tmp_path, "GET_api_v1_tasks_{task_id}.collapsed")
+        assert sum(stacks.values()) > 5
+        assert all(stack.startswith("GET /api/v1/tasks/{task_id};") for stack in stacks)
+        assert any("busy (test_profiling.py:" in stack for stack in stacks)
+        assert sampler.profiled == 1
+
+    def test_executor_thread_is_attributed(self, tmp_path):
+        sampler = SamplingProfiler(interval=0.001, directory=str(tmp_path))
+        session = sampler.start(sys._getframe())
+
+        def worker():
+            session.enter(sys._getframe())
+            try:
+                busy(0.05)
+            finally:
+                session.exit()
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        sampler.stop(session, "POST /api/v1/tasks")
+
+        stacks = read_profile(tmp_path, "POST_api_v1_tasks.collapsed")
+        assert any(stack.startswith("POST /api/v1/tasks;db-executor;busy (") for stack in stacks)
+
+
+@pytest.mark.api_unit
+class TestProfilingApi:
+    client = TestClient(app)
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mock_task_service, monkeypatch, tmp_path):
+        monkeypatch.setenv("ADMIN_TOKEN", "secret")
+        monkeypatch.setattr(profiler, "directory", tmp_path)
+        monkeypatch.setattr(profiler, "sample_rate", 0.0)
+        mock_task_service.get_page.side_effect = lambda *args, **kwargs: (busy(0.03), ([], None))[1]
+        with patch('backend.app.task_service', mock_task_service):
+            yield
+
+    def test_profile_header_with_admin_token(self, tmp_path):
+        response = self.client.get("/api/v1/tasks", headers={"X-Profile": "1", "X-Admin-Token": "secret"})
+
+        assert response.status_code == 200
+        stacks = read_profile(tmp_path, "GET_api_v1_tasks.collapsed")
+        assert any("db-executor;" in stack and "busy (" in stack for stack in stacks)
+
+    def test_profile_header_without_valid_token_is_ignored(self, tmp_path):
+        profiled = profiler.profiled
+
+        self.client.get("/api/v1/tasks", headers={"X-Profile": "1", "X-Admin-Token": "wrong"})
+
+        assert profiler.profiled == profiled
+        assert not list(tmp_path.iterdir())
+
+    def test_profile_is_written_off_event_loop(self, monkeypatch):
+        threads = []
+        save = profiler.save
+
+        def recording_save(session, name):
+            threads.append((session.loop_thread, threading.get_ident()))
+            save(session, name)
+
+        monkeypatch.setattr(profiler, "save", recording_save)
+        self.client.get("/api/v1/tasks", headers={"X-Profile": "1", "X-Admin-Token": "secret"})
+
+        (loop_thread, writer_thread), = threads
+        assert writer_thread != loop_thread
+
+    def test_profile_header_without_authorizer_is_ignored(self, tmp_path):
+        test_app = FastAPI()
+        test_app.add_middleware(ProfilingMiddleware, profiler=SamplingProfiler(directory=str(tmp_path)))
+
+        @test_app.get("/ping")
+        async def ping():
+            return {}
+
+        TestClient(test_app).get("/ping", headers={"X-Profile": "1", "X-Admin-Token": "secret"})
+
+        assert not list(tmp_path.iterdir())
+
+    def test_toggle_sample_rate(self, tmp_path):
+        headers = {"X-Admin-Token": "secret"}
+
+        response = self.client.put("/admin/profiling", json={"sample_rate": 1}, headers=headers)
+        assert response.json()["sample_rate"] == 1
+        self.client.get("/api/v1/tasks")
+        assert (tmp_path / "GET_api_v1_tasks.collapsed").exists()
+
+        assert self.client.put("/admin/profiling", json={"sample_rate": 2}, headers=headers).status_code == 422
+        assert self.client.get("/admin/profiling").status_code == 403
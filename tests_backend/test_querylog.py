@@ -0,0 +1,112 @@
+import logging
+from unittest.mock import Mock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app import app
+from backend.database import PureDatabase
+from backend.querylog import QueryLog
+
+
+@pytest.mark.db
+class TestQueryLog:
+
+    @pytest.fixture
+    def logged_database(self, tmp_path) -> PureDatabase:
+        db = PureDatabase(str(tmp_path / "tasks.db"), pool_size=2, slow_query_ms=0)
+        db.query_log.reset()
+        yield db
+        db.close()
+
+    def test_disabled_by_default(self, database: PureDatabase):
+        assert database.query_log is None
+
+    def test_slow_query_is_logged_with_plan(self, logged_database: PureDatabase, caplog):
+        logged_database.sql_insert_task('Задача', 'Описание', 'low')
+        caplog.clear()
+
+        with caplog.at_level(logging.WARNING, logger="backend.querylog"):
+            logged_database.sql_select_all_tasks()
+            logged_database.sql_select_task_by_id(1)
+
+        full_scan, by_id = [record.getMessage() for record in caplog.records]
+        assert "(full scan)" in full_scan and "SCAN tasks" in full_scan
+        assert "(full scan)" not in by_id and "params=(1,)" in by_id
+        assert "INTEGER PRIMARY KEY" in by_id
+
+    def test_plan_is_sampled(self, logged_database: PureDatabase):
+        with patch.object(QueryLog, "explain", wraps=QueryLog.explain) as explain:
+            for _ in range(3):
+                logged_database.sql_select_task_by_id(1)
+
+        assert explain.call_count == 1
+        query = logged_database.query_log.top(1)[0]
+        assert (query["calls"], query["slow_calls"]) == (3, 3)
+        assert query["plan"]
+
+    def test_fast_queries_are_counted_but_not_logged(self, tmp_path, caplog):
+        db = PureDatabase(str(tmp_path / "tasks.db"), pool_size=1, slow_query_ms=10_000)
+        db.sql_insert_tasks([('Задача', 'Описание', 'low')] * 3)
+
+        with caplog.at_level(logging.WARNING, logger="backend.querylog"):
+            db.sql_select_all_tasks()
+
+        assert not caplog.records
+        inserts = [query for query in db.query_log.top(50) if query["sql"].startswith("INSERT INTO tasks")]
+        assert inserts[0]["rows"] == 3
+        assert inserts[0]["plan"] is None
+        db.close()
+
+    def test_top_sorted_by_field(self, logged_database: PureDatabase):
+        for _ in range(3):
+            logged_database.sql_select_tasks_version()
+        logged_database.sql_select_all_tasks()
+
+        top = logged_database.query_log.top(2, sort="calls")
+
+        assert top[0]["sql"] == "SELECT version FROM table_versions WHERE name = 'tasks'"
+        assert top[0]["calls"] >= 3
+        assert top[0]["calls"] >= top[1]["calls"]
+
+
+@pytest.mark.api_unit
+class TestAdminQueries:
+    client = TestClient(app)
+
+    @pytest.fixture(autouse=True)
+    def setup_mock_service(self, mock_task_service):
+        mock_task_service.db = Mock()
+        mock_task_service.db.query_log = QueryLog(threshold=1.0)
+        with patch('backend.app.task_service', mock_task_service):
+            yield
+
+    def test_disabled_without_admin_token(self, monkeypatch):
+        monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+
+        assert self.client.get("/admin/queries").status_code == 404
+
+    def test_wrong_token(self, monkeypatch):
+        monkeypatch.setenv("ADMIN_TOKEN", "secret")
+
+        response = self.client.get("/admin/queries", headers={"X-Admin-Token": "wrong"})
+
+        assert response.status_code == 403
+
+    def test_top_queries(self, monkeypatch, mock_task_service):
+        monkeypatch.setenv("ADMIN_TOKEN", "secret")
+        mock_task_service.db.query_log.record(Mock(), "SELECT 1", (), 0.002, 1)
+
+        response = self.client.get("/admin/queries?sort=max_time", headers={"X-Admin-Token": "secret"})
+
+        assert response.status_code == 200
+        assert response.json()["threshold_ms"] == 1000
+        assert response.json()["queries"][0]["sql"] == "SELECT 1"
+
+    def test_query_log_disabled(self, monkeypatch, mock_task_service):
+        monkeypatch.setenv("ADMIN_TOKEN", "secret")
+        mock_task_service.db.query_log = None
+
+        response = self.client.delete("/admin/queries", headers={"X-Admin-Token": "secret"})
+
+        assert response.status_code == 404
@@ -0,0 +1,31 @@
+import logging
+import logging.config
+
+import pytest
+
+from backend.server import log_config
+
+
+@pytest.mark.unit
+class TestLogConfig:
+
+    @pytest.fixture(autouse=True)
+    def restore_logging(self):
+        logger = logging.getLogger("backend")
+        saved = (logger.handlers[:], logger.level, logger.propagate)
+        yield
+        logger.handlers[:], logger.level, logger.propagate = saved[0], saved[1], saved[2]
+
+    def test_application_loggers_are_configured(self, capsys):
+        logging.config.dictConfig(log_config("debug"))
+
+        logging.getLogger("backend.app").debug("Storage settings: %s", {"journal_mode": "wal"})
+
+        assert "backend.app: Storage settings: {'journal_mode': 'wal'}" in capsys.readouterr().err
+
+    def test_level(self, capsys):
+        logging.config.dictConfig(log_config("warning"))
+
+        logging.getLogger("backend.app").info("hidden")
+
+        assert "hidden" not in capsys.readouterr().err
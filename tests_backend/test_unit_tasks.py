@@ -1,7 +1,12 @@
+import json
 import pytest
 from unittest.mock import Mock
-from backend.model import PriorityModel, TaskRequest, TaskResponse
-from backend.task import TaskService
+from backend.cursor import decode_cursor, encode_cursor
+from backend.model import (
+    BulkItemStatusModel, BulkModeModel, ExportFormatModel, PriorityModel, SearchSortModel, TaskRequest, TaskResponse,
+    TaskSortModel
+)
+from backend.task import TaskService, VersionConflictError
 
 @pytest.mark.unit
 class TestTaskService:
@@ -54,6 +59,117 @@ class TestTaskService:
         assert mock_database.sql_select_all_tasks.call_count == 1
         assert task_dict == data
 
+    def test_export_ndjson(self, task_service: TaskService, mock_database: Mock):
+        mock_database.iter_tasks.return_value = iter([
+            [{'id': 1, 'title': 'Задача', 'description': 'Описание', 'priority': 'low'},
+             {'id': 2, 'title': 'Битая', 'description': 'Описание', 'priority': 'urgent'}],
+            [{'id': 3, 'title': 'Задача', 'description': 'Описание', 'priority': 'high'}],
+        ])
+
+        chunks = list(task_service.export(ExportFormatModel.NDJSON, batch_size=2))
+
+        assert len(chunks) == 2
+        lines = b''.join(chunks).decode().splitlines()
+        assert [json.loads(line)['id'] for line in lines] == [1, 3]
+        mock_database.iter_tasks.assert_called_once_with(2)
+
+    @pytest.mark.parametrize('batches, expected_ids', [
+        ([], []),
+        ([[{'id': 1, 'title': 'Задача', 'description': 'Описание', 'priority': 'low'}],
+          [{'id': 2, 'title': 'Задача', 'description': 'Описание', 'priority': 'medium'}]], [1, 2]),
+    ])
+    def test_export_json_array(self, task_service: TaskService, mock_database: Mock, batches, expected_ids):
+        mock_database.iter_tasks.return_value = iter(batches)
+
+        body = b''.join(task_service.export(ExportFormatModel.JSON))
+
+        assert [task['id'] for task in json.loads(body)] == expected_ids
+
+    def test_get_page_returns_next_cursor(self, task_service: TaskService, mock_database: Mock):
+        rows = [
+            {'id': i, 'title': f'Задача {i}', 'description': 'Описание', 'priority': 'low'}
+            for i in (3, 4, 5)
+        ]
+        mock_database.sql_select_tasks_page.return_value = rows
+
+        tasks, next_cursor = task_service.get_page(limit=2, after_id=2, priority=PriorityModel.LOW)
+
+        assert [task.id for task in tasks] == [3, 4]
+        assert decode_cursor(next_cursor) == ('id', [4])
+        mock_database.sql_select_tasks_page.assert_called_once_with(
+            3, after=[2], priority='low', sort='id', descending=False
+        )
+
+    def test_get_page_last_page_has_no_cursor(self, task_service: TaskService, mock_database: Mock):
+        mock_database.sql_select_tasks_page.return_value = [
+            {'id': 1, 'title': 'Задача', 'description': 'Описание', 'priority': 'high'}
+        ]
+
+        tasks, next_cursor = task_service.get_page(limit=2)
+
+        assert len(tasks) == 1
+        assert next_cursor is None
+
+    def test_get_page_by_cursor(self, task_service: TaskService, mock_database: Mock):
+        mock_database.sql_select_tasks_page.return_value = []
+        cursor = encode_cursor('-title', ['Задача', 7])
+
+        task_service.get_page(limit=10, cursor=cursor, sort=TaskSortModel.TITLE_DESC)
+
+        mock_database.sql_select_tasks_page.assert_called_once_with(
+            11, after=['Задача', 7], priority=None, sort='title', descending=True
+        )
+
+    @pytest.mark.parametrize('kwargs, message', [
+        ({'cursor': 'garbage'}, 'Invalid cursor'),
+        ({'cursor': encode_cursor('id', [1]), 'sort': TaskSortModel.TITLE}, "issued for sort 'id'"),
+        ({'cursor': encode_cursor('id', [1]), 'after_id': 1}, 'either cursor or after_id'),
+        ({'limit': 0}, 'Limit must be between'),
+    ])
+    def test_get_page_invalid_arguments(self, task_service: TaskService, mock_database: Mock, kwargs, message):
+        with pytest.raises(ValueError) as expect:
+            task_service.get_page(**kwargs)
+
+        assert message in str(expect.value)
+        mock_database.sql_select_tasks_page.assert_not_called()
+
+    def test_search_returns_next_cursor(self, task_service: TaskService, mock_database: Mock):
+        mock_database.sql_search_tasks.return_value = [
+            {'id': i, 'title': 'Задача', 'description': 'Описание', 'priority': 'low'} for i in (5, 9, 12)
+        ]
+
+        tasks, next_cursor = task_service.search('задача', limit=2, sort=SearchSortModel.ID)
+
+        assert [task.id for task in tasks] == [5, 9]
+        assert decode_cursor(next_cursor) == ('search:id', [9])
+        mock_database.sql_search_tasks.assert_called_once_with('задача', 3, ranked=False, after_id=None, after_rank=None)
+
+    def test_search_ranked_cursor_is_rank_and_id(self, task_service: TaskService, mock_database: Mock):
+        mock_database.sql_search_tasks.return_value = [
+            {'id': i, 'title': 'Задача', 'description': 'Описание', 'priority': 'low', 'rank': -2.5} for i in (7, 3)
+        ]
+        cursor = encode_cursor('search:relevance', [-3.25, 20])
+
+        tasks, next_cursor = task_service.search('задача', limit=1, cursor=cursor)
+
+        assert [task.id for task in tasks] == [7]
+        assert decode_cursor(next_cursor) == ('search:relevance', [-2.5, 7])
+        mock_database.sql_search_tasks.assert_called_once_with('задача', 2, ranked=True, after_id=20, after_rank=-3.25)
+
+    def test_search_rejects_offset_cursor(self, task_service: TaskService, mock_database: Mock):
+        with pytest.raises(ValueError) as expect:
+            task_service.search('задача', cursor=encode_cursor('search:relevance', [20]))
+
+        assert str(expect.value) == "Invalid cursor"
+        mock_database.sql_search_tasks.assert_not_called()
+
+    def test_search_rejects_cursor_of_other_sort(self, task_service: TaskService, mock_database: Mock):
+        with pytest.raises(ValueError) as expect:
+            task_service.search('задача', cursor=encode_cursor('search:relevance', [20]), sort=SearchSortModel.ID)
+
+        assert str(expect.value) == "Invalid cursor"
+        mock_database.sql_search_tasks.assert_not_called()
+
     def test_get_task_on_id(self, task_service: TaskService, mock_database: Mock):
         data = {
             'id': 1,
@@ -62,10 +178,11 @@ class TestTaskService:
             'priority': 'medium'
             }
         
-        mock_database.sql_select_task_by_id.return_value=data
-        result = task_service.get(task_id=1)
+        mock_database.sql_select_task_by_id.return_value={**data, 'version': 3}
+        result, version = task_service.get_versioned(task_id=1)
         assert mock_database.sql_select_task_by_id.call_count == 1
         assert result.model_dump()==data
+        assert version == 3
 
     def test_get_task_on_invalid_id(self, task_service: TaskService, mock_database: Mock):
         mock_database.sql_select_task_by_id.return_value = None
@@ -79,13 +196,6 @@ class TestTaskService:
     def test_update_task(self, task_service: TaskService, mock_database: Mock):
         task_id = 1
         
-        old_data = {
-        'id': task_id,
-        'title': 'Позвонить маме',
-        'description': 'Поздравить с днем рождения',
-        'priority': 'medium'
-    }
-    
         new_data = {
             'id': task_id,
             'title': 'Позвонить',
@@ -98,13 +208,13 @@ class TestTaskService:
             'description': 'Поздравить с днем рождения',
             'priority': 'medium'
         }
-        mock_database.sql_select_task_by_id.side_effect = [old_data, new_data]
-        mock_database.sql_update_task.return_value = data_update
+        mock_database.sql_update_task.return_value = {**new_data, 'version': 2}
         
         
         result = task_service.update(new_data['id'], TaskRequest(**data_update))
         assert mock_database.sql_update_task.call_count == 1
-        assert result.title == data_update['title']
+        mock_database.sql_select_task_by_id.assert_not_called()
+        assert result.model_dump() == new_data
 
 
     def test_update_task_with_invalid_id(self, mock_database, task_service):
@@ -114,58 +224,178 @@ class TestTaskService:
                 'description': 'Поздравить с днем рождения',
                 'priority': 'medium'
             }
-        mock_database.sql_select_task_by_id.return_value = None
+        mock_database.sql_update_task.return_value = None
         with pytest.raises(ValueError) as expect:
             task_service.update(task_id, TaskRequest(**data))
 
         
             
-        assert mock_database.sql_select_task_by_id.call_count == 1
+        assert mock_database.sql_update_task.call_count == 1
+        mock_database.sql_select_task_by_id.assert_not_called()
         assert str(expect.value) == f"Task with id {task_id} not found"
 
-    
-    def test_update_task_not_found_after_verification(self, mock_database, task_service):
-        task_id = 1
-        data = {
-            'id': task_id,
-            'title': 'Позвонить маме',
-            'description': 'Поздравить с днем рождения',
-            'priority': 'medium'
-        }
-        mock_database.sql_select_task_by_id.return_value = data
-        mock_database.sql_select_task_by_id.return_value = None
-        
-        with pytest.raises(ValueError) as expect:
-            task_service.update(data['id'], TaskRequest(**data))
-
-          
-        assert mock_database.sql_select_task_by_id.call_count == 1
-        assert str(expect.value) == f"Task with id {task_id} not found"
         
     def test_delete_task(self, mock_database, task_service):
         task_id = 1
-        data = {
-            'id': task_id,
-            'title': 'Позвонить маме',
-            'description': 'Поздравить с днем рождения',
-            'priority': 'medium'
-        }
-        mock_database.sql_select_task_by_id.return_value = data
         mock_database.sql_delete_task.return_value = True
         result = task_service.delete(task_id)
             
-        assert mock_database.sql_select_task_by_id.call_count == 1
+        mock_database.sql_select_task_by_id.assert_not_called()
         assert mock_database.sql_delete_task.call_count == 1
         assert result is True
 
 
     def test_api_delete_task_with_invalid_id(self, mock_database, task_service):
         task_id = 999 
-        mock_database.sql_select_task_by_id.return_value = None 
+        mock_database.sql_delete_task.return_value = False
         with pytest.raises(ValueError) as expect:
             task_service.delete(task_id)
             
-        assert mock_database.sql_select_task_by_id.call_count == 1
-        assert mock_database.sql_delete_task.call_count == 0
+        mock_database.sql_select_task_by_id.assert_not_called()
+        assert mock_database.sql_delete_task.call_count == 1
         assert str(expect.value) == f"Task with id {task_id} not found"
-        
\ No newline at end of file
+
+    def test_conditional_update_version_conflict(self, task_service: TaskService, mock_database: Mock):
+        mock_database.sql_update_task.return_value = None
+        mock_database.sql_select_task_version.return_value = 5
+
+        with pytest.raises(VersionConflictError) as expect:
+            task_service.update_versioned(1, TaskRequest(title='Задача', description='Описание', priority='low'),
+                                         expected_versions=[4])
+
+        assert mock_database.sql_update_task.call_args.kwargs['expected_versions'] == [4]
+        assert str(expect.value) == "Task with id 1 has version 5, expected one of [4]"
+
+    def test_conditional_delete_missing_task(self, task_service: TaskService, mock_database: Mock):
+        mock_database.sql_delete_task.return_value = False
+        mock_database.sql_select_task_version.return_value = None
+
+        with pytest.raises(ValueError) as expect:
+            task_service.delete(1, expected_versions=[4])
+
+        assert not isinstance(expect.value, VersionConflictError)
+        assert str(expect.value) == "Task with id 1 not found"
+
+    def test_create_many(self, task_service: TaskService, mock_database: Mock):
+        mock_database.sql_insert_tasks.return_value = [7, 8]
+        items = [
+            {'title': 'Задача 1', 'description': 'Описание'},
+            {'title': 'Задача 2', 'description': 'Описание', 'priority': 'high'},
+        ]
+
+        result = task_service.create_many(items)
+
+        assert result.applied is True
+        assert result.succeeded == 2
+        assert [(item.id, item.status) for item in result.items] == [
+            (7, BulkItemStatusModel.CREATED), (8, BulkItemStatusModel.CREATED)
+        ]
+        mock_database.sql_insert_tasks.assert_called_once_with(
+            [('Задача 1', 'Описание', 'medium'), ('Задача 2', 'Описание', 'high')]
+        )
+
+    def test_create_many_atomic_rejects_whole_batch(self, task_service: TaskService, mock_database: Mock):
+        items = [{'title': 'Задача', 'description': 'Описание'}, {'title': '', 'description': 'Описание'}]
+
+        result = task_service.create_many(items, BulkModeModel.ATOMIC)
+
+        assert result.applied is False
+        assert [item.status for item in result.items] == [
+            BulkItemStatusModel.SKIPPED, BulkItemStatusModel.INVALID
+        ]
+        assert result.items[1].detail.startswith('title:')
+        mock_database.sql_insert_tasks.assert_not_called()
+
+    def test_create_many_partial_inserts_valid_items(self, task_service: TaskService, mock_database: Mock):
+        mock_database.sql_insert_tasks.return_value = [3]
+        items = [{'title': '', 'description': 'Описание'}, {'title': 'Задача', 'description': 'Описание'}]
+
+        result = task_service.create_many(items, BulkModeModel.PARTIAL)
+
+        assert result.applied is True
+        assert (result.succeeded, result.failed) == (1, 1)
+        assert result.items[1].id == 3
+        mock_database.sql_insert_tasks.assert_called_once_with([('Задача', 'Описание', 'medium')])
+
+    @pytest.mark.parametrize('mode, applied, first_status', [
+        (BulkModeModel.ATOMIC, False, BulkItemStatusModel.SKIPPED),
+        (BulkModeModel.PARTIAL, True, BulkItemStatusModel.UPDATED),
+    ])
+    def test_update_many_with_missing_id(self, task_service: TaskService, mock_database: Mock,
+                                         mode, applied, first_status):
+        mock_database.sql_update_tasks.return_value = {1}
+
+        result = task_service.update_many([{'id': 1, 'priority': 'low'}, {'id': 999, 'title': 'Новая'}], mode)
+
+        assert result.applied is applied
+        assert [item.status for item in result.items] == [first_status, BulkItemStatusModel.NOT_FOUND]
+        assert result.items[1].detail == "Task with id 999 not found"
+        mock_database.sql_update_tasks.assert_called_once_with(
+            [(1, None, None, 'low'), (999, 'Новая', None, None)],
+            atomic=mode == BulkModeModel.ATOMIC
+        )
+
+    def test_delete_many(self, task_service: TaskService, mock_database: Mock):
+        mock_database.sql_delete_tasks.return_value = {1, 2}
+
+        result = task_service.delete_many([1, 2])
+
+        assert result.applied is True
+        assert [item.status for item in result.items] == [BulkItemStatusModel.DELETED] * 2
+
+    def test_bulk_size_limit(self, task_service: TaskService, mock_database: Mock):
+        with pytest.raises(ValueError) as expect:
+            task_service.delete_many(list(range(10_001)))
+
+        assert "exceeds the limit" in str(expect.value)
+        mock_database.sql_delete_tasks.assert_not_called()
+
+    def test_get_all_skips_invalid_rows(self, task_service: TaskService, mock_database: Mock):
+        mock_database.sql_select_all_tasks.return_value = [
+            {'id': 1, 'title': 'Задача', 'description': 'Описание', 'priority': 'urgent'},
+            {'id': 2, 'title': 'Задача', 'description': 'Описание', 'priority': 'low'},
+            {'id': 3, 'title': 'Задача', 'description': '', 'priority': 'low'},
+        ]
+
+        tasks = task_service.get_all()
+
+        assert [task.model_dump() for task in tasks] == [
+            {'id': 2, 'title': 'Задача', 'description': 'Описание', 'priority': PriorityModel.LOW}
+        ]
+
+    def test_get_task_with_invalid_priority(self, task_service: TaskService, mock_database: Mock):
+        mock_database.sql_select_task_by_id.return_value = {
+            'id': 1, 'title': 'Задача', 'description': 'Описание', 'priority': 'urgent', 'version': 1
+        }
+
+        with pytest.raises(ValueError) as expect:
+            task_service.get(1)
+
+        assert str(expect.value) == "Invalid priority 'urgent' for task 1"
+
+    def test_storage_opened_on_first_use(self, mock_database: Mock, monkeypatch):
+        factory = Mock(return_value=mock_database)
+        monkeypatch.setattr("backend.task.storage_from_url", factory)
+        mock_database.sql_select_tasks_version.return_value = 3
+
+        service = TaskService()
+        factory.assert_not_called()
+
+        assert service.list_version() == 3
+        service.open()
+        factory.assert_called_once_with()
+        service.close()
+        mock_database.close.assert_called_once()
+
+    def test_storage_reopened_after_close(self, monkeypatch):
+        monkeypatch.setattr("backend.task.storage_from_url", Mock(side_effect=[Mock(), Mock()]))
+        service = TaskService()
+
+        service.open()
+        first = service.db
+        service.close()
+        service.open()
+
+        first.close.assert_called_once()
+        assert service.db is not first
+        service.close()